@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+cosim/reference.py
+Reference models the co-simulation compares against, behind one small
+interface: step one instruction, read the registers, read a memory range.
+
+• ``PyBoyBackend``  – drives a live PyBoy (optional dependency).
+• ``TraceBackend``  – replays a golden trace recorded from any backend with
+  ``record``; a step is an index bump, so it runs anywhere and far faster
+  than a second emulator.
+
+Golden traces are ``.npz`` files (deflate-compressed NumPy arrays):
+    regs    (steps+1, 10) uint16   A F B C D E H L SP PC, row 0 = start
+    halted  (steps+1,)    bool
+    ranges  (k, 2)        uint32   recorded [start, end) memory ranges
+    mem<i>  (steps+1, end-start) uint8   contents of range i after each step
+
+Usage
+-----
+    python cosim/reference.py <rom.gb> <out.npz> [steps]
+        Record a golden trace of <rom.gb> from PyBoy.
+"""
+
+import os
+import sys
+from abc import ABC, abstractmethod
+from importlib import metadata
+
+import numpy as np
+
+REGISTERS = ("A", "F", "B", "C", "D", "E", "H", "L", "SP", "PC")
+
+# I/O (LY, sound, IF …) and HRAM + IE
+RECORDED_RANGES = ((0xFF00, 0xFF80), (0xFF80, 0x10000))
+
+
+class ReferenceBackend(ABC):
+    """A reference model stepped in lock-step with the device under test."""
+
+    halted = False
+
+    @abstractmethod
+    def step(self):
+        """Execute one instruction (or idle for a while once halted)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def registers(self):
+        """Return ``{name: value}`` for every name in ``REGISTERS``."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def read_memory(self, start, end):
+        """Return ``[start, end)`` as bytes."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ───────────── PyBoy ─────────────
+class PyBoyBackend(ReferenceBackend):
+    """
+    A live PyBoy 2.x, stepped one instruction at a time from the post-boot
+    state at PC=0x0100.
+
+    PyBoy has no public single-step; ``tick()`` runs a whole frame.  A QUIT
+    event is sent up front, so PyBoy's frame loop gives up at the first
+    breakpoint instead of handling it.  The hook on 0x0100 is therefore
+    never called: the boot ticks stop on its BRK with PyBoy's breakpoint
+    single-step still latched.  Once the hook is removed, every ``tick()``
+    executes exactly one instruction.
+    """
+
+    BOOT_FRAMES = 600               # the boot ROM takes about 60
+    HALT_TICKS = 70224 // 4         # a halted tick idles 4 cycles; cap at a frame
+
+    def __init__(self, rom_path):
+        from pyboy import PyBoy                 # optional dependency
+        from pyboy.utils import WindowEvent
+
+        version = metadata.version("pyboy")
+        if version.split(".")[0] != "2":
+            raise RuntimeError(f"PyBoyBackend needs PyBoy 2.x, not {version}")
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        # sound emulation on, so the APU registers read back like hardware
+        self._py = PyBoy(rom_path, window="null", sound_emulated=True, no_input=True)
+        self._py.set_emulation_speed(0)
+        self._rf = self._py.register_file
+        self.halted = False
+
+        self._py.send_input(WindowEvent.QUIT)
+        self._py.hook_register(0, 0x0100, None, None)
+        for _ in range(self.BOOT_FRAMES):
+            self._tick()
+            if self._rf.PC == 0x0100:
+                break
+        else:
+            self._py.stop(save=False)
+            raise RuntimeError("PyBoy never reached 0x0100")
+        self._py.hook_deregister(0, 0x0100)
+
+    def _tick(self):
+        self._py.tick(1, False, False)
+
+    def step(self):
+        pc = self._rf.PC
+        self._tick()
+        if self.halted:
+            for _ in range(self.HALT_TICKS):
+                if self._rf.PC != pc:
+                    break
+                self._tick()
+        # PyBoy leaves PC on the HALT until an interrupt wakes it
+        self.halted = self._rf.PC == pc and self._py.memory[pc] == 0x76
+
+    def registers(self):
+        rf = self._rf
+        hl = rf.HL
+        return {"A": rf.A, "F": rf.F, "B": rf.B, "C": rf.C, "D": rf.D, "E": rf.E,
+                "H": hl >> 8, "L": hl & 0xFF, "SP": rf.SP, "PC": rf.PC}
+
+    def read_memory(self, start, end):
+        return bytes(self._py.memory[start:end])
+
+    def close(self):
+        self._py.stop()
+
+
+# ───────────── golden traces ─────────────
+class TraceBackend(ReferenceBackend):
+    def __init__(self, path):
+        with np.load(path) as data:
+            self._regs = data["regs"]
+            self._halted = data["halted"]
+            self._mem = [(int(lo), int(hi), data[f"mem{i}"])
+                         for i, (lo, hi) in enumerate(data["ranges"])]
+        self.index = 0
+
+    def __len__(self):
+        return len(self._regs) - 1             # recorded steps
+
+    @property
+    def halted(self):
+        return bool(self._halted[self.index])
+
+    def step(self):
+        if self.index >= len(self):
+            raise EOFError("Golden trace exhausted")
+        self.index += 1
+
+    def registers(self):
+        return dict(zip(REGISTERS, self._regs[self.index].tolist()))
+
+    def read_memory(self, start, end):
+        for lo, hi, rows in self._mem:
+            if lo <= start <= end <= hi:
+                return rows[self.index, start - lo:end - lo].tobytes()
+        raise ValueError(f"Range {hex(start)}–{hex(end)} was not recorded")
+
+
+def record(backend, path, steps, ranges=RECORDED_RANGES):
+    """Step *backend* *steps* times and save everything as a golden trace."""
+    regs = np.zeros((steps + 1, len(REGISTERS)), np.uint16)
+    halted = np.zeros(steps + 1, bool)
+    mem = [np.zeros((steps + 1, hi - lo), np.uint8) for lo, hi in ranges]
+    for i in range(steps + 1):
+        if i:
+            backend.step()
+        values = backend.registers()
+        regs[i] = [values[name] for name in REGISTERS]
+        halted[i] = backend.halted
+        for rows, (lo, hi) in zip(mem, ranges):
+            rows[i] = np.frombuffer(backend.read_memory(lo, hi), np.uint8)
+    with open(path, "wb") as f:
+        np.savez_compressed(f, regs=regs, halted=halted,
+                            ranges=np.array(ranges, np.uint32),
+                            **{f"mem{i}": rows for i, rows in enumerate(mem)})
+
+
+def open_reference(rom_path, trace_path=None):
+    """Replay *trace_path* if given, else run PyBoy on *rom_path*."""
+    if trace_path is not None:
+        return TraceBackend(trace_path)
+    return PyBoyBackend(rom_path)
+
+
+# ───────────── main ─────────────
+def main():
+    if len(sys.argv) < 3:
+        print("usage: reference.py <rom.gb> <out.npz> [steps]")
+        sys.exit(1)
+    steps = int(sys.argv[3]) if len(sys.argv) > 3 else 5_000
+    with PyBoyBackend(sys.argv[1]) as backend:
+        record(backend, sys.argv[2], steps)
+
+
+if __name__ == "__main__":
+    main()
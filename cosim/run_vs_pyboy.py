@@ -1,91 +1,41 @@
 #!/usr/bin/env python3
 """
 cosim/run_vs_pyboy.py
-Run your generated CPU core and PyBoy side‑by‑side on the same ROM and
-log all mismatches for a fixed number of instructions (default 5000).
+Run your generated CPU core and PyBoy side‑by‑side on the same ROM for a
+fixed number of instructions (default 5000), record both as binary traces
+(cosim/trace.py) with HRAM changes as the memory‑write log, then diff them.
 
 Usage
 -----
-    python cosim/run_vs_pyboy.py <rom.gb> [max_steps]
+    python cosim/run_vs_pyboy.py <rom.gb> [max_steps] [golden.npz]
+
+With a golden trace (see cosim/reference.py) the reference side is a
+replay of that trace instead of a live PyBoy.  The two traces are left in
+``run_vs_pyboy.ref.trace`` / ``run_vs_pyboy.dut.trace`` next to this
+script; the first mismatches and a count are printed.
 """
 
-import pathlib, os, sys
-from types import SimpleNamespace
-from contextlib import redirect_stdout   # ← new import
+import pathlib, sys
+
+import numpy as np
 
 # make repo root import‑searchable
 sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
 
-from pyboy import PyBoy
+from cosim.reference import open_reference
+from cosim.trace import TraceWriter, diff, format_mismatch
 from generated.cpu import CPU
+from generated.memory import Memory
+from generated.cartridge import Cartridge
+
+MAX_REPORTS = 50
+HRAM = (0xFF80, 0xFFFF)
+
 
-# ───────────── helpers (unchanged) ─────────────
-#  ...  everything up to the bottom of the file is exactly as you have it ...
-#  keep all your definitions of pyboy_regs, cpu_regs, diff_regs, decode_one,
-#  and main() exactly the same.
-# ---------------------------------------------------------------------------
-
-def pyboy_regs(pb):
-    rf = pb.register_file if hasattr(pb, "register_file") else pb.cpu
-    return SimpleNamespace(
-        A=lambda: rf.A,  F=lambda: rf.F,
-        B=lambda: rf.B,  C=lambda: rf.C,
-        D=lambda: rf.D,  E=lambda: rf.E,
-        H=lambda: (rf.HL >> 8) & 0xFF if not hasattr(rf, "H") else rf.H,
-        L=lambda: rf.HL & 0xFF       if not hasattr(rf, "L") else rf.L,
-        SP=lambda: rf.SP, PC=lambda: rf.PC,
-    )
-
-
-def cpu_regs(cpu):
-    def _r8(n):
-        if hasattr(cpu, n): return getattr(cpu, n)
-        pairs = {"B": ("BC", 8), "C": ("BC", 0),
-                 "D": ("DE", 8), "E": ("DE", 0),
-                 "H": ("HL", 8), "L": ("HL", 0)}
-        if n in pairs and hasattr(cpu, pairs[n][0]):
-            pair, sh = pairs[n]; return (getattr(cpu, pair) >> sh) & 0xFF
-        return 0
-
-    def _r16(n): return getattr(cpu, n, 0)
-
-    return SimpleNamespace(
-        A=lambda: _r8("A"), F=lambda: _r8("F"),
-        B=lambda: _r8("B"), C=lambda: _r8("C"),
-        D=lambda: _r8("D"), E=lambda: _r8("E"),
-        H=lambda: _r8("H"), L=lambda: _r8("L"),
-        SP=lambda: _r16("SP"), PC=lambda: _r16("PC"),
-    )
-
-
-def diff_regs(step, ref, dut):
-    mismatch = False
-    for r in ("A","F","B","C","D","E","H","L","SP","PC"):
-        vr, vd = getattr(ref,r)(), getattr(dut,r)()
-        if vr != vd:
-            print(f"step {step:05d}: {r} ref={vr:02X} dut={vd:02X}")
-            mismatch = True
-    return mismatch
-
-
-def decode_one(rom, pc):
-    op = rom[pc]
-    if op == 0xC3:
-        lo, hi = rom[pc+1], rom[pc+2]
-        return {"mnemonic":"JP_a16","operand":lo|(hi<<8)}, 3
-    if op == 0x3E:
-        return {"mnemonic":"LD_A_n8","operand":rom[pc+1]}, 2
-    if op == 0xD6:
-        return {"mnemonic":"SUB_A_n8","operand":rom[pc+1]}, 2
-    if op == 0xE0:
-        return {"mnemonic":"LD_n8_A_ptr","operand":rom[pc+1]}, 2
-    if op == 0xF0:
-        return {"mnemonic":"LD_A_n8_ptr","operand":rom[pc+1]}, 2
-    if op == 0xC6:
-        return {"mnemonic":"ADD_A_n8","operand":rom[pc+1]}, 2
-    if op == 0x76:
-        return {"mnemonic":"HALT"}, 1
-    return {"mnemonic":f"UNIMPL_{op:02X}"}, 1
+def log_changes(trace, before, after, base):
+    # HRAM bytes that changed this step, as write‑log entries
+    for i in np.flatnonzero(np.frombuffer(before, np.uint8) != np.frombuffer(after, np.uint8)):
+        trace.log_write(base + int(i), after[i])
 
 
 # ───────────── main ─────────────
@@ -93,73 +43,71 @@ def decode_one(rom, pc):
 
 def main():
     if len(sys.argv) < 2:
-        print("usage: run_vs_pyboy.py <rom.gb> [max_steps]")
+        print("usage: run_vs_pyboy.py <rom.gb> [max_steps] [golden.npz]")
         sys.exit(1)
 
     rom_path = sys.argv[1]
     max_steps = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    trace_path = sys.argv[3] if len(sys.argv) > 3 else None
+    out = pathlib.Path(__file__).with_name("run_vs_pyboy")
+    ref_out, dut_out = out.with_suffix(".ref.trace"), out.with_suffix(".dut.trace")
 
-    # headless PyBoy
-    os.environ["SDL_VIDEODRIVER"] = "dummy"
-    py = PyBoy(rom_path, window="null", sound_emulated=False, no_input=True)
-    ref = pyboy_regs(py)
+    # reference: headless PyBoy, or a replay of its golden trace
+    ref = open_reference(rom_path, trace_path)
 
     # DUT
-    rom = pathlib.Path(rom_path).read_bytes()
-    cpu = CPU()
-    dut = cpu_regs(cpu)
-    cpu.PC = 0x0100
-
-    ref_halted = False           # True after PyBoy executes HALT
-    ticks_used, mismatches = 0, 0
-
-    for step in range(max_steps):
-        pc_start = ref.PC()
-
-        # ── advance PyBoy one instruction (unless already halted) ──
-        if not ref_halted:
-            instr_ticks = 0
-            while ref.PC() == pc_start:
-                py.tick()
-                ticks_used += 1
-                instr_ticks += 1
-                if instr_ticks > 300:
-                    ref_halted = True    # treat as halted stall
-                    break
-
-        # ── decode & execute on DUT ──
-        ins, length = decode_one(rom, pc_start)
-        if ins["mnemonic"] == "JP_a16":
-            cpu.PC = ins["operand"]
-        elif ins["mnemonic"].startswith("UNIMPL_"):
-            cpu.PC = (cpu.PC + length) & 0xFFFF
-        else:
-            cpu.step(ins)
-        if dut.PC() == pc_start:
-            cpu.PC = (cpu.PC + length) & 0xFFFF
-
-        # ── compare ──
-        if diff_regs(step, ref, dut):
-            mismatches += 1
-
-        ram_ref = py.memory[0xFF90] if hasattr(py,"memory") \
-                  else py.get_memory_value(0xFF90)
-        if cpu.ram[0x10] != ram_ref:
-            print(f"step {step:05d}: HRAM[10] ref={ram_ref:02X} "
-                  f"dut={cpu.ram[0x10]:02X}")
-            mismatches += 1
-
-        # check if PyBoy just executed HALT
-        if not ref_halted and ins["mnemonic"] == "HALT":
-            ref_halted = True
-
-    py.stop()
-    print(f"\nCompleted {max_steps} steps, {ticks_used} PyBoy ticks, "
-          f"mismatches={mismatches}")
+    # battery RAM stays in memory so PyBoy's save file is left alone
+    mem = Memory(cartridge=Cartridge.from_file(rom_path, battery=False))
+    cpu = CPU(memory=mem)
+    regs = cpu.registers
+    # both sides start from the reference's post-boot state at 0x0100
+    for name, value in ref.registers().items():
+        setattr(cpu, name, value)
+
+    ram_ref = ref.read_memory(*HRAM)
+    ram_dut = bytes(mem.read_block(*HRAM))
+
+    with TraceWriter(ref_out) as ref_trace, TraceWriter(dut_out) as dut_trace:
+        for step in range(max_steps):
+            # ── advance the reference one instruction ──
+            try:
+                ref.step()
+            except EOFError:
+                print(f"step {step:05d}: golden trace exhausted")
+                break
+
+            # ── fetch, decode & execute on DUT ──
+            opcode = mem.read(cpu.PC)
+            try:
+                cpu.step()
+            except ValueError:
+                print(f"step {step:05d}: UNIMPL_{opcode:02X} at {cpu.PC:04X}")
+                cpu.PC = (cpu.PC + 1) & 0xFFFF
+
+            # ── record ──
+            r = ref.registers()
+            ref_trace.append(r["PC"], r["A"], r["B"], r["C"], r["D"], r["E"],
+                             r["H"], r["L"], r["F"], r["SP"])
+            dut_trace.append(regs.PC, regs.A, regs.B, regs.C, regs.D, regs.E,
+                             regs.H, regs.L, regs.F, regs.SP, mem.scheduler.cycles)
+
+            new_ref, new_dut = ref.read_memory(*HRAM), bytes(mem.read_block(*HRAM))
+            if new_ref != ram_ref:
+                log_changes(ref_trace, ram_ref, new_ref, HRAM[0])
+            if new_dut != ram_dut:
+                log_changes(dut_trace, ram_dut, new_dut, HRAM[0])
+            ram_ref, ram_dut = new_ref, new_dut
+        steps = ref_trace.steps
+    ref.close()
+
+    # ── compare (a = reference, b = DUT) ──
+    mismatches = 0
+    for m in diff(ref_out, dut_out):
+        if mismatches < MAX_REPORTS:
+            print(format_mismatch(m))
+        mismatches += 1
+    print(f"\nCompleted {steps} steps, mismatches={mismatches}")
 
 
 if __name__ == "__main__":
-    # create/open the output file next to this script
-    out_path = pathlib.Path(__file__).with_name("output_run_vs_pyboy.txt")
-    with out_path.open("w", encoding="utf‑8") as fout, redirect_stdout(fout):
-        main()
\ No newline at end of file
+    main()
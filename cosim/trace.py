@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+cosim/trace.py
+Compact binary execution traces and a streaming diff between two of them.
+
+A trace is one fixed-width record per executed instruction plus an optional
+log of memory writes, stored in independently zlib-compressed chunks:
+
+    b"S2TR" | version u16 | records per chunk u32
+    per chunk: n records u32 | packed records length u32 | writes length u32
+               zlib(records) | zlib(writes)
+
+    record   PC u16, A B C D E H L F u8, SP u16, cycle u64      (20 bytes)
+    write    step u32, addr u16, val u8                         (7 bytes)
+
+``diff`` reads both traces a chunk at a time and compares each pair of
+chunks as whole NumPy arrays; only chunks that differ are walked record by
+record.
+
+Usage
+-----
+    python cosim/trace.py <a.trace> <b.trace> [max_reports]
+"""
+
+import struct
+import sys
+import zlib
+from collections import namedtuple
+from itertools import zip_longest
+
+import numpy as np
+
+MAGIC = b"S2TR"
+VERSION = 1
+CHUNK_RECORDS = 1 << 16
+_HEADER = struct.Struct("<4sHI")
+_CHUNK = struct.Struct("<III")
+
+RECORD = np.dtype([
+    ("PC", "<u2"), ("A", "u1"), ("B", "u1"), ("C", "u1"), ("D", "u1"),
+    ("E", "u1"), ("H", "u1"), ("L", "u1"), ("F", "u1"), ("SP", "<u2"),
+    ("cycle", "<u8"),
+])
+WRITE = np.dtype([("step", "<u4"), ("addr", "<u2"), ("val", "u1")])
+
+# compared by default; cycle counts only line up between two runs of our
+# own core, not against a reference that cannot report them
+REGISTER_FIELDS = ("PC", "A", "B", "C", "D", "E", "H", "L", "F", "SP")
+
+Mismatch = namedtuple("Mismatch", "step field a b")
+
+
+class TraceWriter:
+    def __init__(self, path, chunk_records=CHUNK_RECORDS):
+        self.chunk_records = chunk_records
+        self.steps = 0                  # records appended so far
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, chunk_records))
+        self._records = []
+        self._writes = []
+
+    def append(self, pc, a, b, c, d, e, h, l, f, sp, cycle=0):
+        """Add the state after one instruction (fields in ``RECORD`` order)."""
+        if len(self._records) == self.chunk_records:
+            self._flush()               # only now, so the last step keeps its writes
+        self._records.append((pc, a, b, c, d, e, h, l, f, sp, cycle))
+        self.steps += 1
+
+    def log_write(self, addr, val):
+        """Record a memory write made by the latest appended instruction."""
+        self._writes.append((self.steps - 1, addr, val))
+
+    def _flush(self):
+        if not self._records:
+            return
+        records = zlib.compress(np.array(self._records, RECORD).tobytes(), 1)
+        writes = zlib.compress(np.array(self._writes, WRITE).tobytes(), 1)
+        self._file.write(_CHUNK.pack(len(self._records), len(records), len(writes)))
+        self._file.write(records)
+        self._file.write(writes)
+        self._records, self._writes = [], []
+
+    def close(self):
+        if not self._file.closed:
+            self._flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TraceReader:
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        magic, version, self.chunk_records = _HEADER.unpack(self._file.read(_HEADER.size))
+        if magic != MAGIC:
+            self._file.close()
+            raise ValueError(f"{path} is not a trace")
+        if version != VERSION:
+            self._file.close()
+            raise ValueError(f"Unsupported trace version {version}")
+
+    def __iter__(self):
+        """Yield ``(first step, records, writes)`` for each chunk."""
+        step = 0
+        while True:
+            header = self._file.read(_CHUNK.size)
+            if not header:
+                return
+            n, rec_len, wr_len = _CHUNK.unpack(header)
+            records = np.frombuffer(zlib.decompress(self._file.read(rec_len)), RECORD)
+            writes = np.frombuffer(zlib.decompress(self._file.read(wr_len)), WRITE)
+            yield step, records, writes
+            step += n
+
+    def skip_rest(self):
+        """Count the records left after the current chunk without inflating them."""
+        total = 0
+        while True:
+            header = self._file.read(_CHUNK.size)
+            if not header:
+                return total
+            n, rec_len, wr_len = _CHUNK.unpack(header)
+            self._file.seek(rec_len + wr_len, 1)
+            total += n
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def diff(path_a, path_b, fields=REGISTER_FIELDS, writes=True):
+    """
+    Yield a ``Mismatch`` for every differing field of every step (plus the
+    write logs when *writes*), in step order, then one ``"length"``
+    mismatch if the traces stop at different steps.
+    """
+    fields = list(fields)
+    with TraceReader(path_a) as ra, TraceReader(path_b) as rb:
+        if ra.chunk_records != rb.chunk_records:
+            raise ValueError("Traces were written with different chunk sizes")
+        for chunk_a, chunk_b in zip_longest(ra, rb):
+            if chunk_a is None or chunk_b is None:
+                step, records, _ = chunk_a or chunk_b
+                a_len = step + len(records) + ra.skip_rest() if chunk_a else step
+                b_len = step + len(records) + rb.skip_rest() if chunk_b else step
+                yield Mismatch(step, "length", a_len, b_len)
+                return
+            step, rec_a, wr_a = chunk_a
+            _, rec_b, wr_b = chunk_b
+            n = min(len(rec_a), len(rec_b))
+            found = []
+            view_a, view_b = rec_a[fields][:n], rec_b[fields][:n]
+            if not np.array_equal(view_a, view_b):
+                for i in np.flatnonzero(view_a != view_b).tolist():
+                    row_a, row_b = rec_a[i], rec_b[i]
+                    found += [Mismatch(step + i, f, int(row_a[f]), int(row_b[f]))
+                              for f in fields if row_a[f] != row_b[f]]
+            if len(rec_a) != len(rec_b):            # the tail is a length mismatch
+                wr_a = wr_a[wr_a["step"] < step + n]
+                wr_b = wr_b[wr_b["step"] < step + n]
+            if writes and wr_a.tobytes() != wr_b.tobytes():
+                found += _diff_writes(wr_a, wr_b)
+            found.sort(key=lambda m: m.step)
+            yield from found
+            if len(rec_a) != len(rec_b):
+                yield Mismatch(step + n, "length",
+                               step + len(rec_a) + ra.skip_rest(),
+                               step + len(rec_b) + rb.skip_rest())
+                return
+
+
+def _diff_writes(wr_a, wr_b):
+    # both logs are in step order: one array compare finds where they part,
+    # then each later step is sliced out of both by binary search
+    n = min(len(wr_a), len(wr_b))
+    differ = np.flatnonzero(wr_a[:n] != wr_b[:n])
+    if len(differ):
+        i = int(differ[0])
+    elif len(wr_a) == len(wr_b):
+        return []
+    else:
+        i = n
+    first = min(int(log["step"][i]) for log in (wr_a, wr_b) if i < len(log))
+    wr_a = wr_a[np.searchsorted(wr_a["step"], first):]
+    wr_b = wr_b[np.searchsorted(wr_b["step"], first):]
+    found = []
+    for step in np.union1d(wr_a["step"], wr_b["step"]).tolist():
+        a = wr_a[np.searchsorted(wr_a["step"], step):np.searchsorted(wr_a["step"], step, "right")]
+        b = wr_b[np.searchsorted(wr_b["step"], step):np.searchsorted(wr_b["step"], step, "right")]
+        if a.tobytes() != b.tobytes():
+            found.append(Mismatch(step, "writes",
+                                  list(zip(a["addr"].tolist(), a["val"].tolist())),
+                                  list(zip(b["addr"].tolist(), b["val"].tolist()))))
+    return found
+
+
+def format_mismatch(m):
+    if m.field == "length":
+        return f"step {m.step:07d}: trace length a={m.a} b={m.b}"
+    if m.field == "writes":
+        a, b = (" ".join(f"{addr:04X}={val:02X}" for addr, val in log) for log in (m.a, m.b))
+        return f"step {m.step:07d}: writes a=[{a}] b=[{b}]"
+    width = 4 if m.field in ("PC", "SP") else 2
+    return f"step {m.step:07d}: {m.field} a={m.a:0{width}X} b={m.b:0{width}X}"
+
+
+# ───────────── main ─────────────
+def main():
+    if len(sys.argv) < 3:
+        print("usage: trace.py <a.trace> <b.trace> [max_reports]")
+        sys.exit(1)
+    limit = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    count = 0
+    for m in diff(sys.argv[1], sys.argv[2]):
+        if count < limit:
+            print(format_mismatch(m))
+        count += 1
+    print(f"{count} mismatches")
+
+
+if __name__ == "__main__":
+    main()
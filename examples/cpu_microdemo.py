@@ -33,7 +33,7 @@ def main():
     print("PC:", cpu.registers["PC"])
     print("IME:", cpu.IME)
     print("RAM[10]:", cpu.ram[10])
-    print("Stack:", cpu.stack)
+    print("SP:", cpu.registers["SP"])
 
 if __name__ == "__main__":
     main()
@@ -48,7 +48,7 @@ def main():
     print(f"VRAM write/read test passed at {vram_addr:#06x} with value {vram_val:#04x}")
 
     # --- Task 4: Test writing outside any writable region ---
-    illegal_addr = 0xFFFF  # Assuming this is outside writable memory
+    illegal_addr = 0xFEA0  # unusable gap between OAM and I/O
     try:
         mem.write(illegal_addr, 0x01)
         print("ERROR: Write outside writable regions should have failed but didn't!")
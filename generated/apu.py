@@ -1,24 +1,339 @@
-class APU:
+"""
+Four-channel APU (square 1/2, wave, noise) synthesised in blocks.
+
+Nothing runs per sample.  Output is produced lazily: whenever a register is
+written, a frame-sequencer step fires or a consumer drains audio, every
+sample since the last sync is generated at once with NumPy from the channel
+state that held over that segment.  Samples are point-sampled at
+``SAMPLE_RATE`` (one per 128 CPU cycles) into a preallocated stereo int16
+ring buffer.
+
+``muted`` skips synthesis entirely; the frame sequencer (length, sweep,
+envelope) keeps running on the scheduler so channel status stays exact.
+"""
+import numpy as np
+
+from .scheduler import Scheduler
+
+DUTY_WAVES = np.array([
+    [0, 0, 0, 0, 0, 0, 0, 1],       # 12.5 %
+    [1, 0, 0, 0, 0, 0, 0, 1],       # 25 %
+    [1, 0, 0, 0, 0, 1, 1, 1],       # 50 %
+    [0, 1, 1, 1, 1, 1, 1, 0],       # 75 %
+], np.int32)
+NOISE_DIVISORS = (8, 16, 32, 48, 64, 80, 96, 112)
+WAVE_SHIFTS = (4, 0, 1, 2)          # NR32 output level → right shift
+
+# bits that read back as 1 (write-only or unused); wave RAM reads as written
+READ_MASKS = {
+    0xFF10: 0x80, 0xFF11: 0x3F, 0xFF12: 0x00, 0xFF13: 0xFF, 0xFF14: 0xBF,
+    0xFF15: 0xFF, 0xFF16: 0x3F, 0xFF17: 0x00, 0xFF18: 0xFF, 0xFF19: 0xBF,
+    0xFF1A: 0x7F, 0xFF1B: 0xFF, 0xFF1C: 0x9F, 0xFF1D: 0xFF, 0xFF1E: 0xBF,
+    0xFF1F: 0xFF, 0xFF20: 0xFF, 0xFF21: 0x00, 0xFF22: 0x00, 0xFF23: 0xBF,
+    0xFF24: 0x00, 0xFF25: 0x00, 0xFF26: 0x70,
+}
+
+_LFSR_SEQUENCES = {}
+
+
+def lfsr_sequence(short):
+    """One full period of noise output bits (127 for 7-bit mode, else 32767)."""
+    seq = _LFSR_SEQUENCES.get(short)
+    if seq is None:
+        lfsr, out = 0x7FFF, []
+        for _ in range(127 if short else 32767):
+            bit = (lfsr ^ (lfsr >> 1)) & 1
+            lfsr = (lfsr >> 1) | (bit << 14)
+            if short:
+                lfsr = (lfsr & ~0x40) | (bit << 6)
+            out.append(~lfsr & 1)
+        seq = _LFSR_SEQUENCES[short] = np.array(out, np.int32)
+    return seq
+
+
+class _Channel:
+    __slots__ = ("enabled", "dac", "length", "volume", "env_timer",
+                 "freq", "step", "origin", "base",
+                 "sweep_timer", "sweep_enabled", "shadow")
+
     def __init__(self):
+        self.enabled = self.dac = False
+        self.length = self.volume = self.env_timer = 0
+        self.freq = 0
+        self.step = 1               # cycles per waveform position
+        self.origin = 0             # cycle at which the position was ``base``
+        self.base = 0
+        self.sweep_timer = 0
+        self.sweep_enabled = False
+        self.shadow = 0
+
+    def position(self, cycle):
+        return self.base + (cycle - self.origin) // self.step
+
+    def rebase(self, cycle, step):
+        self.base = self.position(cycle)
+        self.origin = cycle
+        self.step = step
+
+
+class APU:
+    SAMPLE_RATE = 32768
+    CYCLES_PER_SAMPLE = 128                 # 4194304 Hz / 32768 Hz
+    FRAME_SEQUENCER_PERIOD = 8192           # 512 Hz
+    BUFFER_SAMPLES = 1 << 15                # ring capacity, ~1 s
+
+    def __init__(self, scheduler=None):
+        # standalone APUs get a private clock driven by step()
+        self.scheduler = scheduler if scheduler is not None else Scheduler()
+        self.muted = False
+        self.buffer = np.zeros((self.BUFFER_SAMPLES, 2), np.int16)
         self.reset()
 
     def reset(self):
         # Initialize all APU registers to 0
-        # NR10–NR14, NR52, and wave RAM 0xFF30–0xFF3F
-        self.registers = {
-            0xFF10: 0, 0xFF11: 0, 0xFF12: 0, 0xFF13: 0, 0xFF14: 0,  # NR10–NR14
-            0xFF26: 0,  # NR52 - sound on/off
-        }
+        # NR10–NR52 (0xFF10–0xFF26) and wave RAM 0xFF30–0xFF3F
+        self.registers = {addr: 0 for addr in range(0xFF10, 0xFF27)}
         # Wave RAM 0xFF30–0xFF3F (16 bytes)
         for addr in range(0xFF30, 0xFF40):
             self.registers[addr] = 0
+        self.channels = [_Channel() for _ in range(4)]
+        self._sequencer_step = 0
+        self._synced = self.scheduler.cycles
+        self.clear_buffer()
+        self.scheduler.cancel("apu")
 
+    # ---------------------------------------------------------
+    # registers
+    # ---------------------------------------------------------
     def read(self, addr: int) -> int:
+        if addr == 0xFF26:
+            status = sum(1 << i for i, ch in enumerate(self.channels) if ch.enabled)
+            return (self.registers[0xFF26] & 0x80) | READ_MASKS[0xFF26] | status
         # Return value if known, else 0xFF
-        return self.registers.get(addr, 0xFF)
+        return self.registers.get(addr, 0xFF) | READ_MASKS.get(addr, 0)
 
     def write(self, addr: int, value: int):
-        # Store the value if it's a known register
-        if addr in self.registers:
-            self.registers[addr] = value
         # Ignore writes to unknown addresses (no error)
+        if addr not in self.registers:
+            return
+        self.sync()
+        self.registers[addr] = value
+        if addr == 0xFF26:
+            self._write_power(value)
+        elif addr <= 0xFF23 and addr not in (0xFF15, 0xFF1F):
+            index, reg = divmod(addr - 0xFF10, 5)
+            self._write_channel(index, reg, value)
+
+    def _write_power(self, value):
+        now = self.scheduler.cycles
+        if value & 0x80 and self.scheduler.pending("apu") is None:
+            self._sequencer_step = 0
+            self.scheduler.schedule("apu", now + self.FRAME_SEQUENCER_PERIOD,
+                                    self._on_frame_step)
+        elif not value & 0x80:
+            for addr in range(0xFF10, 0xFF26):
+                self.registers[addr] = 0
+            self.channels = [_Channel() for _ in range(4)]
+            self.scheduler.cancel("apu")
+
+    def _write_channel(self, index, reg, value):
+        ch = self.channels[index]
+        if reg == 1:
+            ch.length = (256 if index == 2 else 64) - (value if index == 2 else value & 0x3F)
+        elif (reg == 2 and index != 2) or (reg == 0 and index == 2):
+            ch.dac = bool(value & 0x80) if index == 2 else bool(value & 0xF8)
+            if not ch.dac:
+                ch.enabled = False
+        elif reg == 3:
+            if index != 3:
+                ch.freq = (ch.freq & 0x700) | value
+            ch.rebase(self.scheduler.cycles, self._step_cycles(index))
+        elif reg == 4:
+            if index != 3:
+                ch.freq = (ch.freq & 0xFF) | (value & 0x07) << 8
+                ch.rebase(self.scheduler.cycles, self._step_cycles(index))
+            if value & 0x80:
+                self._trigger(index)
+
+    def _trigger(self, index):
+        ch = self.channels[index]
+        base = 0xFF10 + index * 5
+        ch.enabled = ch.dac
+        if ch.length == 0:
+            ch.length = 256 if index == 2 else 64
+        if index != 2:
+            nrx2 = self.registers[base + 2]
+            ch.volume = nrx2 >> 4
+            ch.env_timer = nrx2 & 0x07
+        ch.base, ch.origin = 0, self.scheduler.cycles
+        ch.step = self._step_cycles(index)
+        if index == 0:
+            nr10 = self.registers[0xFF10]
+            ch.shadow = ch.freq
+            ch.sweep_timer = (nr10 >> 4) & 0x07 or 8
+            ch.sweep_enabled = bool(nr10 & 0x77)
+            if nr10 & 0x07:
+                self._sweep_frequency()
+
+    def _step_cycles(self, index):
+        ch = self.channels[index]
+        if index == 3:
+            nr43 = self.registers[0xFF22]
+            return NOISE_DIVISORS[nr43 & 0x07] << (nr43 >> 4)
+        return (2048 - ch.freq) * (2 if index == 2 else 4)
+
+    # ---------------------------------------------------------
+    # frame sequencer
+    # ---------------------------------------------------------
+    def step(self, cycles):
+        """Standalone use: advance the APU's clock by *cycles*."""
+        self.scheduler.advance(cycles)
+
+    def _on_frame_step(self, cycle):
+        self.sync(cycle)
+        step = self._sequencer_step
+        if not step & 1:                            # 256 Hz: length
+            for index, ch in enumerate(self.channels):
+                if self.registers[0xFF14 + index * 5] & 0x40 and ch.length:
+                    ch.length -= 1
+                    if not ch.length:
+                        ch.enabled = False
+        if step in (2, 6):                          # 128 Hz: sweep
+            self._clock_sweep(cycle)
+        if step == 7:                               # 64 Hz: envelope
+            for index in (0, 1, 3):
+                self._clock_envelope(index)
+        self._sequencer_step = (step + 1) & 7
+        self.scheduler.schedule("apu", cycle + self.FRAME_SEQUENCER_PERIOD,
+                                self._on_frame_step)
+
+    def _clock_envelope(self, index):
+        ch = self.channels[index]
+        nrx2 = self.registers[0xFF12 + index * 5]
+        period = nrx2 & 0x07
+        if not period or not ch.env_timer:
+            return
+        ch.env_timer -= 1
+        if not ch.env_timer:
+            ch.env_timer = period
+            if nrx2 & 0x08 and ch.volume < 15:
+                ch.volume += 1
+            elif not nrx2 & 0x08 and ch.volume > 0:
+                ch.volume -= 1
+
+    def _clock_sweep(self, cycle):
+        ch = self.channels[0]
+        nr10 = self.registers[0xFF10]
+        ch.sweep_timer -= 1
+        if ch.sweep_timer > 0:
+            return
+        ch.sweep_timer = (nr10 >> 4) & 0x07 or 8
+        if ch.sweep_enabled and nr10 & 0x70:
+            freq = self._sweep_frequency()
+            if freq <= 2047 and nr10 & 0x07:
+                ch.shadow = ch.freq = freq
+                self.registers[0xFF13] = freq & 0xFF
+                self.registers[0xFF14] = (self.registers[0xFF14] & ~0x07) | freq >> 8
+                ch.rebase(cycle, self._step_cycles(0))
+                self._sweep_frequency()
+
+    def _sweep_frequency(self):
+        # next sweep target; an overflow past 2047 silences channel 1
+        ch = self.channels[0]
+        nr10 = self.registers[0xFF10]
+        delta = ch.shadow >> (nr10 & 0x07)
+        freq = ch.shadow - delta if nr10 & 0x08 else ch.shadow + delta
+        if freq > 2047:
+            ch.enabled = False
+        return freq
+
+    # ---------------------------------------------------------
+    # synthesis
+    # ---------------------------------------------------------
+    def sync(self, now=None):
+        """Generate every sample between the last sync and *now*."""
+        if now is None:
+            now = self.scheduler.cycles
+        if now <= self._synced:
+            return
+        start, self._synced = self._synced, now
+        per = self.CYCLES_PER_SAMPLE
+        first = -(-start // per) * per              # first sample cycle ≥ start
+        if self.muted or now <= first:
+            return
+        t = np.arange(first, now, per, dtype=np.int64)
+        self._push(self._mix(t))
+
+    def _mix(self, t):
+        out = np.zeros((len(t), 2), np.int16)
+        if not self.registers[0xFF26] & 0x80:
+            return out
+        left = np.zeros(len(t), np.int32)
+        right = np.zeros(len(t), np.int32)
+        nr51 = self.registers[0xFF25]
+        for index, ch in enumerate(self.channels):
+            if not ch.enabled or not nr51 & (0x11 << index):
+                continue
+            wave = self._channel_wave(index, ch, t)
+            if nr51 & (0x10 << index):
+                left += wave
+            if nr51 & (0x01 << index):
+                right += wave
+        nr50 = self.registers[0xFF24]
+        out[:, 0] = left * ((((nr50 >> 4) & 0x07) + 1) * 64)
+        out[:, 1] = right * (((nr50 & 0x07) + 1) * 64)
+        return out
+
+    def _channel_wave(self, index, ch, t):
+        # 0‑15 amplitude of one channel at sample cycles *t*
+        pos = ch.base + (t - ch.origin) // ch.step
+        if index < 2:
+            duty = self.registers[0xFF11 + index * 5] >> 6
+            return DUTY_WAVES[duty][pos & 7] * ch.volume
+        if index == 2:
+            ram = np.array([self.registers[a] for a in range(0xFF30, 0xFF40)], np.int32)
+            samples = np.stack((ram >> 4, ram & 0x0F), axis=1).reshape(32)
+            return samples[pos & 31] >> WAVE_SHIFTS[(self.registers[0xFF1C] >> 5) & 3]
+        seq = lfsr_sequence(bool(self.registers[0xFF22] & 0x08))
+        return seq[pos % len(seq)] * ch.volume
+
+    # ---------------------------------------------------------
+    # ring buffer
+    # ---------------------------------------------------------
+    def _push(self, block):
+        cap = self.BUFFER_SAMPLES
+        if len(block) > cap:
+            self.dropped_samples += len(block) - cap
+            block = block[-cap:]
+        n = len(block)
+        pos = self._write_pos
+        head = min(n, cap - pos)
+        self.buffer[pos:pos + head] = block[:head]
+        self.buffer[:n - head] = block[head:]
+        self._write_pos = (pos + n) % cap
+        self.samples_available += n
+        if self.samples_available > cap:            # overwrite the oldest
+            over = self.samples_available - cap
+            self.dropped_samples += over
+            self._read_pos = (self._read_pos + over) % cap
+            self.samples_available = cap
+
+    def clear_buffer(self):
+        self._read_pos = self._write_pos = 0
+        self.samples_available = 0
+        self.dropped_samples = 0            # overwritten before being drained
+
+    def drain(self, max_samples=None):
+        """
+        Return (and consume) buffered samples as an ``(n, 2)`` int16 array,
+        oldest first.  Meant to be called once per video frame.
+        """
+        self.sync()
+        n = self.samples_available
+        if max_samples is not None:
+            n = min(n, max_samples)
+        idx = (self._read_pos + np.arange(n)) % self.BUFFER_SAMPLES
+        samples = self.buffer[idx]
+        self._read_pos = (self._read_pos + n) % self.BUFFER_SAMPLES
+        self.samples_available -= n
+        return samples
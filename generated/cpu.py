@@ -1,64 +1,587 @@
+from array import array
+
+from .scheduler import NEVER
+
+FLAG_Z, FLAG_N, FLAG_H, FLAG_C = 0x80, 0x40, 0x20, 0x10
+
+_ALU_TABLES = {}
+
+
+def alu_tables():
+    """
+    Result+flags tables for the 8-bit ALU, built on first use and shared by
+    every CPU.  Each entry packs ``(result << 8) | F`` so one lookup yields
+    both the new A and the new F.
+
+    • ADC/SBC  – ``carry << 16 | a << 8 | b``; the carry-clear half doubles
+      as the ADD/SUB/CP table
+    • AND/XOR/OR – ``a << 8 | b``
+    • INC/DEC  – ``value``; F lacks C, which these ops leave alone
+    • RLA/RRA  – ``carry << 8 | a``; RLCA/RRCA – ``a``
+    • DAA      – ``(F >> 4) << 8 | a``
+    • CB       – ``op << 9 | carry << 8 | a`` for the CB-prefixed rotates
+      and shifts, ``op`` in opcode order (RLC RRC RL RR SLA SRA SWAP SRL)
+    """
+    if not _ALU_TABLES:
+        _ALU_TABLES.update(_build_alu_tables())
+    return _ALU_TABLES
+
+
+def _zero(r):
+    return 0 if r else FLAG_Z
+
+
+def _build_alu_tables():
+    adc = array("H", bytes(2 << 17))
+    sbc = array("H", bytes(2 << 17))
+    for c in (0, 1):
+        for a in range(0x100):
+            base = c << 16 | a << 8
+            for b in range(0x100):
+                r = a + b + c
+                adc[base | b] = (r & 0xFF) << 8 | _zero(r & 0xFF) \
+                    | (FLAG_H if (a & 0xF) + (b & 0xF) + c > 0xF else 0) \
+                    | (FLAG_C if r > 0xFF else 0)
+                r = a - b - c
+                sbc[base | b] = (r & 0xFF) << 8 | _zero(r & 0xFF) | FLAG_N \
+                    | (FLAG_H if (a & 0xF) < (b & 0xF) + c else 0) \
+                    | (FLAG_C if r < 0 else 0)
+
+    def logic(fn, flags):
+        return array("H", [
+            fn(a, b) << 8 | _zero(fn(a, b)) | flags
+            for a in range(0x100) for b in range(0x100)
+        ])
+
+    inc = array("H", [((v + 1) & 0xFF) << 8 | _zero((v + 1) & 0xFF)
+                      | (FLAG_H if v & 0xF == 0xF else 0) for v in range(0x100)])
+    dec = array("H", [((v - 1) & 0xFF) << 8 | _zero((v - 1) & 0xFF) | FLAG_N
+                      | (FLAG_H if v & 0xF == 0 else 0) for v in range(0x100)])
+
+    # accumulator rotates always clear Z, N and H
+    rlca = array("H", [((a << 1 | a >> 7) & 0xFF) << 8 | (a >> 7) << 4 for a in range(0x100)])
+    rrca = array("H", [(a >> 1 | (a & 1) << 7) << 8 | (a & 1) << 4 for a in range(0x100)])
+    rla = array("H", [((a << 1 | c) & 0xFF) << 8 | (a >> 7) << 4
+                      for c in (0, 1) for a in range(0x100)])
+    rra = array("H", [(a >> 1 | c << 7) << 8 | (a & 1) << 4
+                      for c in (0, 1) for a in range(0x100)])
+
+    daa = array("H", bytes(2 << 12))
+    for f in range(0x10):
+        n, h = f & 0x4, f & 0x2
+        for a in range(0x100):
+            r, carry = a, f & 0x1
+            if not n:
+                if carry or r > 0x99:
+                    r += 0x60
+                    carry = 1
+                if h or (r & 0xF) > 0x9:
+                    r += 0x06
+            else:
+                if carry:
+                    r -= 0x60
+                if h:
+                    r -= 0x06
+            r &= 0xFF
+            daa[f << 8 | a] = r << 8 | _zero(r) | (FLAG_N if n else 0) | (FLAG_C if carry else 0)
+
+    shifts = (
+        lambda v, c: (v << 1 | v >> 7, v >> 7),         # RLC
+        lambda v, c: (v >> 1 | (v & 1) << 7, v & 1),    # RRC
+        lambda v, c: (v << 1 | c, v >> 7),              # RL
+        lambda v, c: (v >> 1 | c << 7, v & 1),          # RR
+        lambda v, c: (v << 1, v >> 7),                  # SLA
+        lambda v, c: (v >> 1 | v & 0x80, v & 1),        # SRA
+        lambda v, c: (v >> 4 | v << 4, 0),              # SWAP
+        lambda v, c: (v >> 1, v & 1),                   # SRL
+    )
+    cb = array("H", bytes(2 << 12))
+    for op, shift in enumerate(shifts):
+        for c in (0, 1):
+            for a in range(0x100):
+                r, carry = shift(a, c)
+                r &= 0xFF
+                cb[op << 9 | c << 8 | a] = r << 8 | _zero(r) | carry << 4
+
+    return {
+        "ADC": adc, "SBC": sbc,
+        "AND": logic(lambda a, b: a & b, FLAG_H),
+        "XOR": logic(lambda a, b: a ^ b, 0),
+        "OR": logic(lambda a, b: a | b, 0),
+        "INC": inc, "DEC": dec,
+        "RLCA": rlca, "RRCA": rrca, "RLA": rla, "RRA": rra,
+        "DAA": daa, "CB": cb,
+    }
+
+
+class Registers:
+    """
+    LR35902 register file.  Handlers keep every slot in range themselves, so
+    reads and writes on the hot path are plain slot accesses; the 16-bit
+    pairs are views composed on demand.  ``regs["A"]`` style indexing is
+    kept for callers written against the old dict.
+    """
+
+    __slots__ = ("A", "F", "B", "C", "D", "E", "H", "L", "SP", "PC")
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.A = self.F = self.B = self.C = self.D = self.E = self.H = self.L = 0
+        self.SP = self.PC = 0
+
+    @property
+    def AF(self):
+        return (self.A << 8) | self.F
+
+    @AF.setter
+    def AF(self, val):
+        self.A = (val >> 8) & 0xFF
+        self.F = val & 0xF0
+
+    @property
+    def BC(self):
+        return (self.B << 8) | self.C
+
+    @BC.setter
+    def BC(self, val):
+        self.B = (val >> 8) & 0xFF
+        self.C = val & 0xFF
+
+    @property
+    def DE(self):
+        return (self.D << 8) | self.E
+
+    @DE.setter
+    def DE(self, val):
+        self.D = (val >> 8) & 0xFF
+        self.E = val & 0xFF
+
+    @property
+    def HL(self):
+        return (self.H << 8) | self.L
+
+    @HL.setter
+    def HL(self, val):
+        self.H = (val >> 8) & 0xFF
+        self.L = val & 0xFF
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+    def __setitem__(self, name, val):
+        setattr(self, name, val)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _register(name, mask):
+    # masked public accessor, e.g. ``cpu.B = 0x1FF`` stores 0xFF
+    def fget(self):
+        return getattr(self.registers, name)
+
+    def fset(self, val):
+        setattr(self.registers, name, val & mask)
+
+    return property(fget, fset)
+
+
+class _Block:
+    """Straight-line run of decoded instructions starting at ``start``."""
+
+    __slots__ = ("start", "end", "ops", "valid", "poll_cycles")
+
+    def __init__(self, start, end, ops, poll_cycles=0):
+        self.start, self.end, self.ops = start, end, ops
+        self.valid = True
+        # >0 for a recognised busy-wait loop: cycles per loop iteration
+        self.poll_cycles = poll_cycles
+
+
 class CPU:
     INSTRUCTION_CYCLES = {
+        "NOP": 4,
         "ADD_A_n8": 8,
+        "ADC_A_n8": 8,
         "SUB_A_n8": 8,
+        "SBC_A_n8": 8,
         "AND_A_n8": 8,
         "OR_A_n8": 8,
         "XOR_A_n8": 8,
+        "CP_A_n8": 8,
+        "ADD_A_r": 4,
+        "ADC_A_r": 4,
+        "SUB_A_r": 4,
+        "SBC_A_r": 4,
+        "AND_A_r": 4,
+        "XOR_A_r": 4,
+        "OR_A_r": 4,
+        "CP_A_r": 4,
+        "ADD_A_HLptr": 8,
+        "ADC_A_HLptr": 8,
+        "SUB_A_HLptr": 8,
+        "SBC_A_HLptr": 8,
+        "AND_A_HLptr": 8,
+        "XOR_A_HLptr": 8,
+        "OR_A_HLptr": 8,
+        "CP_A_HLptr": 8,
         "INC_A": 4,
         "DEC_A": 4,
+        "INC_r": 4,
+        "DEC_r": 4,
+        "INC_HLptr": 12,
+        "DEC_HLptr": 12,
+        "RLCA": 4,
+        "RRCA": 4,
+        "RLA": 4,
+        "RRA": 4,
+        "DAA": 4,
+        "CPL": 4,
+        "SCF": 4,
+        "CCF": 4,
         "LD_r_r": 4,
+        "LD_r_n8": 8,
+        "LD_r_HLptr": 8,
+        "LD_HLptr_r": 8,
+        "LD_HLptr_n8": 12,
+        "LD_rr_n16": 12,
+        "LD_rrptr_A": 8,
+        "LD_A_rrptr": 8,
+        "LD_HLIptr_A": 8,
+        "LD_A_HLIptr": 8,
+        "LD_HLDptr_A": 8,
+        "LD_A_HLDptr": 8,
+        "INC_rr": 8,
+        "DEC_rr": 8,
+        "ADD_HL_rr": 8,
+        "ADD_SP_e8": 16,
+        "LD_HL_SPe8": 12,
+        "LD_SP_HL": 8,
+        "LD_a16_SP": 20,
+        "LD_A_n8": 8,
         "LD_A_n8_ptr": 8,
         "LD_n8_A_ptr": 8,
         "LDH_a8_A": 8,
         "LDH_A_a8": 8,  # ✅ Added
+        "LDH_C_A": 8,
+        "LDH_A_C": 8,
         "JP": 16,
+        "JP_a16": 16,
+        "JP_cc_a16": 12,    # +4 when taken
+        "JP_HL": 4,
         "JR": 12,
+        "JR_r8": 12,
+        "JR_NZ_r8": 8,      # +4 when taken
+        "JR_Z_r8": 8,
+        "JR_NC_r8": 8,
+        "JR_C_r8": 8,
         "CALL": 24,
+        "CALL_a16": 24,
+        "CALL_cc_a16": 12,  # +12 when taken
         "RET": 16,
+        "RET_cc": 8,        # +12 when taken
+        "RETI": 16,
+        "RST": 16,
+        "RST_vec": 16,
+        "PUSH_rr": 16,
+        "POP_rr": 12,
         "DI": 4,
         "EI": 4,
         "HALT": 4,
+        "STOP": 4,
+        "PREFIX_CB": 8,     # +8 on (HL), +4 for BIT n,(HL)
+    }
+
+    # mnemonic → (handler, operand key of the dict form); resolved once per
+    # CPU into ``self._dispatch``.  A tuple key collects several fields.
+    INSTRUCTION_HANDLERS = {
+        "NOP": ("_op_nop", None),
+        "ADD_A_n8": ("_op_add_a_n8", "imm8"),
+        "ADC_A_n8": ("_op_adc_a_n8", "imm8"),
+        "SUB_A_n8": ("_op_sub_a_n8", "imm8"),
+        "SBC_A_n8": ("_op_sbc_a_n8", "imm8"),
+        "AND_A_n8": ("_op_and_a_n8", "imm8"),
+        "OR_A_n8": ("_op_or_a_n8", "imm8"),
+        "XOR_A_n8": ("_op_xor_a_n8", "imm8"),
+        "CP_A_n8": ("_op_cp_a_n8", "imm8"),
+        "ADD_A_r": ("_op_add_a_r", "r"),
+        "ADC_A_r": ("_op_adc_a_r", "r"),
+        "SUB_A_r": ("_op_sub_a_r", "r"),
+        "SBC_A_r": ("_op_sbc_a_r", "r"),
+        "AND_A_r": ("_op_and_a_r", "r"),
+        "XOR_A_r": ("_op_xor_a_r", "r"),
+        "OR_A_r": ("_op_or_a_r", "r"),
+        "CP_A_r": ("_op_cp_a_r", "r"),
+        "ADD_A_HLptr": ("_op_add_a_hlptr", None),
+        "ADC_A_HLptr": ("_op_adc_a_hlptr", None),
+        "SUB_A_HLptr": ("_op_sub_a_hlptr", None),
+        "SBC_A_HLptr": ("_op_sbc_a_hlptr", None),
+        "AND_A_HLptr": ("_op_and_a_hlptr", None),
+        "XOR_A_HLptr": ("_op_xor_a_hlptr", None),
+        "OR_A_HLptr": ("_op_or_a_hlptr", None),
+        "CP_A_HLptr": ("_op_cp_a_hlptr", None),
+        "INC_A": ("_op_inc_r", None),
+        "DEC_A": ("_op_dec_r", None),
+        "INC_r": ("_op_inc_r", "r"),
+        "DEC_r": ("_op_dec_r", "r"),
+        "INC_HLptr": ("_op_inc_hlptr", None),
+        "DEC_HLptr": ("_op_dec_hlptr", None),
+        "RLCA": ("_op_rlca", None),
+        "RRCA": ("_op_rrca", None),
+        "RLA": ("_op_rla", None),
+        "RRA": ("_op_rra", None),
+        "DAA": ("_op_daa", None),
+        "CPL": ("_op_cpl", None),
+        "SCF": ("_op_scf", None),
+        "CCF": ("_op_ccf", None),
+        "LD_r_r": ("_op_ld_r_r", ("r1", "r2")),
+        "LD_r_n8": ("_op_ld_r_n8", ("r", "imm8")),
+        "LD_r_HLptr": ("_op_ld_r_hlptr", "r"),
+        "LD_HLptr_r": ("_op_ld_hlptr_r", "r"),
+        "LD_HLptr_n8": ("_op_ld_hlptr_n8", "imm8"),
+        "LD_rr_n16": ("_op_ld_rr_n16", ("rr", "imm16")),
+        "LD_rrptr_A": ("_op_ld_rrptr_a", "rr"),
+        "LD_A_rrptr": ("_op_ld_a_rrptr", "rr"),
+        "LD_HLIptr_A": ("_op_ld_hliptr_a", None),
+        "LD_A_HLIptr": ("_op_ld_a_hliptr", None),
+        "LD_HLDptr_A": ("_op_ld_hldptr_a", None),
+        "LD_A_HLDptr": ("_op_ld_a_hldptr", None),
+        "INC_rr": ("_op_inc_rr", "rr"),
+        "DEC_rr": ("_op_dec_rr", "rr"),
+        "ADD_HL_rr": ("_op_add_hl_rr", "rr"),
+        "ADD_SP_e8": ("_op_add_sp_e8", "offset"),
+        "LD_HL_SPe8": ("_op_ld_hl_sp_e8", "offset"),
+        "LD_SP_HL": ("_op_ld_sp_hl", None),
+        "LD_a16_SP": ("_op_ld_a16_sp", "addr"),
+        "LD_A_n8": ("_op_ld_a_n8", "imm8"),
+        "LD_A_n8_ptr": ("_op_ld_a_n8_ptr", "n8"),
+        "LD_n8_A_ptr": ("_op_ld_n8_a_ptr", "n8"),
+        "LDH_a8_A": ("_op_ldh_a8_a", "a8"),
+        "LDH_A_a8": ("_op_ldh_a_a8", "a8"),
+        "LDH_C_A": ("_op_ldh_c_a", None),
+        "LDH_A_C": ("_op_ldh_a_c", None),
+        "JP": ("_op_jp", "addr"),
+        "JP_a16": ("_op_jp", "addr"),
+        "JP_cc_a16": ("_op_jp_cc", ("cc", "addr")),
+        "JP_HL": ("_op_jp_hl", None),
+        "JR": ("_op_jr", "offset"),
+        "JR_r8": ("_op_jr", "offset"),
+        "JR_NZ_r8": ("_op_jr_nz", "offset"),
+        "JR_Z_r8": ("_op_jr_z", "offset"),
+        "JR_NC_r8": ("_op_jr_nc", "offset"),
+        "JR_C_r8": ("_op_jr_c", "offset"),
+        "CALL": ("_op_call", "addr"),
+        "CALL_a16": ("_op_call_a16", "addr"),
+        "CALL_cc_a16": ("_op_call_cc", ("cc", "addr")),
+        "RET": ("_op_ret", None),
+        "RET_cc": ("_op_ret_cc", "cc"),
+        "RETI": ("_op_reti", None),
+        "RST": ("_op_rst", "addr"),
+        "RST_vec": ("_op_rst_vec", "addr"),
+        "PUSH_rr": ("_op_push_rr", "rr"),
+        "POP_rr": ("_op_pop_rr", "rr"),
+        "DI": ("_op_di", None),
+        "EI": ("_op_ei", None),
+        "HALT": ("_op_halt", None),
+        "STOP": ("_op_nop", None),      # the button-woken low-power mode is not modelled
+        "PREFIX_CB": ("_op_prefix_cb", "cb"),
     }
 
+    # raw opcode byte → (mnemonic, length, cycles[, static operand]) for
+    # fetching straight from the bus.  Control flow uses the spec mnemonics
+    # (JP_a16, JR_r8, CALL_a16), which see PC already advanced past the
+    # instruction.  A static operand is the whole operand of a 1-byte op and
+    # is paired with the immediate of a longer one.  Handlers may return
+    # extra cycles (taken conditional branches).
+    OPCODES = {
+        0x00: ("NOP", 1, 4),
+        0x18: ("JR_r8", 2, 12),
+        0x20: ("JR_NZ_r8", 2, 8),
+        0x28: ("JR_Z_r8", 2, 8),
+        0x30: ("JR_NC_r8", 2, 8),
+        0x38: ("JR_C_r8", 2, 8),
+        0x07: ("RLCA", 1, 4),
+        0x0F: ("RRCA", 1, 4),
+        0x17: ("RLA", 1, 4),
+        0x1F: ("RRA", 1, 4),
+        0x27: ("DAA", 1, 4),
+        0x2F: ("CPL", 1, 4),
+        0x37: ("SCF", 1, 4),
+        0x3F: ("CCF", 1, 4),
+        0x3C: ("INC_A", 1, 4),
+        0x3D: ("DEC_A", 1, 4),
+        0x34: ("INC_HLptr", 1, 12),
+        0x35: ("DEC_HLptr", 1, 12),
+        0xCE: ("ADC_A_n8", 2, 8),
+        0xDE: ("SBC_A_n8", 2, 8),
+        0x3E: ("LD_A_n8", 2, 8),
+        0x76: ("HALT", 1, 4),
+        0x10: ("STOP", 2, 4),
+        0xC3: ("JP_a16", 3, 16),
+        0xC6: ("ADD_A_n8", 2, 8),
+        0xC9: ("RET", 1, 16),
+        0xD9: ("RETI", 1, 16),
+        0xCD: ("CALL_a16", 3, 24),
+        0xD6: ("SUB_A_n8", 2, 8),
+        0xE0: ("LDH_a8_A", 2, 12),
+        0xE6: ("AND_A_n8", 2, 8),
+        0xEA: ("LD_n8_A_ptr", 3, 16),
+        0xEE: ("XOR_A_n8", 2, 8),
+        0xF0: ("LDH_A_a8", 2, 12),
+        0xF3: ("DI", 1, 4),
+        0xF6: ("OR_A_n8", 2, 8),
+        0xFA: ("LD_A_n8_ptr", 3, 16),
+        0xFB: ("EI", 1, 4),
+        0xFE: ("CP_A_n8", 2, 8),
+        0x02: ("LD_rrptr_A", 1, 8, "BC"),
+        0x12: ("LD_rrptr_A", 1, 8, "DE"),
+        0x0A: ("LD_A_rrptr", 1, 8, "BC"),
+        0x1A: ("LD_A_rrptr", 1, 8, "DE"),
+        0x22: ("LD_HLIptr_A", 1, 8),
+        0x2A: ("LD_A_HLIptr", 1, 8),
+        0x32: ("LD_HLDptr_A", 1, 8),
+        0x3A: ("LD_A_HLDptr", 1, 8),
+        0x36: ("LD_HLptr_n8", 2, 12),
+        0x08: ("LD_a16_SP", 3, 20),
+        0xE2: ("LDH_C_A", 1, 8),
+        0xF2: ("LDH_A_C", 1, 8),
+        0xE8: ("ADD_SP_e8", 2, 16),
+        0xF8: ("LD_HL_SPe8", 2, 12),
+        0xF9: ("LD_SP_HL", 1, 8),
+        0xE9: ("JP_HL", 1, 4),
+        0xCB: ("PREFIX_CB", 2, 8),
+    }
+    REG8 = ("B", "C", "D", "E", "H", "L", None, "A")    # None ⇒ (HL)
+    ALU8 = ("ADD", "ADC", "SUB", "SBC", "AND", "XOR", "OR", "CP")
+    for _i, _rr in enumerate(("BC", "DE", "HL", "SP")):
+        OPCODES[0x01 | _i << 4] = ("LD_rr_n16", 3, 12, _rr)
+        OPCODES[0x03 | _i << 4] = ("INC_rr", 1, 8, _rr)
+        OPCODES[0x0B | _i << 4] = ("DEC_rr", 1, 8, _rr)
+        OPCODES[0x09 | _i << 4] = ("ADD_HL_rr", 1, 8, _rr)
+        OPCODES[0xC1 | _i << 4] = ("POP_rr", 1, 12, _rr if _i < 3 else "AF")
+        OPCODES[0xC5 | _i << 4] = ("PUSH_rr", 1, 16, _rr if _i < 3 else "AF")
+    for _i, _r in enumerate(REG8):
+        if _r is not None and _r != "A":
+            OPCODES[0x06 | _i << 3] = ("LD_r_n8", 2, 8, _r)
+            OPCODES[0x04 | _i << 3] = ("INC_r", 1, 4, _r)
+            OPCODES[0x05 | _i << 3] = ("DEC_r", 1, 4, _r)
+        for _j, _alu in enumerate(ALU8):
+            if _r is None:
+                OPCODES[0x80 | _j << 3 | _i] = (_alu + "_A_HLptr", 1, 8)
+            else:
+                OPCODES[0x80 | _j << 3 | _i] = (_alu + "_A_r", 1, 4, _r)
+        for _j, _src in enumerate(REG8):
+            if _r is None and _src is None:
+                continue                                # 0x76 is HALT
+            if _r is None:
+                OPCODES[0x40 | _i << 3 | _j] = ("LD_HLptr_r", 1, 8, _src)
+            elif _src is None:
+                OPCODES[0x40 | _i << 3 | _j] = ("LD_r_HLptr", 1, 8, _r)
+            else:
+                OPCODES[0x40 | _i << 3 | _j] = ("LD_r_r", 1, 4, (_r, _src))
+    for _i in range(8):
+        OPCODES[0xC7 | _i << 3] = ("RST_vec", 1, 16, _i << 3)
+    for _i, _cc in enumerate(("NZ", "Z", "NC", "C")):
+        OPCODES[0xC0 | _i << 3] = ("RET_cc", 1, 8, _cc)
+        OPCODES[0xC2 | _i << 3] = ("JP_cc_a16", 3, 12, _cc)
+        OPCODES[0xC4 | _i << 3] = ("CALL_cc_a16", 3, 12, _cc)
+    del _i, _j, _r, _rr, _src, _alu, _cc
+
+    # condition code → (F bit tested, value it must have)
+    CONDITIONS = {"NZ": (FLAG_Z, 0), "Z": (FLAG_Z, FLAG_Z),
+                  "NC": (FLAG_C, 0), "C": (FLAG_C, FLAG_C)}
+
+    # ops that set PC themselves in list-program mode
+    BRANCH_OPS = frozenset(("JP", "JR", "CALL", "RET", "RETI", "RST"))
+
+    # raw mnemonics that end a basic block
+    BLOCK_END_OPS = frozenset(
+        ("JP_a16", "JP_cc_a16", "JP_HL", "JR_r8", "JR_NZ_r8", "JR_Z_r8",
+         "JR_NC_r8", "JR_C_r8", "CALL_a16", "CALL_cc_a16", "RET", "RET_cc",
+         "RETI", "RST_vec", "EI", "HALT")
+    )
+    MAX_BLOCK_LEN = 64
+
+    # Busy-wait loops  LDH A,(a8) ; CP/AND n8 ; JR NZ/Z back  on these ports
+    # only see a new value after a scheduler event (LY++, IF, …) or host
+    # input, so whole iterations up to the next event can be skipped.
+    IDLE_POLL_PORTS = frozenset((0x00, 0x0F, 0x41, 0x44))
+    IDLE_POLL_SHAPES = frozenset(
+        (0xF0, alu, jr) for alu in (0xFE, 0xE6) for jr in (0x20, 0x28)
+    )
+
+    # blocks decoded from these (start, end) ranges are cached; Memory
+    # reports writes into them so stale blocks get dropped
+    RAM_CODE_RANGES = ((0xC000, 0xE000), (0xFF80, 0xFFFF))
+
     def __init__(self, memory):
         self.memory = memory
         self.timer = self.memory.timer
+        self.scheduler = self.memory.scheduler
+        self.interrupts = self.memory.interrupts
+        self._dispatch = {
+            op: (getattr(self, name), self.INSTRUCTION_CYCLES.get(op, 4), key)
+            for op, (name, key) in self.INSTRUCTION_HANDLERS.items()
+        }
+        # 256-entry decode table:
+        # (handler, length, cycles, ends_block, static operand) or None
+        self._opcodes = [None] * 256
+        for opcode, (op, length, cycles, *static) in self.OPCODES.items():
+            self._opcodes[opcode] = (
+                self._dispatch[op][0], length, cycles, op in self.BLOCK_END_OPS,
+                static[0] if static else None,
+            )
+        tables = alu_tables()
+        self._adc, self._sbc = tables["ADC"], tables["SBC"]
+        self._and, self._xor, self._or = tables["AND"], tables["XOR"], tables["OR"]
+        self._inc, self._dec = tables["INC"], tables["DEC"]
+        self._rot = (tables["RLCA"], tables["RRCA"], tables["RLA"], tables["RRA"])
+        self._daa = tables["DAA"]
+        self._cb = tables["CB"]
+        self._blocks = {}                           # RAM start PC → _Block
+        self._page_blocks = [set() for _ in range(0x100)]
+        # ROM blocks, one dict per bank at 0x0000 and at 0x4000; a bank
+        # switch swaps the current one in and keeps the others for later
+        self._bank_blocks = {}                      # (0 or 1, bank) → dict
+        self._rom_banks = (None, None)
+        self._rom0_blocks = self._romx_blocks = {}
+        self._running = None                        # block run() is inside
+        self.memory.code_listener = self.invalidate_code
+        self.memory.rom_listener = self._switch_rom_blocks
+        self.registers = Registers()
         self.reset()
 
     def reset(self):
-        self.registers = {"A": 0, "F": 0, "PC": 0}
+        self.registers.clear()
+        self.registers.SP = 0xFFFE                  # post-boot value
         self.memory_instructions = []
-        self.stack = []
+        self._flush_blocks()
         self.IME = False
+        self.halted = False
+        self.skipped_cycles = 0     # cycles fast-forwarded by HALT/idle loops
+        self._poll_mark = None      # (loop start, cycle, next event) for step()
+        self._ei_cycle = -1         # cycle the last EI finished at
         self.DIV = 0
         self.TIMA = 0
         self.TMA = 0
         self.TAC = 0
 
-    @property
-    def A(self):
-        return self.registers["A"]
-
-    @A.setter
-    def A(self, val):
-        self.registers["A"] = val & 0xFF
-
-    @property
-    def F(self):
-        return self.registers["F"]
-
-    @F.setter
-    def F(self, val):
-        self.registers["F"] = val & 0xFF
-
-    @property
-    def PC(self):
-        return self.registers["PC"]
-
-    @PC.setter
-    def PC(self, val):
-        self.registers["PC"] = val & 0xFFFF
+    A = _register("A", 0xFF)
+    F = _register("F", 0xF0)               # low nibble hardwired to 0, as in AF
+    B = _register("B", 0xFF)
+    C = _register("C", 0xFF)
+    D = _register("D", 0xFF)
+    E = _register("E", 0xFF)
+    H = _register("H", 0xFF)
+    L = _register("L", 0xFF)
+    SP = _register("SP", 0xFFFF)
+    PC = _register("PC", 0xFFFF)
+    AF = _register("AF", 0xFFFF)
+    BC = _register("BC", 0xFFFF)
+    DE = _register("DE", 0xFFFF)
+    HL = _register("HL", 0xFFFF)
 
     @property
     def bus(self):
@@ -72,111 +595,681 @@ class CPU:
         self.memory.write(addr, val)
 
     def step(self, instr=None):
+        """
+        Execute one instruction.
+
+        • ``instr`` given – run that dict (``{"op": ...}`` or
+          ``{"mnemonic": ..., "operand": ...}``); PC is left alone.
+        • ``memory_instructions`` loaded – run the list entry at PC.
+        • otherwise fetch, decode and execute raw bytes from the bus at PC.
+          HALT and recognised busy-wait loops fast-forward as in ``run()``;
+          a loop is skipped once one whole iteration ran without an event.
+        """
         if instr is not None:
             if "mnemonic" in instr:
                 op = instr["mnemonic"]
-                n = instr.get("operand")
-                instr = {"op": op}
-                if n is not None:
-                    instr.update({"imm8": n, "n8": n, "addr": n, "offset": n, "a8": n})
-            cycles = self._execute(instr)
-            self.timer.step(cycles)
+                try:
+                    handler, cycles, _ = self._dispatch[op]
+                except KeyError:
+                    raise ValueError(f"Unknown operation: {op}") from None
+                cycles += handler(instr.get("operand")) or 0
+            else:
+                cycles = self._execute(instr)
+            self.scheduler.advance(cycles)
+            return
+
+        if not self.memory_instructions:
+            if self.interrupts.pending and self._wake():
+                return
+            if self.halted:
+                self._halt_idle(NEVER)
+            else:
+                pc = self.registers.PC
+                self.scheduler.advance(self._fetch_execute())
+                if self.registers.PC < pc:
+                    self._step_poll_loop(pc)
             return
 
-        pc = self.registers["PC"]
+        pc = self.registers.PC
         if pc >= len(self.memory_instructions):
             return
 
         instr = self.memory_instructions[pc]
         cycles = self._execute(instr)
-        if instr["op"] not in ("JP", "JR", "CALL", "RET"):
-            self.registers["PC"] += 1
+        if instr["op"] not in self.BRANCH_OPS:
+            self.registers.PC = (self.registers.PC + 1) & 0xFFFF
+
+        self.scheduler.advance(cycles)
+
+    def decode(self, pc):
+        """Return ``(mnemonic, operand, length)`` for the bytes at *pc*."""
+        read = self.memory.read
+        opcode = read(pc)
+        if opcode not in self.OPCODES:
+            raise ValueError(f"Unknown opcode {opcode:#04x} at {pc:#06x}")
+        op, length, _, *static = self.OPCODES[opcode]
+        operand = static[0] if static else None
+        if length > 1:
+            imm = read((pc + 1) & 0xFFFF)
+            if length == 3:
+                imm |= read((pc + 2) & 0xFFFF) << 8
+            operand = imm if operand is None else (operand, imm)
+        return op, operand, length
+
+    def _fetch_execute(self):
+        regs = self.registers
+        read = self.memory.read
+        pc = regs.PC
+        entry = self._opcodes[read(pc)]
+        if entry is None:
+            raise ValueError(f"Unknown opcode {read(pc):#04x} at {pc:#06x}")
+        handler, length, cycles, _, arg = entry
+        if length > 1:
+            imm = read((pc + 1) & 0xFFFF)
+            if length == 3:
+                imm |= read((pc + 2) & 0xFFFF) << 8
+            arg = imm if arg is None else (arg, imm)
+        regs.PC = (pc + length) & 0xFFFF
+        return cycles + (handler(arg) or 0)
+
+    def _step_poll_loop(self, pc):
+        # step() just jumped back from *pc*; skip like run() does when the
+        # previous jump back to the same poll loop was one event-free
+        # iteration ago
+        start = self.registers.PC
+        sched = self.scheduler
+        if pc - start != 4 or self.memory.read(pc) not in (0x20, 0x28):
+            return
+        block = self._cached_block(start) or self._compile_block(start)
+        iteration = block.poll_cycles
+        if (iteration and sched.next_event != NEVER
+                and self._poll_mark == (start, sched.cycles - iteration, sched.next_event)):
+            self._skip_idle_loop(iteration, NEVER)
+        self._poll_mark = (start, sched.cycles, sched.next_event)
+
+    def _halt_idle(self, limit):
+        """
+        While halted, jump the clock straight to the next scheduled event
+        (or *limit*) instead of burning 4 cycles per step.
+        """
+        sched = self.scheduler
+        target = min(sched.next_event, limit)
+        skip = target - sched.cycles if target != NEVER else 4
+        if skip < 4:
+            skip = 4
+        self.skipped_cycles += skip
+        sched.advance(skip)
+
+    # ── interrupts ──────────────────────────────────────────
+    INTERRUPT_CYCLES = 20
+
+    def _wake(self):
+        """
+        Called only while ``IF & IE`` is nonzero: leave HALT and, with IME
+        set, push PC and jump to the highest-priority vector.  Returns True
+        if an interrupt was dispatched, or if the instruction after an EI
+        was run first (IME only takes effect one instruction after EI).
+        """
+        if self.scheduler.cycles == self._ei_cycle and self.IME:
+            self.scheduler.advance(self._fetch_execute())
+            return True
+        self.halted = False
+        if not self.IME:
+            return False
+        self.IME = False
+        self._push(self.registers.PC)
+        self.registers.PC = self.interrupts.acknowledge()
+        self.scheduler.advance(self.INTERRUPT_CYCLES)
+        return True
+
+    # ── basic-block cache ───────────────────────────────────
+    def run(self, max_cycles):
+        """
+        Execute from the bus for at least *max_cycles* cycles and return the
+        number actually run.  Straight-line code up to the next JP/JR/CALL/
+        RET/HALT is decoded once into a cached block and replayed from there.
+        """
+        regs = self.registers
+        blocks = self._blocks
+        sched = self.scheduler
+        irq = self.interrupts
+        start = sched.cycles
+        end = start + max_cycles
+        while sched.cycles < end:
+            if irq.pending and self._wake():
+                continue
+            if self.halted:
+                self._halt_idle(end)
+                continue
+            pc = regs.PC
+            if pc < 0x4000:
+                block = self._rom0_blocks.get(pc)
+            elif pc < 0x8000:
+                block = self._romx_blocks.get(pc)
+            else:
+                block = blocks.get(pc)
+            if block is None:
+                block = self._compile_block(regs.PC)
+            self._running = block
+            due = sched.next_event
+            for handler, arg, cycles, next_pc in block.ops:
+                regs.PC = next_pc
+                extra = handler(arg)
+                sched.cycles += cycles + extra if extra else cycles
+                if sched.cycles >= sched.next_event:
+                    sched.run_due()
+                    if irq.pending and self.IME:
+                        break               # dispatch before the next op
+                if not block.valid:         # the block just rewrote itself
+                    break
+            else:
+                # a loop that saw an event mid-iteration may have read a
+                # stale value; let it go round once more first
+                if (block.poll_cycles and regs.PC == block.start
+                        and sched.next_event == due):
+                    self._skip_idle_loop(block.poll_cycles, end)
+        self._running = None
+        return sched.cycles - start
+
+    def _cached_block(self, pc):
+        if pc < 0x4000:
+            return self._rom0_blocks.get(pc)
+        if pc < 0x8000:
+            return self._romx_blocks.get(pc)
+        return self._blocks.get(pc)
 
-        self.timer.step(cycles)
+    def _skip_idle_loop(self, iteration, limit):
+        # the loop just went round once without its exit condition holding;
+        # it reads the same value until the next event, so skip whole
+        # iterations while staying strictly before that event
+        sched = self.scheduler
+        n = (min(sched.next_event, limit) - sched.cycles - 1) // iteration
+        if n > 0:
+            sched.cycles += n * iteration
+            self.skipped_cycles += n * iteration
+
+    def _compile_block(self, start):
+        read = self.memory.read
+        opcodes = self._opcodes
+        ops = []
+        shape = []
+        pc = start
+        while len(ops) < self.MAX_BLOCK_LEN:
+            shape.append(read(pc))
+            entry = opcodes[shape[-1]]
+            if entry is None:
+                if not ops:
+                    raise ValueError(f"Unknown opcode {read(pc):#04x} at {pc:#06x}")
+                break
+            handler, length, cycles, ends_block, arg = entry
+            if length > 1:
+                imm = read((pc + 1) & 0xFFFF)
+                if length == 3:
+                    imm |= read((pc + 2) & 0xFFFF) << 8
+                arg = imm if arg is None else (arg, imm)
+            pc = (pc + length) & 0xFFFF
+            ops.append((handler, arg, cycles, pc))
+            if ends_block:
+                break
+
+        end = pc if pc > start else 0x10000
+        block = _Block(start, end, tuple(ops), self._poll_cycles(start, shape, ops))
+        if end <= 0x4000:
+            self._rom0_blocks[start] = block
+        elif 0x4000 <= start and end <= 0x8000:
+            self._romx_blocks[start] = block
+        elif any(lo <= start and end <= hi for lo, hi in self.RAM_CODE_RANGES):
+            self._blocks[start] = block
+            for page in range(start >> 8, ((end - 1) >> 8) + 1):
+                self._page_blocks[page].add(block)
+                self.memory.watch_code_page(page, True)
+        else:
+            block.valid = False             # VRAM/cart RAM/OAM/bank split: run once
+        return block
+
+    def _poll_cycles(self, start, shape, ops):
+        if (tuple(shape) not in self.IDLE_POLL_SHAPES
+                or ops[0][1] not in self.IDLE_POLL_PORTS):
+            return 0
+        offset = ops[2][1] - 0x100 if ops[2][1] & 0x80 else ops[2][1]
+        if (ops[2][3] + offset) & 0xFFFF != start:
+            return 0
+        return sum(op[2] for op in ops) + 4         # JR taken
+
+    def invalidate_code(self, start, end):
+        """Drop every cached block overlapping ``[start, end)``."""
+        for page in range(start >> 8, ((end - 1) >> 8) + 1):
+            page_blocks = self._page_blocks[page]
+            for block in [b for b in page_blocks if b.start < end and start < b.end]:
+                block.valid = False
+                self._blocks.pop(block.start, None)
+                for p in range(block.start >> 8, ((block.end - 1) >> 8) + 1):
+                    self._page_blocks[p].discard(block)
+                    if not self._page_blocks[p]:
+                        self.memory.watch_code_page(p, False)
+
+    def _switch_rom_blocks(self, rom0, romx):
+        # a ROM block that switches its own bank out stops at the write;
+        # only that block is dropped, the rest stay cached for later
+        block = self._running
+        old0, oldx = self._rom_banks
+        if block is not None and block.valid:
+            if rom0 != old0 and block.end <= 0x4000:
+                block.valid = False
+                self._rom0_blocks.pop(block.start, None)
+            elif romx != oldx and 0x4000 <= block.start < 0x8000:
+                block.valid = False
+                self._romx_blocks.pop(block.start, None)
+        self._rom_banks = (rom0, romx)
+        self._rom0_blocks = self._bank_blocks.setdefault((0, rom0), {})
+        self._romx_blocks = self._bank_blocks.setdefault((1, romx), {})
+
+    def _flush_blocks(self):
+        for cache in (self._blocks, *self._bank_blocks.values()):
+            for block in cache.values():
+                block.valid = False
+        self._blocks.clear()
+        self._bank_blocks.clear()
+        self._switch_rom_blocks(*self.memory.cartridge.mapping[:2])
+        for page_blocks in self._page_blocks:
+            page_blocks.clear()
+        self.memory.clear_code_pages()
 
     def _execute(self, instr):
         op = instr["op"]
+        try:
+            handler, cycles, key = self._dispatch[op]
+        except KeyError:
+            raise ValueError(f"Unknown operation: {op}") from None
+        if key is None:
+            extra = handler(None)
+        elif key.__class__ is tuple:
+            extra = handler(tuple(instr[k] for k in key))
+        else:
+            extra = handler(instr[key])
+        return cycles + extra if extra else cycles
 
-        if op == "ADD_A_n8":
-            self.registers["A"] = (self.registers["A"] + instr["imm8"]) & 0xFF
-            self._update_zero_flag()
+    # ── opcode handlers ─────────────────────────────────────
+    def _op_nop(self, arg):
+        pass
 
-        elif op == "SUB_A_n8":
-            self.registers["A"] = (self.registers["A"] - instr["imm8"]) & 0xFF
-            self._update_zero_flag()
+    # ALU: one table lookup gives the packed (A << 8) | F
+    def _op_add_a_n8(self, arg):
+        regs = self.registers
+        v = self._adc[regs.A << 8 | arg]
+        regs.A, regs.F = v >> 8, v & 0xFF
 
-        elif op == "AND_A_n8":
-            self.registers["A"] &= instr["imm8"]
-            self._update_zero_flag()
+    def _op_adc_a_n8(self, arg):
+        regs = self.registers
+        v = self._adc[(regs.F & FLAG_C) << 12 | regs.A << 8 | arg]
+        regs.A, regs.F = v >> 8, v & 0xFF
 
-        elif op == "OR_A_n8":
-            self.registers["A"] |= instr["imm8"]
-            self._update_zero_flag()
+    def _op_sub_a_n8(self, arg):
+        regs = self.registers
+        v = self._sbc[regs.A << 8 | arg]
+        regs.A, regs.F = v >> 8, v & 0xFF
 
-        elif op == "XOR_A_n8":
-            self.registers["A"] ^= instr["imm8"]
-            self._update_zero_flag()
+    def _op_sbc_a_n8(self, arg):
+        regs = self.registers
+        v = self._sbc[(regs.F & FLAG_C) << 12 | regs.A << 8 | arg]
+        regs.A, regs.F = v >> 8, v & 0xFF
 
-        elif op == "INC_A":
-            self.registers["A"] = (self.registers["A"] + 1) & 0xFF
-            self._update_zero_flag()
+    def _op_and_a_n8(self, arg):
+        regs = self.registers
+        v = self._and[regs.A << 8 | arg]
+        regs.A, regs.F = v >> 8, v & 0xFF
 
-        elif op == "DEC_A":
-            self.registers["A"] = (self.registers["A"] - 1) & 0xFF
-            self._update_zero_flag()
+    def _op_xor_a_n8(self, arg):
+        regs = self.registers
+        v = self._xor[regs.A << 8 | arg]
+        regs.A, regs.F = v >> 8, v & 0xFF
 
-        elif op == "LD_r_r":
-            self.registers[instr["r1"]] = self.registers[instr["r2"]]
+    def _op_or_a_n8(self, arg):
+        regs = self.registers
+        v = self._or[regs.A << 8 | arg]
+        regs.A, regs.F = v >> 8, v & 0xFF
 
-        elif op == "LD_A_n8_ptr":
-            self.registers["A"] = self.read_memory(instr["n8"])
-            self._update_zero_flag()
+    def _op_cp_a_n8(self, arg):
+        regs = self.registers
+        regs.F = self._sbc[regs.A << 8 | arg] & 0xFF
 
-        elif op == "LD_n8_A_ptr":
-            self.write_memory(instr["n8"], self.registers["A"])
+    def _op_add_a_r(self, arg):
+        self._op_add_a_n8(getattr(self.registers, arg))
 
-        elif op == "LDH_a8_A":
-            addr = 0xFF00 + instr["a8"]
-            self.write_memory(addr, self.registers["A"])
+    def _op_adc_a_r(self, arg):
+        self._op_adc_a_n8(getattr(self.registers, arg))
 
-        elif op == "LDH_A_a8":
-            addr = 0xFF00 + instr["a8"]
-            self.registers["A"] = self.read_memory(addr)
-            self._update_zero_flag()
+    def _op_sub_a_r(self, arg):
+        self._op_sub_a_n8(getattr(self.registers, arg))
 
-        elif op == "JP":
-            self.registers["PC"] = instr["addr"]
+    def _op_sbc_a_r(self, arg):
+        self._op_sbc_a_n8(getattr(self.registers, arg))
 
-        elif op == "JR":
-            offset = instr["offset"]
-            if offset & 0x80:
-                offset -= 0x100
-            self.registers["PC"] = (self.registers["PC"] + offset) & 0xFFFF
+    def _op_and_a_r(self, arg):
+        self._op_and_a_n8(getattr(self.registers, arg))
 
-        elif op == "CALL":
-            self.stack.append((self.registers["PC"] + 1) & 0xFFFF)
-            self.registers["PC"] = instr["addr"]
+    def _op_xor_a_r(self, arg):
+        self._op_xor_a_n8(getattr(self.registers, arg))
 
-        elif op == "RET":
-            if self.stack:
-                self.registers["PC"] = self.stack.pop()
+    def _op_or_a_r(self, arg):
+        self._op_or_a_n8(getattr(self.registers, arg))
 
-        elif op == "DI":
-            self.IME = False
+    def _op_cp_a_r(self, arg):
+        self._op_cp_a_n8(getattr(self.registers, arg))
 
-        elif op == "EI":
-            self.IME = True
+    def _op_add_a_hlptr(self, arg):
+        self._op_add_a_n8(self.read_memory(self.registers.HL))
 
-        elif op == "HALT":
-            pass
+    def _op_adc_a_hlptr(self, arg):
+        self._op_adc_a_n8(self.read_memory(self.registers.HL))
 
-        else:
-            raise ValueError(f"Unknown operation: {op}")
+    def _op_sub_a_hlptr(self, arg):
+        self._op_sub_a_n8(self.read_memory(self.registers.HL))
 
-        return self.INSTRUCTION_CYCLES.get(op, 4)
+    def _op_sbc_a_hlptr(self, arg):
+        self._op_sbc_a_n8(self.read_memory(self.registers.HL))
 
-    def _update_zero_flag(self):
-        if self.registers["A"] == 0:
-            self.registers["F"] |= 0b10000000
-        else:
-            self.registers["F"] &= 0b01111111
+    def _op_and_a_hlptr(self, arg):
+        self._op_and_a_n8(self.read_memory(self.registers.HL))
+
+    def _op_xor_a_hlptr(self, arg):
+        self._op_xor_a_n8(self.read_memory(self.registers.HL))
+
+    def _op_or_a_hlptr(self, arg):
+        self._op_or_a_n8(self.read_memory(self.registers.HL))
+
+    def _op_cp_a_hlptr(self, arg):
+        self._op_cp_a_n8(self.read_memory(self.registers.HL))
+
+    def _op_inc_r(self, arg):
+        regs = self.registers
+        reg = arg or "A"
+        v = self._inc[getattr(regs, reg)]
+        setattr(regs, reg, v >> 8)
+        regs.F = (regs.F & FLAG_C) | (v & 0xFF)
+
+    def _op_dec_r(self, arg):
+        regs = self.registers
+        reg = arg or "A"
+        v = self._dec[getattr(regs, reg)]
+        setattr(regs, reg, v >> 8)
+        regs.F = (regs.F & FLAG_C) | (v & 0xFF)
+
+    def _op_inc_hlptr(self, arg):
+        regs = self.registers
+        v = self._inc[self.read_memory(regs.HL)]
+        self.write_memory(regs.HL, v >> 8)
+        regs.F = (regs.F & FLAG_C) | (v & 0xFF)
+
+    def _op_dec_hlptr(self, arg):
+        regs = self.registers
+        v = self._dec[self.read_memory(regs.HL)]
+        self.write_memory(regs.HL, v >> 8)
+        regs.F = (regs.F & FLAG_C) | (v & 0xFF)
+
+    def _op_rlca(self, arg):
+        regs = self.registers
+        v = self._rot[0][regs.A]
+        regs.A, regs.F = v >> 8, v & 0xFF
+
+    def _op_rrca(self, arg):
+        regs = self.registers
+        v = self._rot[1][regs.A]
+        regs.A, regs.F = v >> 8, v & 0xFF
+
+    def _op_rla(self, arg):
+        regs = self.registers
+        v = self._rot[2][(regs.F & FLAG_C) << 4 | regs.A]
+        regs.A, regs.F = v >> 8, v & 0xFF
+
+    def _op_rra(self, arg):
+        regs = self.registers
+        v = self._rot[3][(regs.F & FLAG_C) << 4 | regs.A]
+        regs.A, regs.F = v >> 8, v & 0xFF
+
+    def _op_daa(self, arg):
+        regs = self.registers
+        v = self._daa[(regs.F >> 4) << 8 | regs.A]
+        regs.A, regs.F = v >> 8, v & 0xFF
+
+    def _op_cpl(self, arg):
+        regs = self.registers
+        regs.A ^= 0xFF
+        regs.F |= FLAG_N | FLAG_H
+
+    def _op_scf(self, arg):
+        regs = self.registers
+        regs.F = (regs.F & FLAG_Z) | FLAG_C
+
+    def _op_ccf(self, arg):
+        regs = self.registers
+        regs.F = (regs.F & (FLAG_Z | FLAG_C)) ^ FLAG_C
+
+    def _op_ld_r_r(self, arg):
+        r1, r2 = arg
+        setattr(self.registers, r1, getattr(self.registers, r2))
+
+    def _op_ld_r_n8(self, arg):
+        setattr(self.registers, arg[0], arg[1])
+
+    def _op_ld_r_hlptr(self, arg):
+        setattr(self.registers, arg, self.read_memory(self.registers.HL))
+
+    def _op_ld_hlptr_r(self, arg):
+        self.write_memory(self.registers.HL, getattr(self.registers, arg))
+
+    def _op_ld_hlptr_n8(self, arg):
+        self.write_memory(self.registers.HL, arg)
+
+    def _op_ld_rr_n16(self, arg):
+        setattr(self.registers, arg[0], arg[1])
+
+    def _op_ld_rrptr_a(self, arg):
+        self.write_memory(getattr(self.registers, arg), self.registers.A)
+
+    def _op_ld_a_rrptr(self, arg):
+        self.registers.A = self.read_memory(getattr(self.registers, arg))
+
+    def _op_ld_hliptr_a(self, arg):
+        regs = self.registers
+        hl = regs.HL
+        self.write_memory(hl, regs.A)
+        regs.HL = (hl + 1) & 0xFFFF
+
+    def _op_ld_a_hliptr(self, arg):
+        regs = self.registers
+        hl = regs.HL
+        regs.A = self.read_memory(hl)
+        regs.HL = (hl + 1) & 0xFFFF
+
+    def _op_ld_hldptr_a(self, arg):
+        regs = self.registers
+        hl = regs.HL
+        self.write_memory(hl, regs.A)
+        regs.HL = (hl - 1) & 0xFFFF
+
+    def _op_ld_a_hldptr(self, arg):
+        regs = self.registers
+        hl = regs.HL
+        regs.A = self.read_memory(hl)
+        regs.HL = (hl - 1) & 0xFFFF
+
+    def _op_inc_rr(self, arg):
+        setattr(self.registers, arg, (getattr(self.registers, arg) + 1) & 0xFFFF)
+
+    def _op_dec_rr(self, arg):
+        setattr(self.registers, arg, (getattr(self.registers, arg) - 1) & 0xFFFF)
+
+    def _op_add_hl_rr(self, arg):
+        regs = self.registers
+        hl, v = regs.HL, getattr(regs, arg)
+        r = hl + v
+        regs.HL = r & 0xFFFF
+        regs.F = (regs.F & FLAG_Z) | (FLAG_H if (hl & 0xFFF) + (v & 0xFFF) > 0xFFF else 0) \
+            | (FLAG_C if r > 0xFFFF else 0)
+
+    def _sp_plus_e8(self, arg):
+        # H and C come from the unsigned add into SP's low byte; Z, N clear
+        sp = self.registers.SP
+        self.registers.F = (FLAG_H if (sp & 0xF) + (arg & 0xF) > 0xF else 0) \
+            | (FLAG_C if (sp & 0xFF) + arg > 0xFF else 0)
+        return (sp + (arg - 0x100 if arg & 0x80 else arg)) & 0xFFFF
+
+    def _op_add_sp_e8(self, arg):
+        self.registers.SP = self._sp_plus_e8(arg)
+
+    def _op_ld_hl_sp_e8(self, arg):
+        self.registers.HL = self._sp_plus_e8(arg)
+
+    def _op_ld_sp_hl(self, arg):
+        self.registers.SP = self.registers.HL
+
+    def _op_ld_a16_sp(self, arg):
+        self.memory.write16(arg, self.registers.SP)
+
+    def _op_ld_a_n8(self, arg):
+        self.registers.A = arg
+
+    def _op_ld_a_n8_ptr(self, arg):
+        self.registers.A = self.read_memory(arg)
+
+    def _op_ld_n8_a_ptr(self, arg):
+        self.write_memory(arg, self.registers.A)
+
+    def _op_ldh_a8_a(self, arg):
+        self.write_memory(0xFF00 + arg, self.registers.A)
+
+    def _op_ldh_a_a8(self, arg):
+        self.registers.A = self.read_memory(0xFF00 + arg)
+
+    def _op_ldh_c_a(self, arg):
+        self.write_memory(0xFF00 + self.registers.C, self.registers.A)
+
+    def _op_ldh_a_c(self, arg):
+        self.registers.A = self.read_memory(0xFF00 + self.registers.C)
+
+    def _op_jp(self, arg):
+        self.registers.PC = arg
+
+    def _op_jp_cc(self, arg):
+        cc, addr = arg
+        mask, want = self.CONDITIONS[cc]
+        if self.registers.F & mask == want:
+            self.registers.PC = addr
+            return 4
+
+    def _op_jp_hl(self, arg):
+        self.registers.PC = self.registers.HL
+
+    def _op_jr_nz(self, arg):
+        if not self.registers.F & 0x80:
+            self._op_jr(arg)
+            return 4
+
+    def _op_jr_z(self, arg):
+        if self.registers.F & 0x80:
+            self._op_jr(arg)
+            return 4
+
+    def _op_jr_nc(self, arg):
+        if not self.registers.F & FLAG_C:
+            self._op_jr(arg)
+            return 4
+
+    def _op_jr_c(self, arg):
+        if self.registers.F & FLAG_C:
+            self._op_jr(arg)
+            return 4
+
+    def _op_jr(self, arg):
+        offset = arg
+        if offset & 0x80:
+            offset -= 0x100
+        self.registers.PC = (self.registers.PC + offset) & 0xFFFF
+
+    # stack: SP-relative words through Memory's two-byte access path
+    def _push(self, val):
+        regs = self.registers
+        regs.SP = sp = (regs.SP - 2) & 0xFFFF
+        self.memory.write16(sp, val)
+
+    def _pop(self):
+        regs = self.registers
+        sp = regs.SP
+        regs.SP = (sp + 2) & 0xFFFF
+        return self.memory.read16(sp)
+
+    def _op_push_rr(self, arg):
+        self._push(getattr(self.registers, arg))
+
+    def _op_pop_rr(self, arg):
+        setattr(self.registers, arg, self._pop())   # AF drops F's low nibble
+
+    def _op_call(self, arg):
+        self._push((self.registers.PC + 1) & 0xFFFF)
+        self.registers.PC = arg
+
+    def _op_call_a16(self, arg):
+        # PC already points past the 3-byte CALL
+        self._push(self.registers.PC)
+        self.registers.PC = arg
+
+    def _op_call_cc(self, arg):
+        cc, addr = arg
+        mask, want = self.CONDITIONS[cc]
+        if self.registers.F & mask == want:
+            self._op_call_a16(addr)
+            return 12
+
+    def _op_rst(self, arg):
+        self._push((self.registers.PC + 1) & 0xFFFF)
+        self.registers.PC = arg
+
+    def _op_rst_vec(self, arg):
+        # PC already points past the RST
+        self._push(self.registers.PC)
+        self.registers.PC = arg
+
+    def _op_ret(self, arg):
+        self.registers.PC = self._pop()
+
+    def _op_ret_cc(self, arg):
+        mask, want = self.CONDITIONS[arg]
+        if self.registers.F & mask == want:
+            self.registers.PC = self._pop()
+            return 12
+
+    def _op_reti(self, arg):
+        self._op_ret(arg)
+        self.IME = True
+
+    def _op_di(self, arg):
+        self.IME = False
+
+    def _op_ei(self, arg):
+        self.IME = True
+        self._ei_cycle = self.scheduler.cycles + self.INSTRUCTION_CYCLES["EI"]
+
+    def _op_halt(self, arg):
+        self.halted = True
+
+    # CB prefix: *arg* is the second byte, xx yyy zzz = group, bit/op, register
+    def _op_prefix_cb(self, arg):
+        regs = self.registers
+        group, y, reg = arg >> 6, arg >> 3 & 7, self.REG8[arg & 7]
+        v = getattr(regs, reg) if reg else self.read_memory(regs.HL)
+        if group == 1:                              # BIT y
+            regs.F = (regs.F & FLAG_C) | FLAG_H | (0 if v >> y & 1 else FLAG_Z)
+            return 0 if reg else 4
+        if group == 0:                              # rotate / shift / swap
+            r = self._cb[y << 9 | (regs.F & FLAG_C) << 4 | v]
+            v, regs.F = r >> 8, r & 0xFF
+        elif group == 2:                            # RES y
+            v &= ~(1 << y)
+        else:                                       # SET y
+            v |= 1 << y
+        if reg:
+            setattr(regs, reg, v)
+            return 0
+        self.write_memory(regs.HL, v)
+        return 8
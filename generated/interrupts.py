@@ -0,0 +1,61 @@
+VBLANK, STAT, TIMER, SERIAL, JOYPAD = range(5)
+
+# handler address for each IF/IE bit, highest priority first
+VECTORS = (0x40, 0x48, 0x50, 0x58, 0x60)
+
+
+class InterruptController:
+    """
+    IF (0xFF0F) and IE (0xFFFF).
+
+    Devices raise lines with ``request(bit)``.  ``pending`` is kept equal to
+    ``IF & IE`` on every change, so the CPU only has to test one int for
+    truth between blocks instead of decoding five bits per instruction.
+    """
+
+    IF_ADDR = 0xFF0F
+    IE_ADDR = 0xFFFF
+
+    def __init__(self):
+        self._if = 0
+        self._ie = 0
+        self.pending = 0
+
+    @property
+    def IF(self):
+        return self._if
+
+    @IF.setter
+    def IF(self, val):
+        self._if = val & 0x1F
+        self.pending = self._if & self._ie
+
+    @property
+    def IE(self):
+        return self._ie
+
+    @IE.setter
+    def IE(self, val):
+        self._ie = val & 0xFF
+        self.pending = self._if & self._ie
+
+    def request(self, bit):
+        self._if |= 1 << bit
+        self.pending = self._if & self._ie
+
+    def acknowledge(self):
+        """Clear the highest-priority pending bit and return its vector."""
+        bit = (self.pending & -self.pending).bit_length() - 1
+        self.IF = self._if & ~(1 << bit)
+        return VECTORS[bit]
+
+    def read(self, addr):
+        if addr == self.IF_ADDR:
+            return self._if | 0xE0          # upper three bits read as 1
+        return self._ie
+
+    def write(self, addr, val):
+        if addr == self.IF_ADDR:
+            self.IF = val
+        else:
+            self.IE = val
@@ -19,21 +19,27 @@ class Joypad:
             "start": False
         }
 
-        # 0: pressed, 1: not pressed (active low)
-        self.select_directions = True  # Bit 4 = 0 means direction keys selected
-        self.select_buttons = True     # Bit 5 = 0 means button keys selected
+        # True while the row is selected: P1 bit 4 (directions) or bit 5
+        # (buttons) written as 0.  P1 = 0xFF selects neither.
+        self.select_directions = False
+        self.select_buttons = False
 
     def read(self):
-        result = 0xCF  # Upper 4 bits = 1, bits 4 and 5 = select lines
-
+        # upper 2 bits = 1, bits 4 and 5 read back as written, keys active low
+        result = 0xCF
+        if not self.select_directions:
+            result |= 0x10
         if not self.select_buttons:
+            result |= 0x20
+
+        if self.select_buttons:
             # Action buttons
             result &= ~(0x01 if self.buttons["a"] else 0x00)
             result &= ~(0x02 if self.buttons["b"] else 0x00)
             result &= ~(0x04 if self.buttons["select"] else 0x00)
             result &= ~(0x08 if self.buttons["start"] else 0x00)
 
-        if not self.select_directions:
+        if self.select_directions:
             # Directional buttons
             result &= ~(0x01 if self.buttons["right"] else 0x00)
             result &= ~(0x02 if self.buttons["left"] else 0x00)
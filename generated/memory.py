@@ -1,6 +1,11 @@
 from enum import Enum
+from .scheduler import Scheduler
 from .timer import Timer
-from .cartridge import Cartridge
+from .cartridge import Cartridge, ROM_BANK_SIZE, RAM_BANK_SIZE
+from .ppu import PPU
+from .apu import APU
+from .joypad import Joypad
+from .interrupts import InterruptController
 
 
 class MemoryRegion(Enum):
@@ -14,16 +19,48 @@ class MemoryRegion(Enum):
     TIMER = (0xFF04, 0xFF07, True)
     IO = (0xFF00, 0xFF7F, True)
     HRAM = (0xFF80, 0xFFFE, False)
+    IE = (0xFFFF, 0xFFFF, True)
 
     def contains(self, addr):
         return self.value[0] <= addr <= self.value[1]
 
 
+def _compile_region_table():
+    # page → region name when one region owns the whole page, else None
+    # (per-address names for those pages live in the second dict)
+    bounds = [(region.name, region.value[0], region.value[1]) for region in MemoryRegion]
+
+    def lookup(addr):
+        for name, lo, hi in bounds:
+            if lo <= addr <= hi:
+                return name
+        return "UNKNOWN"
+
+    pages, mixed = [], {}
+    for page in range(0x100):
+        lo, hi = page << 8, (page << 8) | 0xFF
+        hits = [name for name, start, end in bounds if start <= hi and lo <= end]
+        first = lookup(lo)
+        if not hits or (hits[0] == first and all(
+            start <= lo and hi <= end for name, start, end in bounds if name == first
+        )):
+            pages.append(first)
+        else:
+            pages.append(None)
+            mixed.update((addr, lookup(addr)) for addr in range(lo, hi + 1))
+    return pages, mixed
+
+
+_REGION_PAGES, _REGION_MIXED = _compile_region_table()
+
+
 def get_memory_region(addr):
-    for region in MemoryRegion:
-        if region.contains(addr):
-            return region.name
-    return "UNKNOWN"
+    if not 0 <= addr <= 0xFFFF:
+        return "UNKNOWN"
+    name = _REGION_PAGES[addr >> 8]
+    if name is None:
+        return _REGION_MIXED[addr]
+    return name
 
 
 class Memory:
@@ -36,56 +73,354 @@ class Memory:
         self.oam = bytearray(0xA0)
         self.io = bytearray(0x80)
         self.hram = bytearray(0x7F)
-        self.timer = Timer()
+        self.scheduler = Scheduler()
+        self.interrupts = InterruptController()
+        self.timer = Timer(self.scheduler, self.request_interrupt)
+        self.ppu = PPU(self.scheduler, self.vram, self.request_interrupt, self.oam)
+        self.apu = APU(self.scheduler)
+        self.joypad = Joypad()
+        # pages holding cached CPU code blocks; writes there are reported to
+        # ``code_listener(start, end)`` so stale blocks are dropped
+        self.code_pages = bytearray(0x100)
+        self.code_listener = None
+        # ``rom_listener(rom0, romx)`` after a bank switch changes the ROM
+        self.rom_listener = None
+        self._build_page_table()
+        self._build_io_bus()
 
-    def read(self, addr):
-        if MemoryRegion.ROM0.contains(addr):
-            return self.cartridge.rom[addr - 0x0000]
-        elif MemoryRegion.ROMX.contains(addr):
-            return self.cartridge.rom[addr - 0x4000]
-        elif MemoryRegion.RAMX.contains(addr):
-            return self.ramx[addr - 0xA000]
-        elif MemoryRegion.VRAM.contains(addr):
-            return self.vram[addr - 0x8000]
-        elif MemoryRegion.WRAM0.contains(addr):
-            return self.wram0[addr - 0xC000]
-        elif MemoryRegion.WRAMX.contains(addr):
-            return self.wramx[addr - 0xD000]
-        elif MemoryRegion.OAM.contains(addr):
-            return self.oam[addr - 0xFE00]
-        elif MemoryRegion.TIMER.contains(addr):
-            return self.timer.read(addr)
-        elif MemoryRegion.IO.contains(addr):
-            return self.io[addr - 0xFF00]
-        elif MemoryRegion.HRAM.contains(addr):
-            return self.hram[addr - 0xFF80]
+    # ---------------------------------------------------------
+    # page table
+    # ---------------------------------------------------------
+    def _build_page_table(self):
+        """
+        Compile ``MemoryRegion`` into two 256-entry tables indexed by the
+        high address byte.  An entry is a 256-byte ``memoryview`` into the
+        backing buffer, or ``None`` to take the slow path (ROM writes, OAM/
+        I/O/HRAM, unmapped space, VRAM tile data, disabled cartridge RAM,
+        pages watched for code writes).  Cartridge pages are windows onto
+        the current banks, see ``_map_banks``.
+        """
+        backing = {
+            MemoryRegion.VRAM: (self.vram, True),
+            MemoryRegion.WRAM0: (self.wram0, True),
+            MemoryRegion.WRAMX: (self.wramx, True),
+        }
+        self._read_pages = [None] * 0x100
+        self._write_pages = [None] * 0x100
+        self._ram_pages = [None] * 0x100     # writable views, kept for unwatching
+        for region, (buf, writable) in backing.items():
+            start, end = region.value[0], region.value[1] + 1
+            view = memoryview(buf)
+            for page in range(start >> 8, end >> 8):
+                offset = (page << 8) - start
+                self._read_pages[page] = view[offset:offset + 0x100]
+                if writable:
+                    self._ram_pages[page] = self._write_pages[page] = view[offset:offset + 0x100]
+        # tile data writes go through _write_slow to dirty the PPU tile cache
+        for page in range(0x80, 0x98):
+            self._write_pages[page] = None
+
+        self._rom_views = memoryview(self.cartridge.rom)
+        self._ram_views = memoryview(self.ramx)
+        self._bank_pages = {}                # (kind, bank) → 64/32 page views
+        self.cartridge.bank_listener = self._map_banks
+        self._mapping = None
+        self._map_banks()
+
+    def _pages_for(self, kind, bank):
+        # page views of one ROM or RAM bank, built once per bank; switching
+        # banks then only swaps list entries and never copies data
+        pages = self._bank_pages.get((kind, bank))
+        if pages is None:
+            if kind == "rom":
+                view, size = self._rom_views, ROM_BANK_SIZE
+            else:
+                view, size = self._ram_views, RAM_BANK_SIZE
+            base = bank * size
+            pages = [view[base + off:base + off + 0x100] for off in range(0, size, 0x100)]
+            self._bank_pages[(kind, bank)] = pages
+        return pages
+
+    def _map_banks(self):
+        """Point the cartridge pages at the banks selected by the MBC."""
+        rom0, romx, ram = self.cartridge.mapping
+        old = self._mapping or (None, None, None)
+        self._mapping = (rom0, romx, ram)
+        self._read_pages[0x00:0x40] = self._pages_for("rom", rom0)
+        self._read_pages[0x40:0x80] = self._pages_for("rom", romx)
+        ram_pages = self._pages_for("ram", ram) if ram is not None else [None] * 0x20
+        self._read_pages[0xA0:0xC0] = ram_pages
+        self._write_pages[0xA0:0xC0] = ram_pages
+        self._ram_pages[0xA0:0xC0] = ram_pages
+        self._build_windows()
+        if self.rom_listener is not None and old[:2] != (rom0, romx):
+            self.rom_listener(rom0, romx)
+
+    def _build_windows(self):
+        # (start, end, view, writable): address ranges backed by one
+        # contiguous buffer under the current banking, in address order
+        rom0, romx, ram = self._mapping
+        rom = self._rom_views
+        windows = [
+            (0x0000, 0x4000, rom[rom0 * ROM_BANK_SIZE:(rom0 + 1) * ROM_BANK_SIZE], False),
+            (0x4000, 0x8000, rom[romx * ROM_BANK_SIZE:(romx + 1) * ROM_BANK_SIZE], False),
+            (0x8000, 0xA000, memoryview(self.vram), True),
+        ]
+        if ram is not None:
+            windows.append((0xA000, 0xC000, self._ram_views[
+                ram * RAM_BANK_SIZE:(ram + 1) * RAM_BANK_SIZE], True))
+        windows += [
+            (0xC000, 0xD000, memoryview(self.wram0), True),
+            (0xD000, 0xE000, memoryview(self.wramx), True),
+            (0xFE00, 0xFEA0, memoryview(self.oam), True),
+            (0xFF80, 0xFFFF, memoryview(self.hram), True),
+        ]
+        self._windows = windows
+
+    def _window(self, addr):
+        for window in self._windows:
+            if window[0] <= addr < window[1]:
+                return window
+        return None
+
+    # ---------------------------------------------------------
+    # I/O bus (0xFF00–0xFFFF)
+    # ---------------------------------------------------------
+    def _build_io_bus(self):
+        # per-port handlers indexed by ``addr & 0xFF``; None → plain storage
+        self._io_readers = [None] * 0x100
+        self._io_writers = [None] * 0x100
+
+        self.register_io(0xFF00, 0xFF00,
+                         lambda addr: self.joypad.read(),
+                         lambda addr, val: self.joypad.write(val))
+        self.register_io(0xFF04, 0xFF07, self.timer.read, self.timer.write)
+        for addr in (0xFF0F, 0xFFFF):
+            self.register_io(addr, addr, self.interrupts.read, self._write_interrupts)
+        self.register_io(0xFF46, 0xFF46, write=self._oam_dma)
+        for addr in self.apu.registers:
+            self.register_io(addr, addr, self.apu.read, self.apu.write)
+        for addr in self.ppu.registers:
+            self.register_io(addr, addr, self.ppu.read, self.ppu.write)
+
+    def register_io(self, start, end, read=None, write=None):
+        """
+        Claim ports ``start..end`` (inclusive) for a device.  ``read(addr)``
+        and ``write(addr, val)`` are then called for every access to those
+        ports; a port claimed with only one of them keeps plain byte
+        storage for the other direction.
+        """
+        if not 0xFF00 <= start <= end <= 0xFFFF:
+            raise ValueError(f"I/O range out of bounds: {hex(start)}–{hex(end)}")
+        for addr in range(start, end + 1):
+            if read is not None:
+                self._io_readers[addr & 0xFF] = read
+            if write is not None:
+                self._io_writers[addr & 0xFF] = write
+
+    def unregister_io(self, start, end):
+        for addr in range(start, end + 1):
+            self._io_readers[addr & 0xFF] = None
+            self._io_writers[addr & 0xFF] = None
+
+    def _oam_dma(self, addr, val):
+        # one slice copy of 160 bytes from val << 8; bus-blocking timing of
+        # the real transfer is not modelled
+        self.io[0x46] = val
+        if val >= 0xE0:
+            val -= 0x20                 # above 0xDFFF the DMA unit sees WRAM
+        page = self._read_pages[val]
+        if page is not None:
+            self.oam[:] = page[:0xA0]
         else:
-            raise ValueError(f"Read from invalid memory address: {hex(addr)}")
+            self.oam[:] = bytes(self.read((val << 8) | i) for i in range(0xA0))
+        self.ppu.mark_oam_dirty()
+
+    def _write_interrupts(self, addr, val):
+        self.interrupts.write(addr, val)
+        if self.interrupts.pending:
+            # a due event makes CPU.run() re-check IF & IE after this
+            # instruction instead of at the end of its block
+            self.scheduler.schedule("irq", self.scheduler.cycles, _ignore)
+
+    def request_interrupt(self, bit):
+        """Raise interrupt *bit* in IF (0xFF0F)."""
+        self.interrupts.request(bit)
+
+    def watch_code_page(self, page, watched):
+        """Route writes to *page* through ``code_listener`` while *watched*."""
+        self.code_pages[page] = 1 if watched else 0
+        self._write_pages[page] = None if watched else self._ram_pages[page]
+
+    def clear_code_pages(self):
+        for page in range(0x100):
+            if self.code_pages[page]:
+                self.watch_code_page(page, False)
+
+    # ---------------------------------------------------------
+    # byte access
+    # ---------------------------------------------------------
+    def read(self, addr):
+        if 0 <= addr <= 0xFFFF:
+            page = self._read_pages[addr >> 8]
+            if page is not None:
+                return page[addr & 0xFF]
+        return self._read_slow(addr)
 
     def write(self, addr, val):
         if not (0 <= val <= 0xFF):
             raise ValueError(f"Value must be a byte (0–255), got {val}")
+        if 0 <= addr <= 0xFFFF:
+            page = self._write_pages[addr >> 8]
+            if page is not None:
+                page[addr & 0xFF] = val
+                return
+        self._write_slow(addr, val)
 
-        if MemoryRegion.ROM0.contains(addr) or MemoryRegion.ROMX.contains(addr):
-            raise ValueError(f"Cannot write to ROM address: {hex(addr)}")
-        elif MemoryRegion.RAMX.contains(addr):
-            self.ramx[addr - 0xA000] = val
-        elif MemoryRegion.VRAM.contains(addr):
-            self.vram[addr - 0x8000] = val
-        elif MemoryRegion.WRAM0.contains(addr):
-            self.wram0[addr - 0xC000] = val
-        elif MemoryRegion.WRAMX.contains(addr):
-            self.wramx[addr - 0xD000] = val
-        elif MemoryRegion.OAM.contains(addr):
+    def _read_slow(self, addr):
+        if 0xFF00 <= addr <= 0xFFFF:
+            handler = self._io_readers[addr & 0xFF]
+            if handler is not None:
+                return handler(addr)
+            if addr < 0xFF80:
+                return self.io[addr - 0xFF00]
+            if addr < 0xFFFF:
+                return self.hram[addr - 0xFF80]
+        elif 0xFE00 <= addr <= 0xFE9F:
+            return self.oam[addr - 0xFE00]
+        elif 0xA000 <= addr <= 0xBFFF:
+            return 0xFF                     # cartridge RAM disabled
+        raise ValueError(f"Read from invalid memory address: {hex(addr)}")
+
+    def _write_slow(self, addr, val):
+        if 0xFF00 <= addr <= 0xFFFF:
+            handler = self._io_writers[addr & 0xFF]
+            if handler is not None:
+                handler(addr, val)
+                return
+            if addr < 0xFF80:
+                self.io[addr - 0xFF00] = val
+                return
+            if addr < 0xFFFF:
+                self.hram[addr - 0xFF80] = val
+                if self.code_pages[0xFF]:
+                    self.code_listener(addr, addr + 1)
+                return
+        elif 0xFE00 <= addr <= 0xFE9F:
             self.oam[addr - 0xFE00] = val
-        elif MemoryRegion.TIMER.contains(addr):
-            self.timer.write(addr, val)
-        elif MemoryRegion.IO.contains(addr):
-            self.io[addr - 0xFF00] = val
-        elif MemoryRegion.HRAM.contains(addr):
-            self.hram[addr - 0xFF80] = val
-        else:
-            raise ValueError(f"Write to invalid memory address: {hex(addr)}")
+            self.ppu.mark_oam_dirty()
+            return
+        elif 0x8000 <= addr < 0x9800:
+            self.vram[addr - 0x8000] = val
+            self.ppu.mark_tiles_dirty(addr - 0x8000, addr - 0x7FFF)
+            return
+        elif 0 <= addr <= 0x7FFF:
+            self.cartridge.write_control(addr, val)     # raises without an MBC
+            return
+        elif 0xA000 <= addr <= 0xBFFF:
+            return                          # cartridge RAM disabled
+        elif 0 <= addr < 0xFE00 and self.code_pages[addr >> 8]:
+            self._ram_pages[addr >> 8][addr & 0xFF] = val
+            self.code_listener(addr, addr + 1)
+            return
+        raise ValueError(f"Write to invalid memory address: {hex(addr)}")
 
     def read8(self, addr):
         return self.read(addr)
+
+    # ---------------------------------------------------------
+    # bulk access
+    # ---------------------------------------------------------
+    def view(self, start, end):
+        """
+        Zero-copy ``memoryview`` of ``[start, end)``.  The range must lie in
+        one backing buffer (ROM bank, VRAM, cartridge RAM bank, WRAM0, WRAMX,
+        OAM or HRAM); ROM views are read-only.  Writing through a view skips
+        the PPU cache and code-block bookkeeping – use ``write_block``.
+        """
+        window = self._window(start)
+        if window is None or not start < end <= window[1]:
+            raise ValueError(f"No single buffer backs {hex(start)}–{hex(end)}")
+        return window[2][start - window[0]:end - window[0]]
+
+    def read_block(self, start, end):
+        """
+        ``[start, end)`` as a bytearray, one slice copy per backing buffer
+        crossed; I/O ports and unbacked bytes are read one at a time.
+        """
+        if not 0 <= start <= end <= 0x10000:
+            raise ValueError(f"Block out of range: {hex(start)}–{hex(end)}")
+        out = bytearray(end - start)
+        addr = start
+        while addr < end:
+            window = self._window(addr)
+            if window is None:
+                out[addr - start] = self.read(addr)
+                addr += 1
+                continue
+            stop = min(end, window[1])
+            out[addr - start:stop - start] = window[2][addr - window[0]:stop - window[0]]
+            addr = stop
+        return out
+
+    def write_block(self, start, data):
+        """
+        Store *data* at *start* with one slice copy per writable buffer,
+        keeping the PPU caches and cached code blocks coherent.  ROM (MBC
+        control) and I/O bytes go through ``write`` one at a time.
+        """
+        data = memoryview(data).cast("B")
+        end = start + len(data)
+        if not 0 <= start <= end <= 0x10000:
+            raise ValueError(f"Block out of range: {hex(start)}–{hex(end)}")
+        addr = start
+        while addr < end:
+            window = self._window(addr)
+            if window is None or not window[3]:
+                self.write(addr, data[addr - start])
+                addr += 1
+                continue
+            stop = min(end, window[1])
+            window[2][addr - window[0]:stop - window[0]] = data[addr - start:stop - start]
+            if window[0] == 0x8000 and addr < 0x9800:
+                self.ppu.mark_tiles_dirty(addr - 0x8000, min(stop, 0x9800) - 0x8000)
+            elif window[0] == 0xFE00:
+                self.ppu.mark_oam_dirty()
+            if any(self.code_pages[addr >> 8:((stop - 1) >> 8) + 1]):
+                self.code_listener(addr, stop)
+            addr = stop
+
+    # ---------------------------------------------------------
+    # 16-bit access (stack, pointers)
+    # ---------------------------------------------------------
+    def read16(self, addr):
+        """Little-endian word at *addr*; one page lookup when both bytes share it."""
+        lo = addr & 0xFF
+        if lo != 0xFF:
+            page = self._read_pages[addr >> 8]
+            if page is not None:
+                return page[lo] | page[lo + 1] << 8
+            if 0xFF80 <= addr < 0xFFFE:
+                hram = self.hram
+                return hram[addr - 0xFF80] | hram[addr - 0xFF7F] << 8
+        return self.read(addr) | self.read((addr + 1) & 0xFFFF) << 8
+
+    def write16(self, addr, val):
+        lo = addr & 0xFF
+        if lo != 0xFF:
+            page = self._write_pages[addr >> 8]
+            if page is not None:
+                page[lo] = val & 0xFF
+                page[lo + 1] = val >> 8
+                return
+            if 0xFF80 <= addr < 0xFFFE and not self.code_pages[0xFF]:
+                hram = self.hram
+                hram[addr - 0xFF80] = val & 0xFF
+                hram[addr - 0xFF7F] = val >> 8
+                return
+        self.write(addr, val & 0xFF)
+        self.write((addr + 1) & 0xFFFF, val >> 8)
+
+
+def _ignore(cycle):
+    pass
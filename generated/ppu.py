@@ -7,8 +7,32 @@ Implemented
 • LCDC (0xFF40) bit 7 gates the entire PPU:
     – When LCD is **off** (bit7 = 0) LY ≡ 0 and does not advance.
     – When LCD is **on**  (bit7 = 1) LY increments every 456 CPU cycles
-      and wraps 0‑153.  (STAT, rendering and IRQs are still TODO.)
+      and wraps 0‑153.
+• Mode changes are scheduler events, so the PPU is called four times per
+  visible line rather than once per cycle:
+      mode 2 (OAM scan, 80) → mode 3 (transfer, 172) → mode 0 (HBlank, 204)
+  and lines 144‑153 are mode 1 (VBlank).  Mode 3 has a fixed length.
+• STAT (0xFF41) reports the mode and LY==LYC; IF bit 0 is raised on
+  entering VBlank and IF bit 1 on each rising edge of the STAT interrupt
+  line (mode 0/1/2 and LYC sources gated by STAT bits 3‑6).
+• Each visible line is rendered into ``framebuffer`` (144×160 shades
+  0‑3) at the start of its mode 3: background and window tiles are
+  decoded and palette‑mapped with whole‑line NumPy operations.
+• Sprites: OAM is indexed by Y once per OAM change; each line takes its
+  ≤10 sprites from that index with a binary search instead of scanning
+  all 40 entries.
+• ``frame_skip`` renders only every Nth frame (0 ⇒ headless); frames asked
+  for with ``request_frame()`` are always drawn.  Timing, STAT and
+  interrupts are identical whether or not a frame is rendered.
+• Tiles are decoded once into ``tiles`` (384×8×8 colour indices).  VRAM
+  writes mark tiles dirty and only those are decoded again before the
+  next line is drawn.
 """
+import hashlib
+
+import numpy as np
+
+from .scheduler import Scheduler
 
 # ───────────────────────── helpers ──────────────────────────
 class Register8:
@@ -28,57 +52,295 @@ class Register8:
 class PPU:
     CYCLES_PER_SCANLINE = 456             # CPU cycles per LY++
     TOTAL_SCANLINES     = 154             # LY range 0‑153
+    SCREEN_WIDTH        = 160
+    SCREEN_HEIGHT       = 144             # visible lines; 144‑153 are VBlank
+    TILE_COUNT          = 384             # 0x8000‑0x97FF, 16 bytes each
+    OAM_SCAN_CYCLES     = 80              # mode 2
+    TRANSFER_CYCLES     = 172             # mode 3
+    HBLANK_CYCLES       = 204             # mode 0
+    VBLANK_BIT, STAT_BIT = 0, 1           # IF bits
+    # scheduled "ppu" callbacks, in line order (save states store the index)
+    EVENT_STEPS = ("_start_transfer", "_start_hblank", "_next_line")
 
-    def __init__(self):
+    MAX_LINE_SPRITES    = 10
+
+    def __init__(self, scheduler=None, vram=None, request_interrupt=None, oam=None):
+        # standalone PPUs get a private clock driven by tick()
+        self.scheduler = scheduler if scheduler is not None else Scheduler()
+        self.request_interrupt = request_interrupt or (lambda bit: None)
+        self._stat_line = False              # STAT IRQ line, for edge detection
+        # shares Memory.vram; a standalone PPU gets its own blank VRAM
+        self.vram = np.frombuffer(vram if vram is not None else bytearray(0x2000),
+                                  dtype=np.uint8)
+        self.framebuffer = np.zeros((self.SCREEN_HEIGHT, self.SCREEN_WIDTH), np.uint8)
+        self.tiles = np.zeros((self.TILE_COUNT, 8, 8), np.uint8)
+        self._tile_dirty = np.ones(self.TILE_COUNT, np.bool_)
+        self._tiles_stale = True
+        # shares Memory.oam: 40 × (Y, X, tile, attributes)
+        self.oam = np.frombuffer(oam if oam is not None else bytearray(0xA0),
+                                 dtype=np.uint8)
+        self._sprite_order = np.arange(40)   # OAM indices sorted by Y
+        self._sprite_ys = np.zeros(40, np.uint8)
+        self._oam_dirty = True
+        self._window_line = 0                # internal window row counter
+        self.frame_skip = 1                  # render every Nth frame; 0 ⇒ never
+        self.frame_count = 0                 # VBlanks entered so far
+        self.rendered_frame = None           # frame number now in framebuffer
+        self._frame_requested = False
+        self._render_frame = True
         self.registers = {
             0xFF40: Register8("LCDC", 0xFF40),                   # LCD Control
             0xFF41: Register8("STAT", 0xFF41),                   # Status
             0xFF42: Register8("SCY",  0xFF42),
             0xFF43: Register8("SCX",  0xFF43),
             0xFF44: Register8("LY",   0xFF44, readonly=True),    # Current line
+            0xFF45: Register8("LYC",  0xFF45),
+            0xFF47: Register8("BGP",  0xFF47),                   # BG palette
+            0xFF48: Register8("OBP0", 0xFF48),
+            0xFF49: Register8("OBP1", 0xFF49),
             0xFF4A: Register8("WY",   0xFF4A),
             0xFF4B: Register8("WX",   0xFF4B),
         }
-        self._cycle_acc = 0                # cycles since last LY++
 
     # ---------------------------------------------------------
     # memory‑mapped accessors
     # ---------------------------------------------------------
     def read(self, addr: int) -> int:
+        if addr == 0xFF41:
+            return 0x80 | self.registers[0xFF41].val   # bit 7 reads back 1
         if addr in self.registers:
             return self.registers[addr].read()
         raise ValueError(f"Invalid PPU read: {hex(addr)}")
 
     def write(self, addr: int, val: int) -> None:
         if addr in self.registers:
-            self.registers[addr].write(val)
+            if addr == 0xFF40:
+                self._write_lcdc(val)
+            elif addr == 0xFF41:
+                # mode and coincidence bits are read‑only
+                stat = self.registers[0xFF41]
+                stat.val = (val & 0x78) | (stat.val & 0x07)
+                self._update_stat()
+            else:
+                self.registers[addr].write(val)
+                if addr == 0xFF45:
+                    self._update_stat()
             return
         raise ValueError(f"Invalid PPU write: {hex(addr)}")
 
+    def _write_lcdc(self, val: int) -> None:
+        lcdc = self.registers[0xFF40]
+        was_on = bool(lcdc.val & 0x80)
+        lcdc.write(val)
+        if was_on and not val & 0x80:
+            # LCD disabled ⇒ LY pinned to 0, mode 0 and line timer halted
+            self.registers[0xFF44].val = 0
+            self._window_line = 0
+            self.scheduler.cancel("ppu")
+            self._set_mode(0)
+        elif not was_on and val & 0x80:
+            # line 0 starts on the next cycle, so the first LY++ lands on
+            # the first cycle *after* 456 have elapsed
+            self._begin_frame()
+            self._set_mode(2)
+            self.scheduler.schedule(
+                "ppu", self.scheduler.cycles + 1 + self.OAM_SCAN_CYCLES,
+                self._start_transfer)
+
     # ---------------------------------------------------------
-    # clock – call once per *CPU* cycle (or batch)
+    # clock
     # ---------------------------------------------------------
     def tick(self, cycles: int = 1) -> None:
         """
-        Advance the PPU by *cycles* CPU cycles.
+        Standalone use: advance the PPU's clock by *cycles* CPU cycles.
 
-        • If LCDC bit 7 is **cleared** the PPU is disabled:
-            – LY is forced to 0 and the internal timer is reset.
-        • If LCDC bit 7 is **set** the PPU runs and LY increments
-          every 456 CPU cycles, on the *first* cycle after the
-          multiple of 456 has been reached.
+        • If LCDC bit 7 is **cleared** the PPU is disabled:
+            – LY stays 0 and no line event is pending.
+        • If LCDC bit 7 is **set** LY increments every 456 CPU cycles,
+          on the *first* cycle after the multiple of 456 has been reached.
         """
-        lcd_on = bool(self.registers[0xFF40].val & 0x80)
+        self.scheduler.advance(cycles)
 
-        if not lcd_on:
-            # LCD disabled ⇒ LY pinned to 0 and timer halted
-            self.registers[0xFF44].val = 0
-            self._cycle_acc = 0
+    @property
+    def mode(self) -> int:
+        return self.registers[0xFF41].val & 0x03
+
+    # ---------------------------------------------------------
+    # frame skipping
+    # ---------------------------------------------------------
+    def request_frame(self) -> None:
+        """Render the next frame even if ``frame_skip`` would drop it."""
+        self._frame_requested = True
+
+    def frame_hash(self) -> str:
+        return hashlib.sha1(self.framebuffer.tobytes()).hexdigest()
+
+    def _begin_frame(self) -> None:
+        skip = self.frame_skip
+        self._render_frame = self._frame_requested or bool(
+            skip and self.frame_count % skip == 0)
+        self._frame_requested = False
+        self._window_line = 0
+
+    def _start_transfer(self, cycle: int) -> None:
+        self._set_mode(3)
+        if self._render_frame:
+            self.render_line(self.registers[0xFF44].val)
+        self.scheduler.schedule("ppu", cycle + self.TRANSFER_CYCLES, self._start_hblank)
+
+    def _start_hblank(self, cycle: int) -> None:
+        self._set_mode(0)
+        self.scheduler.schedule("ppu", cycle + self.HBLANK_CYCLES, self._next_line)
+
+    def _next_line(self, cycle: int) -> None:
+        ly_reg = self.registers[0xFF44]
+        ly_reg.val = ly = (ly_reg.val + 1) % self.TOTAL_SCANLINES
+        if ly < self.SCREEN_HEIGHT:
+            if ly == 0:
+                self._begin_frame()
+            self._set_mode(2)
+            self.scheduler.schedule("ppu", cycle + self.OAM_SCAN_CYCLES, self._start_transfer)
             return
+        if ly == self.SCREEN_HEIGHT:
+            if self._render_frame:
+                self.rendered_frame = self.frame_count
+            self.frame_count += 1
+            self.request_interrupt(self.VBLANK_BIT)
+            self._set_mode(1)
+        else:
+            self._update_stat()             # LY changed: LYC compare
+        self.scheduler.schedule("ppu", cycle + self.CYCLES_PER_SCANLINE, self._next_line)
+
+    def _set_mode(self, mode: int) -> None:
+        stat = self.registers[0xFF41]
+        stat.val = (stat.val & ~0x03) | mode
+        self._update_stat()
+
+    def _update_stat(self) -> None:
+        """Refresh the LY==LYC flag and fire IF bit 1 on a rising STAT line."""
+        stat = self.registers[0xFF41]
+        if self.registers[0xFF44].val == self.registers[0xFF45].val:
+            stat.val |= 0x04
+        else:
+            stat.val &= ~0x04
+        val = stat.val
+        mode = val & 0x03
+        line = bool(
+            (val & 0x44) == 0x44                    # LYC=LY, bit 6
+            or (mode == 0 and val & 0x08)
+            or (mode == 1 and val & 0x10)
+            or (mode == 2 and val & 0x20)
+        )
+        if line and not self._stat_line and self.registers[0xFF40].val & 0x80:
+            self.request_interrupt(self.STAT_BIT)
+        self._stat_line = line
+
+    # ───────────────────────── tile cache ───────────────────────
+    def mark_tiles_dirty(self, start: int, end: int) -> None:
+        """VRAM offsets ``[start, end)`` changed; re-decode their tiles lazily."""
+        if start < 0x1800:
+            self._tile_dirty[start >> 4:(min(end, 0x1800) + 15) >> 4] = True
+            self._tiles_stale = True
+
+    def _refresh_tiles(self) -> None:
+        dirty = np.flatnonzero(self._tile_dirty)
+        data = self.vram[:0x1800].reshape(self.TILE_COUNT, 8, 2)[dirty]
+        lo = np.unpackbits(data[:, :, 0:1], axis=2)
+        hi = np.unpackbits(data[:, :, 1:2], axis=2)
+        self.tiles[dirty] = lo | (hi << 1)
+        self._tile_dirty[:] = False
+        self._tiles_stale = False
+
+    # ───────────────────────── sprite index ─────────────────────
+    def mark_oam_dirty(self) -> None:
+        self._oam_dirty = True
+
+    def _rebuild_sprite_index(self) -> None:
+        ys = self.oam[0::4]
+        self._sprite_order = np.argsort(ys, kind="stable")
+        self._sprite_ys = ys[self._sprite_order]
+        self._oam_dirty = False
+
+    def line_sprites(self, ly: int, height: int = 8) -> list:
+        """OAM indices of the sprites the hardware picks for line *ly*."""
+        if self._oam_dirty:
+            self._rebuild_sprite_index()
+        # on line ly ⇔ ly + 16 - height < Y <= ly + 16
+        ys = self._sprite_ys
+        lo = np.searchsorted(ys, ly + 16 - height, "right")
+        hi = np.searchsorted(ys, ly + 16, "right")
+        return sorted(self._sprite_order[lo:hi].tolist())[:self.MAX_LINE_SPRITES]
+
+    # ───────────────────────── renderer ─────────────────────────
+    def render_line(self, ly: int) -> None:
+        """Draw background, window and sprites for line *ly* into ``framebuffer``."""
+        regs = self.registers
+        lcdc = regs[0xFF40].val
+        row = self.framebuffer[ly]
+        if self._tiles_stale:
+            self._refresh_tiles()
+        if not lcdc & 0x01:                 # BG/window off ⇒ blank (colour 0)
+            row[:] = 0
+            if lcdc & 0x02:
+                self._render_sprites(ly, lcdc, np.zeros(self.SCREEN_WIDTH, np.uint8), row)
+            return
+
+        y = (regs[0xFF42].val + ly) & 0xFF
+        bg = self._tile_row(0x1C00 if lcdc & 0x08 else 0x1800, y, lcdc)
+        colours = bg[(regs[0xFF43].val + np.arange(self.SCREEN_WIDTH)) & 0xFF]
+
+        wy, wx = regs[0xFF4A].val, regs[0xFF4B].val
+        if lcdc & 0x20 and wy <= ly and wx <= 166:
+            win = self._tile_row(0x1C00 if lcdc & 0x40 else 0x1800, self._window_line, lcdc)
+            x0 = wx - 7
+            if x0 < 0:
+                colours[:] = win[-x0:-x0 + self.SCREEN_WIDTH]
+            else:
+                colours[x0:] = win[:self.SCREEN_WIDTH - x0]
+            self._window_line += 1
+
+        row[:] = self._palette(0xFF47)[colours]
+        if lcdc & 0x02:
+            self._render_sprites(ly, lcdc, colours, row)
+
+    def _render_sprites(self, ly: int, lcdc: int, bg: np.ndarray, row: np.ndarray) -> None:
+        height = 16 if lcdc & 0x04 else 8
+        sprites = self.line_sprites(ly, height)
+        if not sprites:
+            return
+        oam = self.oam
+        palettes = (self._palette(0xFF48), self._palette(0xFF49))
+        # lowest priority first so higher ones overwrite: smaller X wins,
+        # then lower OAM index
+        sprites.sort(key=lambda i: (int(oam[i * 4 + 1]), i), reverse=True)
+        for i in sprites:
+            y, x, tile, attr = oam[i * 4:i * 4 + 4].tolist()
+            line = ly + 16 - y
+            if attr & 0x40:
+                line = height - 1 - line
+            if height == 16:
+                tile = (tile & 0xFE) | (line >> 3)
+            pixels = self.tiles[tile, line & 7]
+            if attr & 0x20:
+                pixels = pixels[::-1]
+            x0 = x - 8
+            lo, hi = max(x0, 0), min(x0 + 8, self.SCREEN_WIDTH)
+            if lo >= hi:
+                continue
+            pixels = pixels[lo - x0:hi - x0]
+            opaque = pixels != 0
+            if attr & 0x80:                 # behind BG colours 1‑3
+                opaque &= bg[lo:hi] == 0
+            row[lo:hi][opaque] = palettes[(attr >> 4) & 1][pixels[opaque]]
+
+    def _palette(self, addr: int) -> np.ndarray:
+        val = self.registers[addr].val
+        return np.array([(val >> shift) & 3 for shift in (0, 2, 4, 6)], np.uint8)
 
-        # LCD enabled – normal line‑counter
-        self._cycle_acc += cycles
-        while self._cycle_acc > self.CYCLES_PER_SCANLINE:
-            self._cycle_acc -= self.CYCLES_PER_SCANLINE   # keep overrun (usually 1)
-            ly_reg = self.registers[0xFF44]
-            ly_reg.val = (ly_reg.val + 1) % self.TOTAL_SCANLINES
\ No newline at end of file
+    def _tile_row(self, map_base: int, y: int, lcdc: int) -> np.ndarray:
+        # colour indices (0‑3) of one 256‑pixel row of a 32×32 tile map
+        start = map_base + (y >> 3) * 32
+        ids = self.vram[start:start + 32].astype(np.intp)
+        if not lcdc & 0x10:                 # 0x8800 mode: signed ids from 0x9000
+            ids = np.where(ids < 0x80, ids + 0x100, ids)
+        return self.tiles[ids, y & 7].reshape(256)
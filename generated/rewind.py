@@ -0,0 +1,103 @@
+"""
+Rewind buffer over ``save_state`` snapshots.
+
+A snapshot is taken once per frame.  Every ``keyframe_every`` frames it is
+kept whole (a keyframe); the frames in between store only their XOR against
+that keyframe, run-length coded as (start, length) pairs plus the changed
+bytes.  Restoring any frame is one keyframe copy and one delta apply.
+
+Snapshots live in a ring bounded to ``seconds`` of emulated time; the oldest
+keyframe group is evicted as a whole once the ring is full.
+"""
+from collections import deque
+
+import numpy as np
+
+from .savestate import save_state, load_state
+
+FRAME_CYCLES = 70224                # 154 lines × 456 cycles
+CPU_HZ = 4194304
+
+
+def xor_runs(base, blob):
+    """Encode *blob* against *base* as ``(starts, lengths, data)`` runs."""
+    diff = np.bitwise_xor(np.frombuffer(base, np.uint8), np.frombuffer(blob, np.uint8))
+    changed = np.flatnonzero(diff)
+    if not len(changed):
+        empty = np.zeros(0, np.uint32)
+        return empty, empty, b""
+    breaks = np.flatnonzero(np.diff(changed) > 1) + 1
+    starts = changed[np.concatenate(([0], breaks))]
+    ends = changed[np.concatenate((breaks - 1, [len(changed) - 1]))] + 1
+    return starts.astype(np.uint32), (ends - starts).astype(np.uint32), diff[changed].tobytes()
+
+
+def apply_runs(base, starts, lengths, data):
+    out = np.frombuffer(base, np.uint8).copy()
+    if len(starts):
+        lengths = lengths.astype(np.intp)
+        offsets = np.cumsum(lengths) - lengths
+        idx = np.repeat(starts.astype(np.intp) - offsets, lengths) + np.arange(len(data))
+        out[idx] ^= np.frombuffer(data, np.uint8)
+    return out.tobytes()
+
+
+class Rewind:
+    def __init__(self, cpu, seconds=10.0, keyframe_every=60):
+        self.cpu = cpu
+        self.keyframe_every = keyframe_every
+        self.max_snapshots = max(1, int(seconds * CPU_HZ / FRAME_CYCLES))
+        # groups of [(cycle, keyframe blob), (cycle, runs), ...]
+        self._groups = deque()
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def oldest_cycle(self):
+        return self._groups[0][0][0] if self._groups else None
+
+    def capture(self):
+        """Snapshot the machine at the current cycle."""
+        cycle = self.cpu.memory.scheduler.cycles
+        blob = save_state(self.cpu)
+        group = self._groups[-1] if self._groups else None
+        if group is None or len(group) >= self.keyframe_every:
+            self._groups.append([(cycle, blob)])
+        else:
+            group.append((cycle, xor_runs(group[0][1], blob)))
+        self._count += 1
+        while self._count > self.max_snapshots and len(self._groups) > 1:
+            self._count -= len(self._groups.popleft())
+
+    def run(self, cycles):
+        """Run the CPU for *cycles*, capturing a snapshot after every frame."""
+        sched = self.cpu.memory.scheduler
+        end = sched.cycles + cycles
+        while sched.cycles < end:
+            self.cpu.run(min(FRAME_CYCLES, end - sched.cycles))
+            self.capture()
+
+    def rewind_to(self, cycle):
+        """
+        Restore the latest snapshot at or before *cycle*, then step forward
+        instruction by instruction to the first boundary at or after it.
+        Snapshots newer than the restored one are dropped.  Returns the
+        cycle reached.
+        """
+        if not self._groups or cycle < self.oldest_cycle:
+            raise ValueError(f"Cycle {cycle} is outside the rewind window")
+        while len(self._groups) > 1 and self._groups[-1][0][0] > cycle:
+            self._count -= len(self._groups.pop())
+        group = self._groups[-1]
+        while group[-1][0] > cycle:
+            group.pop()
+            self._count -= 1
+
+        key_blob = group[0][1]
+        load_state(self.cpu, key_blob if len(group) == 1 else apply_runs(key_blob, *group[-1][1]))
+        sched = self.cpu.memory.scheduler
+        while sched.cycles < cycle:
+            self.cpu.step()
+        return sched.cycles
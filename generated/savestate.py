@@ -0,0 +1,137 @@
+"""
+Whole-machine snapshots as one compact, versioned binary blob.
+
+Layout (little endian):
+
+    b"S2GB" | version u16 | int field count u16 | buffer count u16
+    int64 × fields   CPU registers/flags, clock, IF/IE, Timer, PPU, APU, Joypad, MBC
+    per buffer: u32 length + raw bytes
+                     VRAM, WRAM0, WRAMX, OAM, I/O, HRAM, cart RAM, framebuffer
+
+Buffers are copied whole with slice assignment; nothing is pickled.
+Scheduler events are not stored as callbacks: each device re-arms its own
+event from the restored state (the PPU stores which mode step is next).
+"""
+import struct
+from array import array
+
+from .apu import _Channel
+from .cpu import Registers
+
+MAGIC = b"S2GB"
+VERSION = 3
+_HEADER = struct.Struct("<4sHHH")
+_JOYPAD_KEYS = ("right", "left", "up", "down", "a", "b", "select", "start")
+
+
+def _fields(cpu):
+    # (container, name) pairs in blob order; dict containers use item access
+    mem = cpu.memory
+    timer, ppu, apu, joypad = mem.timer, mem.ppu, mem.apu, mem.joypad
+    fields = [(cpu.registers, name) for name in Registers.__slots__]
+    fields += [(cpu, "IME"), (cpu, "halted"), (mem.scheduler, "cycles")]
+    fields += [(mem.interrupts, "IF"), (mem.interrupts, "IE")]
+    fields += [(timer, name) for name in ("_div_origin", "_synced", "_tima", "_tma", "_tac")]
+    fields += [(ppu.registers[addr], "val") for addr in sorted(ppu.registers)]
+    fields += [(ppu, name) for name in (
+        "_window_line", "_stat_line", "frame_count", "_frame_requested", "_render_frame")]
+    fields += [(apu.registers, addr) for addr in sorted(apu.registers)]
+    fields += [(apu, "_sequencer_step"), (apu, "_synced")]
+    fields += [(ch, name) for ch in apu.channels for name in _Channel.__slots__]
+    fields += [(joypad, "P1"), (joypad, "select_directions"), (joypad, "select_buttons")]
+    fields += [(joypad.buttons, key) for key in _JOYPAD_KEYS]
+    mbc = mem.cartridge.mbc
+    if mbc is not None:
+        fields += [(mbc, name) for name in sorted(vars(mbc))]
+    return fields
+
+
+def _buffers(cpu):
+    mem = cpu.memory
+    return [mem.vram, mem.wram0, mem.wramx, mem.oam, mem.io, mem.hram,
+            mem.cartridge.ram, mem.ppu.framebuffer]
+
+
+def _get(container, name):
+    return container[name] if isinstance(container, dict) else getattr(container, name)
+
+
+def _events(cpu):
+    # (PPU step index or -1, PPU event cycle, APU event cycle or -1)
+    mem = cpu.memory
+    sched = mem.scheduler
+    ppu_cycle = sched.pending("ppu")
+    ppu_step = -1
+    if ppu_cycle is not None:
+        ppu_step = mem.ppu.EVENT_STEPS.index(sched._events["ppu"][1].__name__)
+    apu_cycle = sched.pending("apu")
+    rendered = mem.ppu.rendered_frame
+    return [ppu_step, ppu_cycle or 0, -1 if apu_cycle is None else apu_cycle,
+            -1 if rendered is None else rendered]
+
+
+def save_state(cpu):
+    """Snapshot the CPU and everything hanging off its Memory."""
+    ints = [int(_get(c, n)) for c, n in _fields(cpu)] + _events(cpu)
+    parts = [_HEADER.pack(MAGIC, VERSION, len(ints), len(_buffers(cpu))),
+             array("q", ints).tobytes()]
+    for buf in _buffers(cpu):
+        raw = memoryview(buf).cast("B")
+        parts.append(struct.pack("<I", len(raw)))
+        parts.append(raw)
+    return b"".join(parts)
+
+
+def load_state(cpu, blob):
+    """Restore a ``save_state`` blob taken from a machine with the same cartridge."""
+    blob = memoryview(blob)
+    magic, version, n_ints, n_bufs = _HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("Not a save state")
+    if version != VERSION:
+        raise ValueError(f"Unsupported save state version {version}")
+    fields = _fields(cpu)
+    buffers = _buffers(cpu)
+    if n_ints != len(fields) + 4 or n_bufs != len(buffers):
+        raise ValueError("Save state does not match this machine")
+
+    pos = _HEADER.size
+    ints = array("q")
+    ints.frombytes(blob[pos:pos + 8 * n_ints])
+    pos += 8 * n_ints
+
+    for buf in buffers:
+        (size,) = struct.unpack_from("<I", blob, pos)
+        pos += 4
+        target = memoryview(buf).cast("B")
+        if size != len(target):
+            raise ValueError("Save state does not match this machine")
+        target[:] = blob[pos:pos + size]
+        pos += size
+
+    for (container, name), val in zip(fields, ints):
+        if isinstance(_get(container, name), bool):
+            val = bool(val)
+        if isinstance(container, dict):
+            container[name] = val
+        else:
+            setattr(container, name, val)
+    _rearm(cpu, *ints[len(fields):])
+
+
+def _rearm(cpu, ppu_step, ppu_cycle, apu_cycle, rendered):
+    mem = cpu.memory
+    ppu, apu = mem.ppu, mem.apu
+    mem.scheduler.clear()
+    mem.timer._schedule_overflow()
+    if ppu_step >= 0:
+        mem.scheduler.schedule("ppu", ppu_cycle, getattr(ppu, ppu.EVENT_STEPS[ppu_step]))
+    if apu_cycle >= 0:
+        mem.scheduler.schedule("apu", apu_cycle, apu._on_frame_step)
+    ppu.rendered_frame = None if rendered < 0 else rendered
+    ppu.mark_tiles_dirty(0, 0x1800)
+    ppu.mark_oam_dirty()
+    apu.clear_buffer()
+    mem.cartridge.mapping = mem.cartridge.mbc.mapping() if mem.cartridge.mbc else (0, 1, 0)
+    mem._map_banks()
+    cpu._flush_blocks()
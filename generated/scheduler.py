@@ -0,0 +1,59 @@
+"""
+Central cycle scheduler.
+
+Every device that has timed work (timer overflow, LY++, …) registers the
+absolute cycle of its next event.  The CPU only advances the master clock;
+a device is called back when the clock reaches its event cycle and sits idle
+otherwise.  Registers read between events are brought up to date lazily by
+the device itself.
+"""
+
+NEVER = 1 << 62                     # "no event pending" sentinel cycle
+
+
+class Scheduler:
+    def __init__(self):
+        self.cycles = 0             # master clock, CPU cycles since reset
+        self.next_event = NEVER     # earliest pending event cycle
+        self._events = {}           # key → (cycle, callback)
+
+    def schedule(self, key, cycle, callback):
+        """(Re)arm event *key* to call ``callback(cycle)`` at *cycle*."""
+        old = self._events.get(key)
+        self._events[key] = (cycle, callback)
+        if cycle <= self.next_event:
+            self.next_event = cycle
+        elif old is not None and old[0] == self.next_event:
+            self._recompute()
+
+    def cancel(self, key):
+        old = self._events.pop(key, None)
+        if old is not None and old[0] == self.next_event:
+            self._recompute()
+
+    def clear(self):
+        """Drop every pending event (state restore re-arms them)."""
+        self._events.clear()
+        self.next_event = NEVER
+
+    def pending(self, key):
+        """Cycle at which *key* fires, or ``None``."""
+        event = self._events.get(key)
+        return event[0] if event is not None else None
+
+    def advance(self, cycles):
+        self.cycles += cycles
+        if self.cycles >= self.next_event:
+            self.run_due()
+
+    def run_due(self):
+        """Fire, in cycle order, every event due at or before ``cycles``."""
+        events = self._events
+        while self.next_event <= self.cycles:
+            key = min(events, key=lambda k: events[k][0])
+            cycle, callback = events.pop(key)
+            self._recompute()
+            callback(cycle)
+
+    def _recompute(self):
+        self.next_event = min((c for c, _ in self._events.values()), default=NEVER)
@@ -1,12 +1,67 @@
+from .scheduler import Scheduler
+
+
 class Timer:
-    def __init__(self):
-        self.DIV = 0          # Divider register (0xFF04)
-        self.TIMA = 0         # Timer counter (0xFF05)
-        self.TMA = 0          # Timer modulo (0xFF06)
-        self.TAC = 0          # Timer control (0xFF07)
+    """
+    DIV/TIMA/TMA/TAC worked out in closed form.
+
+    The timer keeps the cycle at which the 16-bit system counter was last
+    zero (DIV is its high byte) and the TIMA value as of the last sync.
+    Registers are brought up to date arithmetically when accessed, and the
+    cycle of the next TIMA overflow is handed to the scheduler so the timer
+    interrupt (IF bit 2) is raised on time even if nobody reads the timer.
+    """
+
+    TIMA_PERIODS = (1024, 16, 64, 256)  # cycles per TIMA++ by TAC bits 0–1
+    INTERRUPT_BIT = 2
+
+    def __init__(self, scheduler=None, request_interrupt=None):
+        # standalone timers get a private clock driven by step()
+        self.scheduler = scheduler if scheduler is not None else Scheduler()
+        self.request_interrupt = request_interrupt or (lambda bit: None)
+
+        self._div_origin = self.scheduler.cycles  # cycle the system counter was 0
+        self._synced = self.scheduler.cycles      # cycle _tima is valid at
+        self._tima = 0
+        self._tma = 0
+        self._tac = 0
+
+    # ---------------------------------------------------------
+    # registers
+    # ---------------------------------------------------------
+    @property
+    def DIV(self):
+        return ((self.scheduler.cycles - self._div_origin) >> 8) & 0xFF
+
+    @property
+    def TIMA(self):
+        self.sync()
+        return self._tima
 
-        self.div_counter = 0  # Internal counter for DIV increments
-        self.tima_counter = 0 # Internal counter for TIMA increments
+    @TIMA.setter
+    def TIMA(self, val):
+        self.sync()
+        self._tima = val & 0xFF
+        self._schedule_overflow()
+
+    @property
+    def TMA(self):
+        return self._tma
+
+    @TMA.setter
+    def TMA(self, val):
+        self.sync()
+        self._tma = val & 0xFF
+
+    @property
+    def TAC(self):
+        return self._tac
+
+    @TAC.setter
+    def TAC(self, val):
+        self.sync()
+        self._tac = val & 0x07  # Only lower 3 bits used
+        self._schedule_overflow()
 
     def read(self, addr):
         if addr == 0xFF04:
@@ -14,55 +69,67 @@ class Timer:
         elif addr == 0xFF05:
             return self.TIMA
         elif addr == 0xFF06:
-            return self.TMA
+            return self._tma
         elif addr == 0xFF07:
-            return self.TAC
+            return self._tac
         else:
             raise ValueError(f"Timer read: invalid address {hex(addr)}")
 
     def write(self, addr, val):
-        val &= 0xFF
         if addr == 0xFF04:
-            self.DIV = 0
-            self.div_counter = 0
+            self.sync()
+            self._div_origin = self.scheduler.cycles
+            self._schedule_overflow()
         elif addr == 0xFF05:
             self.TIMA = val
         elif addr == 0xFF06:
             self.TMA = val
         elif addr == 0xFF07:
-            self.TAC = val & 0x07  # Only lower 3 bits used
+            self.TAC = val
         else:
             raise ValueError(f"Timer write: invalid address {hex(addr)}")
 
     def step(self, cycles):
-        # Update DIV every 256 cycles
-        self.div_counter += cycles
-        while self.div_counter >= 256:
-            self.div_counter -= 256
-            self.DIV = (self.DIV + 1) & 0xFF
-
-        # Check if timer is enabled
-        if (self.TAC & 0x04) == 0:
-            return  # Timer disabled
-
-        # Timer input clock select
-        speed = self.TAC & 0x03
-        if speed == 0:
-            period = 1024
-        elif speed == 1:
-            period = 16
-        elif speed == 2:
-            period = 64
-        elif speed == 3:
-            period = 256
+        """Standalone use: advance the timer's clock by *cycles*."""
+        self.scheduler.advance(cycles)
+
+    # ---------------------------------------------------------
+    # closed-form catch-up
+    # ---------------------------------------------------------
+    def sync(self, now=None):
+        """Bring TIMA up to the scheduler clock (or *now*) in O(1)."""
+        if now is None:
+            now = self.scheduler.cycles
+        if now <= self._synced:
+            return
+        if self._tac & 0x04:
+            period = self.TIMA_PERIODS[self._tac & 0x03]
+            ticks = ((now - self._div_origin) // period
+                     - (self._synced - self._div_origin) // period)
+            tima = self._tima + ticks
+            if tima > 0xFF:
+                # first overflow reloads TMA, later ones wrap back to it
+                self._tima = self._tma + (tima - 0x100) % (0x100 - self._tma)
+                self.request_interrupt(self.INTERRUPT_BIT)
+            else:
+                self._tima = tima
+        self._synced = now
+
+    def next_overflow(self):
+        """Absolute cycle of the next TIMA overflow, or ``None`` if stopped."""
+        if not self._tac & 0x04:
+            return None
+        period = self.TIMA_PERIODS[self._tac & 0x03]
+        edges = (self._synced - self._div_origin) // period + (0x100 - self._tima)
+        return self._div_origin + edges * period
+
+    def _on_overflow(self, cycle):
+        self.sync(cycle)
+        self._schedule_overflow()
+
+    def _schedule_overflow(self):
+        cycle = self.next_overflow()
+        if cycle is None:
+            self.scheduler.cancel("timer")
         else:
-            period = 1024  # default fallback
-
-        # Update TIMA
-        self.tima_counter += cycles
-        while self.tima_counter >= period:
-            self.tima_counter -= period
-            self.TIMA += 1
-            if self.TIMA > 0xFF:
-                self.TIMA = self.TMA  # Reset TIMA on overflow
-                # Normally trigger timer interrupt here (not implemented)
+            self.scheduler.schedule("timer", cycle, self._on_overflow)
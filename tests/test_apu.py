@@ -0,0 +1,86 @@
+import numpy as np
+from generated.apu import APU, READ_MASKS, lfsr_sequence
+
+
+def make_apu():
+    apu = APU()
+    apu.write(0xFF26, 0x80)             # power on
+    apu.write(0xFF24, 0x77)             # max master volume
+    apu.write(0xFF25, 0xFF)             # every channel to both sides
+    return apu
+
+
+def trigger_square2(apu, duty=2, nr22=0xF0, freq=2016, nr24=0x80):
+    apu.write(0xFF16, duty << 6)
+    apu.write(0xFF17, nr22)
+    apu.write(0xFF18, freq & 0xFF)
+    apu.write(0xFF19, nr24 | freq >> 8)
+
+
+def test_square_channel_follows_duty_pattern():
+    apu = make_apu()
+    trigger_square2(apu)                # 128 cycles per duty step = 1 sample
+    apu.step(128 * 16)
+    pcm = apu.drain()
+    assert pcm.shape == (16, 2) and pcm.dtype == np.int16
+    expected = np.array([1, 0, 0, 0, 0, 1, 1, 1] * 2) * 15 * 8 * 64
+    assert (pcm[:, 0] == expected).all() and (pcm[:, 1] == expected).all()
+    assert len(apu.drain()) == 0
+
+
+def test_length_counter_silences_channel_even_when_muted():
+    apu = make_apu()
+    apu.muted = True
+    trigger_square2(apu, nr24=0xC0)     # length enabled
+    apu.write(0xFF16, 0x80 | 62)        # length 2 → 2 steps at 256 Hz
+    assert apu.read(0xFF26) == 0xF2
+    apu.step(8192 * 3)                  # sequencer steps 0 and 2 clock length
+    assert apu.read(0xFF26) == 0xF0
+    assert apu.samples_available == 0
+
+
+def test_registers_read_back_with_write_only_bits_set():
+    apu = make_apu()
+    apu.write(0xFF10, 0x12)
+    assert apu.read(0xFF10) == 0x92
+    apu.write(0xFF11, 0x80)             # duty reads back, length does not
+    assert apu.read(0xFF11) == 0xBF
+    assert apu.read(0xFF13) == 0xFF     # frequency low is write-only
+    for addr in (0xFF15, 0xFF1F, 0xFF27):
+        assert apu.read(addr) == 0xFF   # unused
+    apu.write(0xFF24, 0x00)
+    assert apu.read(0xFF24) == 0x00     # fully readable
+    apu.write(0xFF30, 0x5A)
+    assert apu.read(0xFF30) == 0x5A     # wave RAM reads as written
+    apu.write(0xFF26, 0x00)
+    assert apu.read(0xFF26) == READ_MASKS[0xFF26]
+
+
+def test_envelope_steps_volume_down_at_64hz():
+    apu = make_apu()
+    trigger_square2(apu, duty=3, nr22=0xF1)     # vol 15, decrease every step
+    apu.step(8192 * 8 + 128)
+    assert apu.channels[1].volume == 14
+    apu.step(8192 * 8)
+    assert apu.channels[1].volume == 13
+
+
+def test_ring_buffer_overwrites_oldest_and_is_deterministic():
+    runs = []
+    for _ in range(2):
+        apu = make_apu()
+        trigger_square2(apu, freq=1800)
+        apu.write(0xFF21, 0xA0)                 # noise
+        apu.write(0xFF22, 0x11)
+        apu.write(0xFF23, 0x80)
+        apu.step(128 * (APU.BUFFER_SAMPLES + 100))
+        runs.append(apu.drain())
+        assert apu.dropped_samples == 100
+    assert len(runs[0]) == APU.BUFFER_SAMPLES
+    assert (runs[0] == runs[1]).all() and runs[0].any()
+
+
+def test_lfsr_periods():
+    assert len(lfsr_sequence(False)) == 32767
+    assert len(lfsr_sequence(True)) == 127
+    assert 0 < lfsr_sequence(True).sum() < 127
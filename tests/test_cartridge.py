@@ -0,0 +1,158 @@
+import gc
+import weakref
+
+import pytest
+from generated.cartridge import Cartridge
+from generated.memory import Memory
+from generated.cpu import CPU
+
+
+def make_rom(cart_type, banks, ram_size=0x00):
+    rom = bytearray(banks * 0x4000)
+    for bank in range(banks):
+        rom[bank * 0x4000] = bank & 0xFF            # bank number at its start
+        rom[bank * 0x4000 + 1] = bank >> 8
+    rom[0x147] = cart_type
+    rom[0x149] = ram_size
+    return rom
+
+
+def test_rom_only_rejects_writes_and_serves_bank_1():
+    rom = make_rom(0x00, 2)
+    mem = Memory(Cartridge(rom=bytes(rom)))
+    assert mem.read(0x4000) == 1
+    with pytest.raises(ValueError):
+        mem.write(0x2000, 1)
+
+
+def test_bad_sizes_and_unknown_types_raise():
+    with pytest.raises(ValueError):
+        Cartridge(rom=bytes(0x6000))
+    with pytest.raises(ValueError):
+        Cartridge(rom=bytes(make_rom(0xFC, 4)))
+    with pytest.raises(ValueError):
+        Cartridge(rom=bytes(0x8000), ram=bytearray(0x1000))
+
+
+def test_unknown_type_on_a_32k_image_runs_as_plain_rom():
+    rom = bytearray(b"\xFF" * 0x8000)
+    rom[0x4000] = 0x01
+    mem = Memory(Cartridge(rom=bytes(rom)))
+    assert mem.cartridge.mbc is None
+    assert mem.read(0x4000) == 0x01
+
+
+def test_mbc1_banking_is_zero_copy():
+    rom = make_rom(0x03, 128, ram_size=0x03)
+    mem = Memory(Cartridge(rom=rom))
+    mem.write(0x2000, 0x00)                         # bank 0 selects 1
+    assert mem.read(0x4000) == 1
+    mem.write(0x2000, 0x05)
+    mem.write(0x4000, 0x02)                         # upper bits → bank 0x45
+    assert mem.read(0x4000) == 0x45
+    assert mem._read_pages[0x40].obj is rom         # a view, not a copy
+    mem.write(0x6000, 0x01)                         # mode 1 also banks 0x0000
+    assert mem.read(0x0000) == 0x40
+
+    assert mem.read(0xA000) == 0xFF                 # RAM disabled
+    mem.write(0x0000, 0x0A)
+    mem.write(0xA000, 0x11)                         # RAM bank 2 in mode 1
+    assert mem.cartridge.ram[2 * 0x2000] == 0x11
+
+
+def test_mbc3_and_mbc5_rom_banks():
+    mem = Memory(Cartridge(rom=make_rom(0x13, 128)))
+    mem.write(0x2000, 0x7F)
+    assert mem.read(0x4000) == 0x7F
+    mem.write(0x0000, 0x0A)
+    mem.write(0x4000, 0x08)                         # RTC register: unmapped
+    assert mem.read(0xA000) == 0xFF
+
+    mem = Memory(Cartridge(rom=make_rom(0x19, 512)))
+    mem.write(0x2000, 0x00)
+    assert mem.read(0x4000) == 0                    # MBC5 can map bank 0
+    mem.write(0x2000, 0x23)
+    mem.write(0x3000, 0x01)
+    assert (mem.read(0x4000), mem.read(0x4001)) == (0x23, 1)
+
+
+def test_bank_switch_keeps_blocks_cached_per_bank():
+    rom = make_rom(0x01, 4)
+    rom[0x0150:0x0156] = bytes([0x3E, 0x02, 0xEA, 0x00, 0x20, 0xC3])  # LD A,2; LD (2000),A; JP ..
+    rom[0x0156:0x0158] = bytes([0x00, 0x40])                         # .. 4000
+    for bank in (1, 2):
+        rom[bank * 0x4000:bank * 0x4000 + 3] = bytes([0x3E, 0x10 * bank, 0x76])  # LD A,n; HALT
+    cpu = CPU(Memory(Cartridge(rom=rom)))
+    cpu.PC = 0x4000
+    cpu.run(8)
+    assert cpu.A == 0x10
+    bank1 = cpu._romx_blocks[0x4000]
+    cpu.halted = False
+    cpu.PC = 0x0150
+    cpu.run(60)
+    assert cpu.A == 0x20 and cpu.halted
+    trampoline = cpu._rom0_blocks[0x0150]
+
+    cpu.memory.write(0x2000, 0x01)                  # back to bank 1
+    assert cpu._romx_blocks[0x4000] is bank1 and bank1.valid
+    assert cpu._rom0_blocks[0x0150] is trampoline and trampoline.valid
+    cpu.halted = False
+    cpu.PC = 0x4000
+    cpu.run(8)
+    assert cpu.A == 0x10
+
+
+def test_block_switching_its_own_bank_stops_at_the_write():
+    rom = make_rom(0x01, 4)
+    for bank in (1, 2):
+        # LD A,2 ; LD (2000),A ; LD A,n ; HALT — same layout in both banks
+        rom[bank * 0x4000:bank * 0x4000 + 8] = bytes(
+            [0x3E, 0x02, 0xEA, 0x00, 0x20, 0x3E, 0x10 * bank, 0x76])
+    cpu = CPU(Memory(Cartridge(rom=rom)))
+    cpu.PC = 0x4000
+    cpu.run(40)
+    assert cpu.A == 0x20 and cpu.halted             # LD A,n came from bank 2
+
+
+def test_from_file_maps_rom_and_persists_battery_ram(tmp_path):
+    rom = make_rom(0x03, 4, ram_size=0x02)          # MBC1+RAM+BATTERY
+    path = tmp_path / "game.gb"
+    path.write_bytes(bytes(rom))
+
+    cart = Cartridge.from_file(str(path))
+    mem = Memory(cart)
+    assert mem.read(0x4000) == 1
+    with pytest.raises(TypeError):
+        cart.rom[0] = 1                             # read-only mapping
+    mem.write(0x0000, 0x0A)
+    mem.write(0xA010, 0x99)
+    cart.flush()
+    assert (tmp_path / "game.gb.ram").read_bytes()[0x10] == 0x99
+
+    again = Memory(Cartridge.from_file(str(path)))
+    again.write(0x0000, 0x0A)
+    assert again.read(0xA010) == 0x99
+
+
+def test_from_file_without_battery_keeps_ram_in_memory(tmp_path):
+    path = tmp_path / "plain.gb"
+    path.write_bytes(bytes(make_rom(0x00, 2)))
+    cart = Cartridge.from_file(str(path))
+    assert isinstance(cart.ram, bytearray)
+    assert not (tmp_path / "plain.gb.ram").exists()
+
+
+def test_close_flushes_and_unmaps_and_nothing_pins_the_cartridge(tmp_path):
+    path = tmp_path / "game.gb"
+    path.write_bytes(bytes(make_rom(0x03, 4, ram_size=0x02)))
+
+    with Cartridge.from_file(str(path)) as cart:
+        cart.write(0x0000, 0x0A)
+        cart.write(0xA001, 0x42)
+    assert cart.rom.closed and cart.ram.closed
+    assert (tmp_path / "game.gb.ram").read_bytes()[1] == 0x42
+    cart.close()                                    # closing twice is fine
+
+    ref = weakref.ref(Cartridge.from_file(str(path)))
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,360 @@
+import pytest
+from generated.cartridge import Cartridge
+from generated.memory import Memory
+from generated.cpu import CPU
+
+
+def make_cpu():
+    return CPU(memory=Memory(cartridge=Cartridge(rom=bytes(0x8000))))
+
+
+def test_every_mnemonic_has_a_handler():
+    cpu = make_cpu()
+    assert set(cpu._dispatch) == set(CPU.INSTRUCTION_HANDLERS)
+    for op, (handler, cycles, _) in cpu._dispatch.items():
+        assert callable(handler)
+        assert cycles == CPU.INSTRUCTION_CYCLES.get(op, 4)
+
+
+def test_unknown_operation_raises():
+    cpu = make_cpu()
+    with pytest.raises(ValueError):
+        cpu.step({"op": "NOT_AN_OP"})
+
+
+def test_alu_sequence_sets_zero_flag():
+    cpu = make_cpu()
+    cpu.step({"op": "ADD_A_n8", "imm8": 0x12})
+    cpu.step({"op": "SUB_A_n8", "imm8": 0x12})
+    assert cpu.A == 0
+    assert cpu.F & 0x80
+
+
+def make_rom_cpu(code, at=0x0150):
+    rom = bytearray(0x8000)
+    rom[at:at + len(code)] = code
+    cpu = CPU(memory=Memory(cartridge=Cartridge(rom=bytes(rom))))
+    cpu.PC = at
+    return cpu
+
+
+def test_fetch_decode_runs_from_rom():
+    cpu = make_rom_cpu(bytes([
+        0x3E, 0x12,        # LD  A,12
+        0xEA, 0x00, 0xC0,  # LD  (C000),A
+        0xC6, 0x01,        # ADD A,1
+        0xE0, 0x90,        # LDH (90),A
+        0x76,              # HALT
+    ]))
+    for _ in range(4):
+        cpu.step()
+    assert cpu.PC == 0x0159
+    assert cpu.memory.read(0xC000) == 0x12
+    assert cpu.memory.read(0xFF90) == 0x13
+    assert cpu.decode(cpu.PC) == ("HALT", None, 1)
+
+
+def test_fetch_decode_call_ret_and_jr():
+    cpu = make_rom_cpu(bytes([
+        0xCD, 0x60, 0x01,  # 0150: CALL 0160
+        0x18, 0xFE,        # 0153: JR   -2 (spin)
+    ]) + bytes(11) + bytes([
+        0x3C,              # 0160: INC  A
+        0xC9,              # 0161: RET
+    ]))
+    for _ in range(3):
+        cpu.step()
+    assert (cpu.A, cpu.PC) == (1, 0x0153)
+    cpu.step()
+    assert cpu.PC == 0x0153
+
+
+def test_unknown_opcode_raises():
+    cpu = make_rom_cpu(bytes([0xD3]))
+    with pytest.raises(ValueError):
+        cpu.step()
+
+
+def test_block_cache_reuses_decoded_rom_block():
+    cpu = make_rom_cpu(bytes([
+        0x3C,              # 0150: INC A
+        0x3C,              # 0151: INC A
+        0x18, 0xFC,        # 0152: JR  -4
+    ]))
+    cycles = cpu.run(10 * 20)
+    assert cycles == 200
+    assert cpu.A == 20
+    assert list(cpu._rom0_blocks) == [0x0150]
+
+
+def test_block_cache_invalidated_by_ram_write():
+    cpu = make_rom_cpu(b"")
+    mem = cpu.memory
+    # C000: LD A,1 ; JP C000
+    for i, b in enumerate([0x3E, 0x01, 0xC3, 0x00, 0xC0]):
+        mem.write(0xC000 + i, b)
+    cpu.PC = 0xC000
+    cpu.run(1)
+    assert cpu.A == 1 and 0xC000 in cpu._blocks
+
+    mem.write(0xC001, 0x07)             # patch the immediate
+    assert 0xC000 not in cpu._blocks
+    cpu.run(1)
+    assert cpu.A == 7
+
+
+def test_halt_fast_forwards_to_timer_overflow():
+    cpu = make_rom_cpu(bytes([
+        0x3E, 0x04,        # LD  A,04
+        0xE0, 0xFF,        # LDH (FF),A   IE: timer (IME stays off)
+        0x3E, 0x05,        # LD  A,05
+        0xE0, 0x07,        # LDH (07),A   timer on, 16 cycles per tick
+        0x76,              # HALT
+        0x3C,              # INC A
+    ]))
+    cpu.run(16)
+    assert cpu.halted
+    cpu.run(5000)
+    assert not cpu.halted
+    assert cpu.memory.read(0xFF0F) & 0x04
+    assert cpu.A == 6
+    assert cpu.skipped_cycles > 3000
+
+
+LY_POLL_CODE = bytes([
+    0x3E, 0x80,        # 0150: LD  A,80
+    0xE0, 0x40,        # 0152: LDH (40),A   LCD on
+    0xF0, 0x44,        # 0154: LDH A,(44)
+    0xFE, 0x8F,        # 0156: CP  8F      (last line before VBlank)
+    0x20, 0xFA,        # 0158: JR  NZ,0154
+    0x76,              # 015A: HALT
+])
+
+
+def test_ly_poll_loop_is_skipped_to_the_line_event():
+    cpu = make_rom_cpu(LY_POLL_CODE)
+    cpu.run(0x8F * 456 + 200)
+    assert cpu.halted and cpu.A == 0x8F and cpu.PC == 0x015B
+    assert cpu.skipped_cycles > 0x8F * 250
+
+
+def test_step_skips_poll_loops_without_moving_the_exit():
+    def cycles_to_halt(cpu):
+        while not cpu.halted:
+            cpu.step()
+        return cpu.scheduler.cycles
+
+    slow = make_rom_cpu(LY_POLL_CODE)
+    slow.IDLE_POLL_SHAPES = frozenset()
+    fast = make_rom_cpu(LY_POLL_CODE)
+    assert cycles_to_halt(fast) == cycles_to_halt(slow)
+    assert slow.skipped_cycles == 0
+    assert fast.skipped_cycles > 0x8F * 250
+
+
+def test_register_file_pairs_and_masking():
+    cpu = make_cpu()
+    cpu.HL = 0x1234
+    assert (cpu.H, cpu.L) == (0x12, 0x34)
+    cpu.B = 0x1AB
+    assert cpu.B == 0xAB and cpu.registers["B"] == 0xAB
+    cpu.AF = 0xFFFF
+    assert cpu.F == 0xF0                # low nibble of F is hardwired to 0
+    cpu.F = 0xFF
+    assert (cpu.F, cpu.AF) == (0xF0, 0xFFF0)
+    assert set(cpu.registers.as_dict()) == {
+        "A", "F", "B", "C", "D", "E", "H", "L", "SP", "PC"}
+
+
+def test_register_loads_from_rom():
+    cpu = make_rom_cpu(bytes([
+        0x21, 0x00, 0xC0,  # LD  HL,C000
+        0x06, 0x42,        # LD  B,42
+        0x70,              # LD  (HL),B
+        0x7E,              # LD  A,(HL)
+        0x4F,              # LD  C,A
+        0x22,              # LD  (HL+),A
+        0x03,              # INC BC
+    ]))
+    for _ in range(7):
+        cpu.step()
+    assert cpu.memory.read(0xC000) == 0x42
+    assert (cpu.A, cpu.BC, cpu.HL) == (0x42, 0x4243, 0xC001)
+
+
+def test_alu_sets_half_carry_and_carry():
+    cpu = make_cpu()
+    cpu.A = 0x8F
+    cpu.step({"op": "ADD_A_n8", "imm8": 0x81})
+    assert (cpu.A, cpu.F) == (0x10, 0x30)          # H and C
+    cpu.step({"op": "ADC_A_n8", "imm8": 0x00})
+    assert (cpu.A, cpu.F) == (0x11, 0x00)          # carry consumed
+    cpu.step({"op": "SUB_A_n8", "imm8": 0x12})
+    assert (cpu.A, cpu.F) == (0xFF, 0x70)          # N, H, C borrow
+    cpu.step({"op": "SBC_A_n8", "imm8": 0xFE})
+    assert (cpu.A, cpu.F) == (0x00, 0xC0)
+    cpu.step({"op": "CP_A_n8", "imm8": 0x01})
+    assert (cpu.A, cpu.F) == (0x00, 0x70)          # A untouched
+
+
+def test_inc_dec_keep_carry():
+    cpu = make_cpu()
+    cpu.F = 0x10
+    cpu.A = 0x0F
+    cpu.step({"op": "INC_A"})
+    assert (cpu.A, cpu.F) == (0x10, 0x30)
+    cpu.B = 0x01
+    cpu.step({"op": "DEC_r", "r": "B"})
+    assert (cpu.B, cpu.F) == (0x00, 0xD0)
+
+
+def test_alu_register_and_hl_operands_from_rom():
+    cpu = make_rom_cpu(bytes([
+        0x21, 0x00, 0xC0,   # LD HL,C000
+        0x36, 0x45,         # LD (HL),45
+        0x3E, 0x38,         # LD A,38
+        0x86,               # ADD A,(HL)     → 7D
+        0x27,               # DAA            → 83 (BCD 38+45)
+        0x34,               # INC (HL)
+        0x06, 0x83,         # LD B,83
+        0xB8,               # CP B
+        0x76,
+    ]))
+    while not cpu.halted:
+        cpu.step()
+    assert cpu.A == 0x83
+    assert cpu.F & 0x80
+    assert cpu.memory.read(0xC000) == 0x46
+
+
+def test_loads_leave_flags_alone():
+    cpu = make_rom_cpu(bytes([0xAF, 0x3E, 0x07, 0xF0, 0x80, 0x76]))   # XOR A; LD A,7; LDH A,(80)
+    cpu.memory.write(0xFF80, 0x05)
+    while not cpu.halted:
+        cpu.step()
+    assert (cpu.A, cpu.F) == (0x05, 0x80)
+
+
+def test_push_pop_and_call_use_the_stack_in_memory():
+    cpu = make_rom_cpu(bytes([
+        0x31, 0x00, 0xD0,  # 0150: LD   SP,D000
+        0x01, 0x34, 0x12,  # 0153: LD   BC,1234
+        0xC5,              # 0156: PUSH BC
+        0xCD, 0x60, 0x01,  # 0157: CALL 0160
+        0xD1,              # 015A: POP  DE
+        0x76,              # 015B: HALT
+    ]) + bytes(4) + bytes([
+        0xC9,              # 0160: RET
+    ]))
+    while cpu.PC != 0x0160:
+        cpu.step()
+    assert cpu.SP == 0xCFFC
+    assert bytes(cpu.memory.wram0[0xFFC:]) == bytes([0x5A, 0x01, 0x34, 0x12])
+    while not cpu.halted:
+        cpu.step()
+    assert (cpu.DE, cpu.SP) == (0x1234, 0xD000)
+
+
+def test_stack_words_straddle_pages_and_live_in_hram():
+    cpu = make_cpu()
+    mem = cpu.memory
+    mem.write16(0xC0FF, 0xBEEF)                     # crosses a page boundary
+    assert (mem.read(0xC0FF), mem.read(0xC100)) == (0xEF, 0xBE)
+    assert mem.read16(0xC0FF) == 0xBEEF
+    assert cpu.SP == 0xFFFE
+    cpu.PC = 0x0150
+    cpu.step({"op": "RST", "addr": 0x38})
+    assert (cpu.PC, cpu.SP) == (0x38, 0xFFFC)
+    assert bytes(mem.hram[0x7C:0x7E]) == bytes([0x51, 0x01])    # list form: PC + 1
+    cpu.registers.AF = 0x12FF
+    cpu.step({"op": "PUSH_rr", "rr": "AF"})
+    cpu.step({"op": "POP_rr", "rr": "BC"})
+    assert cpu.BC == 0x12F0
+
+
+def test_list_program_rst_returns_past_itself():
+    cpu = make_cpu()
+    cpu.memory_instructions = [
+        {"op": "RST", "addr": 3},
+        {"op": "ADD_A_n8", "imm8": 1},
+        {"op": "HALT"},
+        {"op": "RET"},
+    ]
+    for _ in range(4):
+        cpu.step()
+    assert (cpu.A, cpu.PC, cpu.SP) == (1, 3, 0xFFFE)
+
+
+def test_conditional_jp_call_ret_and_their_cycles():
+    cpu = make_rom_cpu(bytes([
+        0xAF,              # 0150: XOR  A           Z set, C clear
+        0xC4, 0x60, 0x01,  # 0151: CALL NZ,0160     not taken
+        0xCC, 0x60, 0x01,  # 0154: CALL Z,0160      taken
+        0x76,              # 0157: HALT
+    ]) + bytes(8) + bytes([
+        0xC0,              # 0160: RET  NZ          not taken
+        0x3C,              # 0161: INC  A           Z clear
+        0xCA, 0x00, 0x00,  # 0162: JP   Z,0000      not taken
+        0xC2, 0x68, 0x01,  # 0165: JP   NZ,0168     taken
+        0xD0,              # 0168: RET  NC          taken
+    ]))
+    sched = cpu.memory.scheduler
+    cycles = []
+    while not cpu.halted:
+        start = sched.cycles
+        cpu.step()
+        cycles.append(sched.cycles - start)
+    assert cycles == [4, 12, 24, 8, 4, 12, 16, 20, 4]
+    assert (cpu.A, cpu.PC, cpu.SP) == (1, 0x0158, 0xFFFE)
+
+
+def test_sixteen_bit_adds_set_h_and_c_from_bits_11_and_15():
+    cpu = make_rom_cpu(bytes([
+        0x21, 0xFF, 0x0F,  # LD  HL,0FFF
+        0x01, 0x01, 0x00,  # LD  BC,0001
+        0x09,              # ADD HL,BC      → 1000, H
+        0x11, 0x00, 0xF0,  # LD  DE,F000
+        0x19,              # ADD HL,DE      → 0000, C
+        0x31, 0xF8, 0xFF,  # LD  SP,FFF8
+        0xE8, 0x08,        # ADD SP,+8      → 0000, H C
+        0xF8, 0xFE,        # LD  HL,SP-2
+        0x76,
+    ]))
+    cpu.step(); cpu.step(); cpu.step()
+    assert (cpu.HL, cpu.F) == (0x1000, 0x20)
+    cpu.F = 0x80
+    cpu.step(); cpu.step()
+    assert (cpu.HL, cpu.F) == (0x0000, 0x90)       # Z kept
+    cpu.step(); cpu.step()
+    assert (cpu.SP, cpu.F) == (0x0000, 0x30)
+    cpu.step()
+    assert (cpu.HL, cpu.F) == (0xFFFE, 0x00)
+
+
+def test_cb_prefix_rotates_tests_and_sets_bits():
+    cpu = make_rom_cpu(bytes([
+        0x3E, 0x85,        # LD  A,85
+        0xCB, 0x07,        # RLC A         → 0B, C
+        0xCB, 0x7F,        # BIT 7,A       Z
+        0xCB, 0x37,        # SWAP A        → B0
+        0x21, 0x00, 0xC0,  # LD  HL,C000
+        0xCB, 0xC6,        # SET 0,(HL)
+        0xCB, 0x46,        # BIT 0,(HL)
+        0xCB, 0x3E,        # SRL (HL)      → 00, Z C
+        0x76,
+    ]))
+    sched = cpu.memory.scheduler
+    cpu.step(); cpu.step()
+    assert (cpu.A, cpu.F) == (0x0B, 0x10)
+    cpu.step()
+    assert cpu.F == 0xB0                            # Z H, C kept
+    cpu.step()
+    assert (cpu.A, cpu.F) == (0xB0, 0x00)
+    cpu.step()
+    cycles = []
+    for _ in range(3):
+        start = sched.cycles
+        cpu.step()
+        cycles.append(sched.cycles - start)
+    assert cycles == [16, 12, 16]
+    assert (cpu.memory.read(0xC000), cpu.F) == (0x00, 0x90)
@@ -1,15 +1,17 @@
 # tests/test_cpu_vs_pyboy.py
-import os
 import struct
-import tempfile
 from pathlib import Path
-from types import SimpleNamespace
 
-from pyboy import PyBoy
+import numpy as np
+import pytest
+
+from cosim.reference import ReferenceBackend, TraceBackend, PyBoyBackend, record
 from generated.cpu import CPU
 from generated.memory import Memory
 from generated.cartridge import Cartridge
 
+GOLDEN = Path(__file__).with_name("data") / "minicpu_trace.npz"
+
 # ── Nintendo logo and checksum helpers ─────────────────────────────────────
 NINTENDO_LOGO = bytes([
     0xCE, 0xED, 0x66, 0x66, 0xCC, 0x0D, 0x00, 0x0B, 0x03, 0x73, 0x00, 0x83,
@@ -28,7 +30,15 @@ def _global_checksum(buf: bytearray) -> int:
     return (sum(buf) - buf[0x14E] - buf[0x14F]) & 0xFFFF
 
 # ── ROM builder ────────────────────────────────────────────────────────────
-def build_rom() -> bytes:
+MINICPU_CODE = bytes([
+    0x3E, 0x12,       # LD  A,12
+    0xE0, 0x10,       # LDH (10),A  (write to FF10)
+    0xD6, 0x12,       # SUB A,12
+    0xF0, 0x10,       # LDH A,(10)  (read back from FF10)
+    0x76              # HALT
+])
+
+def build_rom(code: bytes = MINICPU_CODE) -> bytes:
     Path("build").mkdir(exist_ok=True)
 
     rom = bytearray(0x8000)  # 32 KiB
@@ -51,13 +61,7 @@ def build_rom() -> bytes:
     rom[0x014D] = _hdr_checksum(rom)
 
     # code at 0x0150
-    rom[0x0150:0x0159] = bytes([
-        0x3E, 0x12,       # LD  A,12    (we'll model as ADD A,12)
-        0xE0, 0x10,       # LDH (10),A  (write to FF10)
-        0xD6, 0x12,       # SUB A,12
-        0xF0, 0x10,       # LDH A,(10)  (read back from FF10)
-        0x76              # HALT
-    ])
+    rom[0x0150:0x0150 + len(code)] = code
 
     # pad to 16 KiB boundary
     if len(rom) % 0x4000:
@@ -66,78 +70,65 @@ def build_rom() -> bytes:
     rom[0x14E:0x150] = struct.pack(">H", _global_checksum(rom))
     return bytes(rom)
 
-# ── helper to expose registers uniformly ───────────────────────────────────
-def pyboy_regs(pb: PyBoy):
-    rf = pb.register_file if hasattr(pb, "register_file") else pb.cpu
-    return SimpleNamespace(a=lambda: rf.A,
-                           f=lambda: rf.F,
-                           pc=lambda: rf.PC)
-
-# ── tiny decoder that yields dicts the generated CPU understands ───────────
-def decode_rom(rom: bytes):
-    pc = 0x0150
-    while pc < len(rom):
-        op = rom[pc]
-        pc += 1
-
-        if op == 0x3E:
-            n = rom[pc]; pc += 1
-            yield {"op": "ADD_A_n8", "imm8": n}
-        elif op == 0xE0:
-            n = rom[pc]; pc += 1
-            yield {"op": "LDH_a8_A", "a8": n}
-        elif op == 0xD6:
-            n = rom[pc]; pc += 1
-            yield {"op": "SUB_A_n8", "imm8": n}
-        elif op == 0xF0:
-            n = rom[pc]; pc += 1
-            yield {"op": "LDH_A_a8", "a8": n}
-        elif op == 0x76:
-            break
-
-# ── the test ───────────────────────────────────────────────────────────────
+# ── the tests ──────────────────────────────────────────────────────────────
 def test_cpu_vs_pyboy():
     rom = build_rom()
 
-    Path("build").mkdir(exist_ok=True)
-    with open("build/test_rom.gb", "wb") as f:
-        f.write(rom)
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".gb") as tmp:
-        tmp.write(rom)
-        tmp.flush()
-        rom_path = tmp.name
-
-    os.environ["SDL_VIDEODRIVER"] = "dummy"
-    py = PyBoy(rom_path, window="null")
-    regs = pyboy_regs(py)
-
-    ticks = 0
-    while regs.pc() < 0x0158 and ticks < 300:
-        py.tick()
-        ticks += 1
-    assert regs.pc() >= 0x0158, "PyBoy never reached HALT"
+    # ── reference: replay of PyBoy on the same ROM ─────────────────────────
+    ref = TraceBackend(GOLDEN)
+    steps = 0
+    while ref.registers()["PC"] < 0x0158 and steps < 300:
+        ref.step()
+        steps += 1
+    assert ref.registers()["PC"] >= 0x0158, "PyBoy never reached HALT"
 
     RAM_ADDR = 0xFF00 + 0x10
-
-    if hasattr(py, "get_memory_value"):
-        ram_ref = py.get_memory_value(RAM_ADDR)
-    elif hasattr(py, "get_memory_values"):
-        ram_ref = py.get_memory_values(RAM_ADDR, 1)[0]
-    elif hasattr(py, "get_memory"):
-        ram_ref = py.get_memory()[RAM_ADDR]
-    else:
-        ram_ref = 0x12
-
-    py.stop()
+    ram_ref = ref.read_memory(RAM_ADDR, RAM_ADDR + 1)[0]
 
     # ── run our tiny CPU model ─────────────────────────────────────────────
     cartridge = Cartridge(rom=rom)
     mem = Memory(cartridge=cartridge)
     cpu = CPU(memory=mem)
 
-    for ins in decode_rom(rom):
-        cpu.step(ins)
+    for name, value in TraceBackend(GOLDEN).registers().items():
+        setattr(cpu, name, value)               # PyBoy's post-boot state
+    steps = 0
+    while cpu.PC != 0x0158 and steps < 300:
+        cpu.step()
+        steps += 1
+    assert cpu.PC == 0x0158, "model never reached HALT"
 
     ram_val = mem.read8(RAM_ADDR)
     assert ram_val == ram_ref, f"RAM[{RAM_ADDR:04X}] mismatch (model={ram_val:#04x}, pyboy={ram_ref:#04x})"
+
+
+def test_golden_trace_steps_single_instructions():
+    ref = TraceBackend(GOLDEN)
+    pcs = []
+    while not ref.halted:
+        pcs.append(ref.registers()["PC"])
+        ref.step()
+    assert pcs == [0x0100, 0x0150, 0x0152, 0x0154, 0x0156, 0x0158]
+    assert ref.registers()["PC"] == 0x0158
+
+
+def test_golden_trace_matches_live_pyboy(tmp_path):
+    pytest.importorskip("pyboy")
+    rom_path = tmp_path / "test_rom.gb"
+    rom_path.write_bytes(build_rom())
+    fresh = tmp_path / "trace.npz"
+    golden = TraceBackend(GOLDEN)
+    with PyBoyBackend(str(rom_path)) as backend:
+        record(backend, fresh, len(golden))
+    with np.load(GOLDEN) as want, np.load(fresh) as got:
+        for name in want.files:
+            assert np.array_equal(want[name], got[name]), name
+
+
+def test_reference_backend_requires_the_whole_interface():
+    class StepOnly(ReferenceBackend):
+        def step(self):
+            pass
+
+    with pytest.raises(TypeError):
+        StepOnly()
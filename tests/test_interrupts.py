@@ -0,0 +1,111 @@
+from generated.cartridge import Cartridge
+from generated.memory import Memory
+from generated.cpu import CPU
+
+
+def make_rom_cpu(code, handlers=(), at=0x0150):
+    rom = bytearray(0x8000)
+    rom[at:at + len(code)] = code
+    for vector, body in handlers:
+        rom[vector:vector + len(body)] = body
+    cpu = CPU(memory=Memory(cartridge=Cartridge(rom=bytes(rom))))
+    cpu.PC = at
+    return cpu
+
+
+def test_ie_is_mapped_and_if_reads_upper_bits_set():
+    mem = Memory(Cartridge(rom=bytes(0x8000)))
+    mem.write(0xFFFF, 0x1F)
+    assert mem.read(0xFFFF) == 0x1F
+    mem.write(0xFF0F, 0x00)
+    assert mem.read(0xFF0F) == 0xE0
+    mem.request_interrupt(2)
+    assert mem.read(0xFF0F) == 0xE4
+    assert mem.interrupts.pending == 0x04
+
+
+def test_highest_priority_bit_is_dispatched_first():
+    cpu = make_rom_cpu(bytes([0x00]))
+    cpu.memory.write(0xFFFF, 0x05)
+    cpu.memory.write(0xFF0F, 0x05)          # VBlank and timer both pending
+    cpu.IME = True
+    cycles = cpu.memory.scheduler.cycles
+    cpu.step()
+    assert cpu.PC == 0x40
+    assert not cpu.IME
+    assert cpu.memory.read(0xFF0F) & 0x1F == 0x04
+    assert cpu.SP == 0xFFFC and cpu.memory.read16(0xFFFC) == 0x0150
+    assert cpu.memory.scheduler.cycles - cycles == CPU.INTERRUPT_CYCLES
+
+
+def test_timer_interrupt_runs_handler_and_reti_returns():
+    cpu = make_rom_cpu(bytes([
+        0x3E, 0x04,        # LD  A,04
+        0xE0, 0xFF,        # LDH (FF),A   IE: timer
+        0x3E, 0x05,        # LD  A,05
+        0xE0, 0x07,        # LDH (07),A   overflow every 4096 cycles
+        0xFB,              # EI
+        0x18, 0xFE,        # JR  -2
+    ]), handlers=[(0x50, bytes([0x04, 0xD9]))])     # INC B; RETI
+    cpu.run(4096 * 5 + 100)
+    assert cpu.B == 5
+    assert cpu.IME and cpu.PC == 0x0159 and cpu.SP == 0xFFFE
+
+
+def test_halt_ignores_requests_that_ie_masks():
+    cpu = make_rom_cpu(bytes([
+        0x3E, 0x05,        # LD  A,05
+        0xE0, 0x07,        # LDH (07),A
+        0x76,              # HALT
+        0x3C,              # INC A
+    ]))
+    cpu.run(20_000)
+    assert cpu.memory.read(0xFF0F) & 0x04
+    assert cpu.halted and cpu.A == 5
+
+
+def test_vblank_wakes_halt_into_the_handler():
+    cpu = make_rom_cpu(bytes([
+        0x3E, 0x01,        # LD  A,01
+        0xE0, 0xFF,        # LDH (FF),A   IE: VBlank
+        0x3E, 0x80,        # LD  A,80
+        0xE0, 0x40,        # LDH (40),A   LCD on
+        0xFB,              # EI
+        0x76,              # HALT
+    ]), handlers=[(0x40, bytes([0xF0, 0x44, 0x76]))])   # LDH A,(44); HALT
+    cpu.run(80_000)
+    assert cpu.A == 0x90 and cpu.PC == 0x43
+    assert cpu.memory.read16(cpu.SP) == 0x015A
+
+
+def test_ie_write_dispatches_before_the_rest_of_the_block():
+    cpu = make_rom_cpu(bytes([
+        0x3E, 0x01,        # 0150: LD  A,01
+        0xE0, 0xFF,        # 0152: LDH (FF),A   IE: VBlank, already in IF
+        0x04,              # 0154: INC B
+        0x04,              # 0155: INC B
+        0x76,              # 0156: HALT
+    ]), handlers=[(0x40, bytes([0x76]))])               # HALT
+    cpu.memory.write(0xFF0F, 0x01)
+    cpu.IME = True
+    cpu.run(100)
+    assert cpu.PC == 0x41 and cpu.B == 0
+    assert cpu.memory.read16(cpu.SP) == 0x0154
+
+
+def test_ei_takes_effect_after_the_next_instruction():
+    code = bytes([
+        0xFB,              # 0150: EI           VBlank already pending
+        0x04,              # 0151: INC B
+        0x04,              # 0152: INC B
+        0x76,              # 0153: HALT
+    ])
+    handlers = [(0x40, bytes([0x76]))]                  # HALT
+    for run in (lambda cpu: cpu.run(100),
+                lambda cpu: [cpu.step() for _ in range(4)]):
+        cpu = make_rom_cpu(code, handlers)
+        cpu.memory.write(0xFFFF, 0x01)
+        cpu.memory.write(0xFF0F, 0x01)
+        run(cpu)
+        assert cpu.PC == 0x41 and cpu.B == 1
+        assert cpu.memory.read16(cpu.SP) == 0x0152
@@ -1,47 +1,71 @@
 # tests/test_ly_vs_pyboy.py
-import os, tempfile
-from pyboy import PyBoy
+from pathlib import Path
 
+import numpy as np
+import pytest
+
+from cosim.reference import TraceBackend, PyBoyBackend, record
 from generated.ppu import PPU
-from tests.test_cpu_vs_pyboy import build_rom      # reuse the tiny ROM
+from tests.test_cpu_vs_pyboy import build_rom
+
+GOLDEN = Path(__file__).with_name("data") / "ly_trace.npz"
+LCD_ON_PC = 0x015D
+
+# Restart the LCD at the top of a frame, then spin reading LY.  Every
+# instruction of the spin loop takes 12 cycles, so 38 steps are one line.
+LY_CODE = bytes([
+    0xF0, 0x44,       # LDH A,(44)
+    0xFE, 0x90,       # CP  90
+    0x20, 0xFA,       # JR  NZ,-6    wait for VBlank
+    0xAF,             # XOR A
+    0xE0, 0x40,       # LDH (40),A   LCD off
+    0x3E, 0x91,       # LD  A,91
+    0xE0, 0x40,       # LDH (40),A   LCD on
+    0xF0, 0x44,       # LDH A,(44)
+    0x18, 0xFC,       # JR  -4
+])
+STEPS_PER_LINE = PPU.CYCLES_PER_SCANLINE // 12
+LINES = 2 * PPU.TOTAL_SCANLINES
+LY_RANGE = ((0xFF40, 0xFF46),)      # LCDC … LY
 
-# ────────────────────────────────────────────────────────────────────────────
-def _spawn_pyboy(rom_path: str) -> PyBoy:
-    os.environ["SDL_VIDEODRIVER"] = "dummy"
-    return PyBoy(rom_path, window="null", sound_emulated=False, no_input=True)
-
-def _peek_ly(pb: PyBoy) -> int:
-    # PyBoy ≥ 2.0 exposes .memory (fast); fall back to helpers for 1.x
-    if hasattr(pb, "memory"):
-        return pb.memory[0xFF44]
-    if hasattr(pb, "get_memory_value"):
-        return pb.get_memory_value(0xFF44)
-    return pb.get_memory()[0xFF44]
 
 # ────────────────────────────────────────────────────────────────────────────
 def test_ly_vs_pyboy():
-    # --- build a throw‑away ROM ------------------------------------------------
-    rom_bytes = build_rom()
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".gb") as tmp:
-        tmp.write(rom_bytes); tmp.flush(); rom_path = tmp.name
+    # --- reference (replayed PyBoy trace), up to the LCD switching on ----------
+    ref = TraceBackend(GOLDEN)
+    while ref.registers()["PC"] != LCD_ON_PC:
+        ref.step()
 
-    # --- reference (PyBoy) -----------------------------------------------------
-    pyboy = _spawn_pyboy(rom_path)
+    # --- device‑under‑test (our PPU), switched on at the same point ------------
+    ppu = PPU()
+    ppu.write(0xFF40, 0x91)
 
-    # --- device‑under‑test (our PPU) ------------------------------------------
-    ppu   = PPU()
+    # Sample mid‑line so a few cycles of phase between the two cannot matter
+    for _ in range(STEPS_PER_LINE // 2):
+        ref.step()
+    ppu.tick(PPU.CYCLES_PER_SCANLINE // 2)
 
-    # We’ll run for two full frames: 2 × 154 × 456 = 140 448 CPU cycles
-    total_cycles = 2 * PPU.TOTAL_SCANLINES * PPU.CYCLES_PER_SCANLINE
+    lys = []
+    for line in range(LINES):
+        ly = ref.read_memory(0xFF44, 0xFF45)[0]
+        assert ly == ppu.read(0xFF44), f"LY mismatch on line {line}"
+        lys.append(ly)
+        for _ in range(STEPS_PER_LINE):
+            ref.step()
+        ppu.tick(PPU.CYCLES_PER_SCANLINE)
 
-    for cyc in range(total_cycles):
-        pyboy.tick()     # 1 CPU cycle
-        ppu.tick()       # feed the same cycle to our PPU
+    assert len(set(lys)) > 1
+    assert lys == list(range(PPU.TOTAL_SCANLINES)) * 2
 
-        # check LY exactly at the end of every scan‑line
-        if (cyc + 1) % PPU.CYCLES_PER_SCANLINE == 0:
-            assert _peek_ly(pyboy) == ppu.read(0xFF44), (
-                f"LY mismatch after {cyc+1} cycles"
-            )
 
-    pyboy.stop()
\ No newline at end of file
+def test_ly_golden_trace_matches_live_pyboy(tmp_path):
+    pytest.importorskip("pyboy")
+    rom_path = tmp_path / "ly.gb"
+    rom_path.write_bytes(build_rom(LY_CODE))
+    fresh = tmp_path / "trace.npz"
+    golden = TraceBackend(GOLDEN)
+    with PyBoyBackend(str(rom_path)) as backend:
+        record(backend, fresh, len(golden), LY_RANGE)
+    with np.load(GOLDEN) as want, np.load(fresh) as got:
+        for name in want.files:
+            assert np.array_equal(want[name], got[name]), name
@@ -31,8 +31,28 @@ def test_known_regions():
     assert get_memory_region(0xD000) == "WRAMX"
     assert get_memory_region(0xFE00) == "OAM"
     assert get_memory_region(0xFF80) == "HRAM"
+    assert get_memory_region(0xFFFF) == "IE"
 
 def test_unknown_addresses():
-    assert get_memory_region(0xFFFF) == "UNKNOWN"
     assert get_memory_region(-1) == "UNKNOWN"
     assert get_memory_region(0x10000) == "UNKNOWN"
+
+def test_page_table_routes_to_region_buffers():
+    memory = make_memory()
+    for addr, buf, base in [
+        (0x8000, memory.vram, 0x8000), (0x9FFF, memory.vram, 0x8000),
+        (0xA000, memory.ramx, 0xA000), (0xCFFF, memory.wram0, 0xC000),
+        (0xD000, memory.wramx, 0xD000), (0xFE9F, memory.oam, 0xFE00),
+        (0xFF7F, memory.io, 0xFF00), (0xFFFE, memory.hram, 0xFF80),
+    ]:
+        memory.write(addr, 0x5A)
+        assert buf[addr - base] == 0x5A
+        assert memory.read(addr) == 0x5A
+
+def test_unusable_and_echo_ranges_stay_unmapped():
+    memory = make_memory()
+    for addr in (0xE000, 0xFDFF, 0xFEA0, 0xFEFF):
+        with pytest.raises(ValueError):
+            memory.read(addr)
+        with pytest.raises(ValueError):
+            memory.write(addr, 0)
@@ -35,3 +35,88 @@ def test_write_out_of_bounds_raises_error():
     mem = make_memory()
     with pytest.raises(ValueError):
         mem.write(0x10000, 0x01)  # ✅ 0xFFFF is still in bounds; use 0x10000 instead
+
+def test_io_bus_routes_devices():
+    mem = make_memory()
+    mem.write(0xFF40, 0x91)
+    assert mem.ppu.read(0xFF40) == 0x91
+    mem.write(0xFF12, 0xF3)
+    assert mem.apu.registers[0xFF12] == 0xF3
+    mem.joypad.press("a")
+    mem.write(0xFF00, 0x10)             # bit 5 low: buttons
+    assert (mem.joypad.select_buttons, mem.joypad.select_directions) == (True, False)
+    assert mem.read(0xFF00) == 0xDE     # A pressed
+    mem.write(0xFF00, 0x20)             # bit 4 low: directions
+    assert mem.read(0xFF00) == 0xEF     # A not on this row
+    mem.write(0xFF00, 0x30)
+    assert mem.read(0xFF00) == 0xFF
+    mem.write(0xFF06, 0x42)
+    assert mem.timer.TMA == 0x42
+
+def test_register_io_claims_ports():
+    mem = make_memory()
+    seen = []
+    mem.register_io(0xFF01, 0xFF02, read=lambda addr: 0x5A,
+                    write=lambda addr, val: seen.append((addr, val)))
+    mem.write(0xFF02, 0x81)
+    assert seen == [(0xFF02, 0x81)]
+    assert mem.read(0xFF01) == 0x5A
+    mem.write(0xFF03, 0x33)             # unclaimed port keeps plain storage
+    assert mem.read(0xFF03) == 0x33
+
+def test_oam_dma_copies_a_page_into_oam():
+    mem = make_memory()
+    for i in range(0xA0):
+        if i % 4:                           # leave every Y at 0 (off screen)
+            mem.write(0xC100 + i, i)
+    mem.write(0xC100 + 4 * 7, 0x50)         # sprite 7 Y
+    mem.write(0xFF46, 0xC1)
+    assert bytes(mem.oam) == bytes(mem.wram0[0x100:0x1A0])
+    assert mem.read(0xFF46) == 0xC1
+    assert mem.ppu.line_sprites(0x50 - 16) == [7]
+
+
+def test_oam_dma_from_echo_ram_reads_wram():
+    mem = make_memory()
+    for i in range(0xA0):
+        mem.write(0xDD00 + i, 0xA0 - i)
+    mem.write(0xFF46, 0xFD)                 # 0xFD00 echoes 0xDD00
+    assert bytes(mem.oam) == bytes(mem.wramx[0xD00:0xDA0])
+    mem.write(0xC200, 0x77)
+    mem.write(0xFF46, 0xE2)
+    assert mem.oam[0] == 0x77
+    assert mem.read(0xFF46) == 0xE2
+
+def test_view_is_zero_copy_within_one_buffer():
+    mem = make_memory()
+    window = mem.view(0xC100, 0xC110)
+    window[0] = 0x5A
+    assert mem.read(0xC100) == 0x5A
+    assert mem.view(0x0000, 0x4000).readonly
+    with pytest.raises(ValueError):
+        mem.view(0xCFF0, 0xD010)                    # WRAM0 → WRAMX
+
+
+def test_read_and_write_block_cross_regions():
+    mem = make_memory()
+    mem.write_block(0xCFFE, bytes([1, 2, 3, 4]))
+    assert bytes(mem.read_block(0xCFFC, 0xD004)) == bytes([0, 0, 1, 2, 3, 4, 0, 0])
+    mem.write(0xFFFF, 0x1F)
+    block = mem.read_block(0xFF7E, 0x10000)         # I/O, all of HRAM, IE
+    assert len(block) == 0x82 and block[-1] == 0x1F
+
+
+def test_write_block_keeps_ppu_and_code_caches_coherent():
+    mem = make_memory()
+    cpu = CPU(memory=mem)
+    mem.write_block(0x8000, bytes([0xFF, 0x00] * 8))    # tile 0, colour 1
+    mem.ppu._refresh_tiles()
+    assert (mem.ppu.tiles[0] == 1).all()
+    mem.write_block(0xC000, bytes([0x3E, 0x05, 0x76]))  # LD A,05; HALT
+    cpu.PC = 0xC000
+    cpu.run(8)
+    mem.write_block(0xC001, bytes([0x09]))
+    cpu.halted = False
+    cpu.PC = 0xC000
+    cpu.run(8)
+    assert cpu.A == 0x09
@@ -0,0 +1,61 @@
+from generated.ppu import PPU
+
+
+def make_ppu():
+    raised = []
+    ppu = PPU(request_interrupt=raised.append)
+    ppu.write(0xFF40, 0x80)              # LCD on at cycle 0; line 0 starts at 1
+    return ppu, raised
+
+
+def test_mode_sequence_within_a_line():
+    ppu, _ = make_ppu()
+    assert ppu.mode == 2
+    ppu.tick(80)
+    assert ppu.mode == 2
+    ppu.tick(1)
+    assert ppu.mode == 3                 # 81
+    ppu.tick(172)
+    assert ppu.mode == 0                 # 253
+    ppu.tick(204)
+    assert (ppu.mode, ppu.read(0xFF44)) == (2, 1)   # 457
+
+
+def test_vblank_interrupt_and_mode_1():
+    ppu, raised = make_ppu()
+    ppu.tick(456 * 144)
+    assert raised == [] and ppu.read(0xFF44) == 143
+    ppu.tick(1)
+    assert ppu.read(0xFF44) == 144 and ppu.mode == 1
+    assert raised == [PPU.VBLANK_BIT]
+    ppu.tick(456 * 10)
+    assert ppu.read(0xFF44) == 0 and ppu.mode == 2
+    assert raised == [PPU.VBLANK_BIT]
+
+
+def test_lyc_coincidence_raises_stat_once():
+    ppu, raised = make_ppu()
+    ppu.write(0xFF45, 3)
+    ppu.write(0xFF41, 0x40)              # LYC interrupt source
+    ppu.tick(456 * 3 + 1)
+    assert ppu.read(0xFF41) & 0x04
+    assert raised == [PPU.STAT_BIT]      # held high through the line's modes
+    ppu.tick(456)
+    assert not ppu.read(0xFF41) & 0x04
+    assert ppu.read(0xFF41) & 0x80       # unused bit reads back set
+
+
+def test_hblank_stat_source_fires_each_line():
+    ppu, raised = make_ppu()
+    ppu.write(0xFF41, 0x08)
+    ppu.tick(456 * 4)
+    assert raised.count(PPU.STAT_BIT) == 4
+
+
+def test_lcd_off_resets_mode_and_ly():
+    ppu, _ = make_ppu()
+    ppu.tick(456 * 5 + 100)
+    ppu.write(0xFF40, 0x00)
+    assert (ppu.read(0xFF44), ppu.mode) == (0, 0)
+    ppu.tick(10_000)
+    assert ppu.read(0xFF44) == 0
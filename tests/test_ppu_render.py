@@ -0,0 +1,146 @@
+import numpy as np
+from generated.ppu import PPU
+
+
+def make_ppu(lcdc=0x91):
+    ppu = PPU()
+    ppu.write(0xFF47, 0xE4)             # identity palette 0,1,2,3
+    ppu.write(0xFF40, lcdc)
+    return ppu
+
+
+def put_tile(ppu, index, rows):
+    # rows: 8 (lo, hi) byte pairs
+    for y, (lo, hi) in enumerate(rows):
+        ppu.vram[index * 16 + y * 2] = lo
+        ppu.vram[index * 16 + y * 2 + 1] = hi
+    ppu.mark_tiles_dirty(index * 16, index * 16 + 16)
+
+
+def test_background_line_decodes_tiles_and_palette():
+    ppu = make_ppu()
+    put_tile(ppu, 1, [(0xF0, 0xCC)] * 8)    # colours 3,3,1,1,2,2,0,0
+    ppu.vram[0x1800] = 1
+    ppu.render_line(0)
+    assert list(ppu.framebuffer[0, :10]) == [3, 3, 1, 1, 2, 2, 0, 0, 0, 0]
+
+    ppu.write(0xFF47, 0x1B)                 # inverted palette
+    ppu.render_line(0)
+    assert list(ppu.framebuffer[0, :4]) == [0, 0, 2, 2]
+
+
+def test_scroll_wraps_around_tile_map():
+    ppu = make_ppu()
+    put_tile(ppu, 2, [(0xFF, 0xFF)] * 8)
+    ppu.vram[0x1800 + 31] = 2               # last tile of map row 0
+    ppu.write(0xFF43, 252)                  # SCX: last 4 pixels of that tile first
+    ppu.render_line(0)
+    assert list(ppu.framebuffer[0, :6]) == [3, 3, 3, 3, 0, 0]
+
+
+def test_signed_tile_data_and_window():
+    ppu = make_ppu(lcdc=0x81 | 0x20 | 0x40)  # 0x8800 data, window on map 0x9C00
+    put_tile(ppu, 256, [(0xFF, 0x00)] * 8)   # id 0 in signed mode → 0x9000
+    put_tile(ppu, 255, [(0x00, 0xFF)] * 8)   # id 0xFF → 0x8FF0
+    ppu.vram[0x1C00:0x1C20] = 0xFF
+    ppu.write(0xFF4A, 2)                     # WY
+    ppu.write(0xFF4B, 7 + 80)                # WX: window from x=80
+    ppu.render_line(1)
+    assert (ppu.framebuffer[1] == 1).all()
+    ppu.render_line(2)
+    assert (ppu.framebuffer[2, :80] == 1).all()
+    assert (ppu.framebuffer[2, 80:] == 2).all()
+
+
+def test_frame_is_rendered_as_lines_complete():
+    ppu = make_ppu()
+    put_tile(ppu, 1, [(0xFF, 0xFF)] * 8)
+    ppu.vram[0x1800:0x1800 + 32 * 32] = 1
+    ppu.tick(456 * 144 + 1)
+    assert ppu.read(0xFF44) == 144
+    assert (ppu.framebuffer == np.uint8(3)).all()
+
+
+def test_vram_writes_redecode_only_dirty_tiles():
+    from generated.cartridge import Cartridge
+    from generated.memory import Memory
+
+    mem = Memory(Cartridge(rom=bytes(0x8000)))
+    ppu = mem.ppu
+    ppu.write(0xFF47, 0xE4)
+    ppu.write(0xFF40, 0x91)
+    ppu.render_line(0)
+    assert not ppu._tile_dirty.any()
+
+    mem.write(0x8010, 0x80)                 # tile 1, row 0, leftmost pixel
+    mem.write(0x9801, 1)                    # map (not tile data): no dirt
+    assert list(np.flatnonzero(ppu._tile_dirty)) == [1]
+    ppu.render_line(0)
+    assert list(ppu.framebuffer[0, 7:10]) == [0, 1, 0]
+
+
+FRAME = 456 * 154
+
+
+def test_headless_mode_keeps_timing_but_draws_nothing():
+    raised = []
+    ppu = PPU(request_interrupt=raised.append)
+    ppu.frame_skip = 0
+    put_tile(ppu, 0, [(0xFF, 0xFF)] * 8)
+    ppu.write(0xFF47, 0xE4)
+    ppu.write(0xFF40, 0x91)
+    ppu.tick(FRAME * 3)
+    assert raised.count(PPU.VBLANK_BIT) == 3
+    assert ppu.frame_count == 3 and ppu.rendered_frame is None
+    assert not ppu.framebuffer.any()
+
+    ppu.request_frame()
+    ppu.tick(FRAME)
+    assert ppu.rendered_frame == 3
+    assert (ppu.framebuffer == 3).all()
+
+
+def test_frame_skip_renders_every_nth_frame():
+    ppu = make_ppu()
+    ppu.frame_skip = 3
+    rendered = []
+    for _ in range(7):
+        ppu.tick(FRAME)
+        rendered.append(ppu.rendered_frame)
+    assert rendered == [0, 0, 0, 3, 3, 3, 6]
+    blank = ppu.frame_hash()
+    put_tile(ppu, 0, [(0xFF, 0x00)] * 8)
+    ppu.tick(FRAME * 3)
+    assert ppu.frame_hash() != blank
+
+
+def put_sprite(ppu, index, y, x, tile, attr=0):
+    ppu.oam[index * 4:index * 4 + 4] = (y, x, tile, attr)
+    ppu.mark_oam_dirty()
+
+
+def test_line_sprites_takes_first_ten_in_oam_order():
+    ppu = PPU()
+    for i in range(12):
+        put_sprite(ppu, 39 - i, 16 + (i % 3), 8 + i * 8, 1)
+    put_sprite(ppu, 0, 40, 8, 1)            # other lines
+    assert ppu.line_sprites(2) == list(range(28, 38))
+    assert ppu.line_sprites(24) == [0]
+    assert ppu.line_sprites(9) == [28, 31, 34, 37]               # Y = 18 only
+    assert ppu.line_sprites(9, height=16) == list(range(28, 38))
+
+
+def test_sprites_drawn_with_flip_palette_and_priority():
+    ppu = make_ppu(lcdc=0x93)               # BG + sprites
+    ppu.write(0xFF48, 0xE4)
+    ppu.write(0xFF49, 0x1B)                 # OBP1 inverted
+    put_tile(ppu, 1, [(0xF0, 0x00)] * 8)    # sprite: colour 1 on the left half
+    put_tile(ppu, 2, [(0x00, 0x0F)] * 8)    # BG tile 1 at x 8‑15: colour 2 right half
+    ppu.vram[0x1801] = 2
+    put_sprite(ppu, 0, 16, 8, 1)                    # x 0‑7
+    put_sprite(ppu, 1, 16, 24, 1, attr=0x20 | 0x10)  # x 16‑23, X-flip, OBP1
+    put_sprite(ppu, 2, 16, 16, 1, attr=0x80)        # x 8‑15, behind BG
+    ppu.render_line(0)
+    assert list(ppu.framebuffer[0, 0:8]) == [1] * 4 + [0] * 4
+    assert list(ppu.framebuffer[0, 8:16]) == [1] * 4 + [2] * 4
+    assert list(ppu.framebuffer[0, 16:24]) == [0] * 4 + [2] * 4
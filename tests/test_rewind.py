@@ -0,0 +1,42 @@
+import pytest
+from generated.rewind import Rewind, FRAME_CYCLES, xor_runs, apply_runs
+from tests.test_savestate import make_machine, observe
+
+
+def test_xor_runs_round_trip():
+    base = bytes(range(256)) * 4
+    blob = bytearray(base)
+    blob[10:14] = b"\xff" * 4
+    blob[500] ^= 1
+    starts, lengths, data = xor_runs(base, bytes(blob))
+    assert list(starts) == [10, 500] and list(lengths) == [4, 1]
+    assert apply_runs(base, starts, lengths, data) == bytes(blob)
+
+
+def test_rewind_replays_to_the_same_state():
+    cpu = make_machine()
+    rewind = Rewind(cpu, seconds=1, keyframe_every=4)
+    rewind.run(FRAME_CYCLES * 12)
+    end = cpu.memory.scheduler.cycles
+    cpu.memory.apu.drain()
+    expected = observe(cpu)[:-1]
+
+    target = FRAME_CYCLES * 6 + 1234                    # inside a delta frame
+    reached = rewind.rewind_to(target)
+    assert target <= reached < target + 32
+    assert len(rewind) == 6
+    cpu.run(end - reached)
+    assert observe(cpu)[:-1] == expected
+
+
+def test_ring_is_bounded_and_deltas_are_small():
+    cpu = make_machine()
+    rewind = Rewind(cpu, seconds=FRAME_CYCLES * 8 / 4194304, keyframe_every=4)
+    rewind.run(FRAME_CYCLES * 20)
+    assert len(rewind) <= 8
+    assert rewind.oldest_cycle >= FRAME_CYCLES * 12
+    group = rewind._groups[-1]
+    key, delta = group[0][1], group[1][1]
+    assert len(delta[2]) < len(key) // 4
+    with pytest.raises(ValueError):
+        rewind.rewind_to(FRAME_CYCLES)
@@ -0,0 +1,67 @@
+import pytest
+from generated.cartridge import Cartridge
+from generated.memory import Memory
+from generated.cpu import CPU
+from generated.savestate import save_state, load_state
+
+PROGRAM = bytes([
+    0x3E, 0xE4, 0xE0, 0x47,     # BGP = E4
+    0x3E, 0xFF, 0xEA, 0x00, 0x80,   # tile 0 row 0 = colour 1
+    0x3E, 0x91, 0xE0, 0x40,     # LCD on
+    0x3E, 0x05, 0xE0, 0x07,     # timer on, 16 cycles
+    0x3E, 0x80, 0xE0, 0x26,     # APU on
+    0x3E, 0x77, 0xE0, 0x24,
+    0x3E, 0xFF, 0xE0, 0x25,
+    0x3E, 0xF0, 0xE0, 0x17,     # ch2 envelope
+    0x3E, 0x87, 0xE0, 0x19,     # ch2 trigger
+    0x21, 0x00, 0xC0,           # loop: LD HL,C000
+    0xF0, 0x05,                 # inner: LDH A,(TIMA)
+    0x22,                       # LD (HL+),A
+    0x7C,                       # LD A,H
+    0xFE, 0xD0,                 # CP D0
+    0x20, 0xF8,                 # JR NZ,inner
+    0x18, 0xF3,                 # JR loop
+])
+
+
+def make_machine():
+    rom = bytearray(0x8000)
+    rom[0x0150:0x0150 + len(PROGRAM)] = PROGRAM
+    cpu = CPU(Memory(Cartridge(rom=bytes(rom))))
+    cpu.PC = 0x0150
+    return cpu
+
+
+def observe(cpu):
+    mem = cpu.memory
+    return (cpu.registers.as_dict(), bytes(mem.wram0), mem.scheduler.cycles,
+            mem.ppu.read(0xFF44), mem.ppu.read(0xFF41), mem.timer.TIMA,
+            mem.read(0xFF0F), mem.read(0xFFFF), mem.ppu.frame_hash(), mem.apu.drain().tobytes())
+
+
+def test_restored_machine_continues_identically():
+    cpu = make_machine()
+    cpu.run(150_000)
+    cpu.memory.apu.drain()
+    blob = save_state(cpu)
+    cpu.run(200_000)
+    expected = observe(cpu)
+
+    other = make_machine()
+    load_state(other, blob)
+    other.run(200_000)
+    assert observe(other) == expected
+
+    load_state(cpu, blob)                   # rewinding the same machine
+    cpu.run(200_000)
+    assert observe(cpu) == expected
+
+
+def test_blob_is_versioned_and_checked():
+    cpu = make_machine()
+    blob = bytearray(save_state(cpu))
+    blob[4] = 99
+    with pytest.raises(ValueError):
+        load_state(cpu, bytes(blob))
+    with pytest.raises(ValueError):
+        load_state(cpu, b"NOPE" + bytes(blob[4:]))
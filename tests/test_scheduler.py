@@ -0,0 +1,48 @@
+from generated.scheduler import Scheduler, NEVER
+from generated.ppu import PPU
+from generated.timer import Timer
+
+
+def test_events_fire_in_cycle_order():
+    sched = Scheduler()
+    fired = []
+    sched.schedule("b", 20, lambda c: fired.append(("b", c)))
+    sched.schedule("a", 10, lambda c: fired.append(("a", c)))
+    sched.advance(9)
+    assert fired == []
+    sched.advance(100)
+    assert fired == [("a", 10), ("b", 20)]
+    assert sched.next_event == NEVER
+
+
+def test_reschedule_and_cancel_update_next_event():
+    sched = Scheduler()
+    sched.schedule("x", 10, lambda c: None)
+    sched.schedule("x", 50, lambda c: None)
+    assert sched.next_event == 50
+    sched.cancel("x")
+    assert sched.next_event == NEVER
+
+
+def test_ly_advances_on_line_events():
+    ppu = PPU()
+    ppu.write(0xFF40, 0x80)
+    ppu.tick(PPU.CYCLES_PER_SCANLINE)
+    assert ppu.read(0xFF44) == 0
+    ppu.tick(1)
+    assert ppu.read(0xFF44) == 1
+    ppu.tick(PPU.CYCLES_PER_SCANLINE * 153)
+    assert ppu.read(0xFF44) == 0
+    ppu.write(0xFF40, 0x00)
+    assert ppu.read(0xFF44) == 0
+    assert ppu.scheduler.next_event == NEVER
+
+
+def test_shared_clock_timer_catches_up_on_read():
+    sched = Scheduler()
+    timer = Timer(sched)
+    timer.write(0xFF07, 0x05)           # enabled, 16 cycles per TIMA++
+    sched.advance(16 * 10 + 5)
+    assert timer.read(0xFF05) == 10
+    sched.advance(600)
+    assert timer.read(0xFF04) == (16 * 10 + 5 + 600) // 256
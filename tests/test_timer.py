@@ -20,3 +20,36 @@ def test_tima_resets_on_overflow():
     timer.TIMA = 0xFF
     timer.step(16)
     assert timer.TIMA == 0x42, "TIMA did not reset to TMA on overflow"
+
+def test_long_idle_catches_up_in_closed_form():
+    timer = Timer()
+    timer.TAC = 0x04                    # enabled, 1024 cycles per TIMA++
+    timer.step(1024 * 100 + 1023)
+    assert timer.TIMA == 100
+    assert timer.DIV == ((1024 * 100 + 1023) >> 8) & 0xFF
+
+def test_repeated_overflows_wrap_to_tma():
+    timer = Timer()
+    timer.TAC = 0x05
+    timer.TMA = 0xF0                    # 16 increments per overflow after the first
+    timer.step(16 * (0x100 + 16 * 3 + 5))
+    assert timer.TIMA == 0xF5
+
+def test_overflow_raises_timer_interrupt_on_exact_cycle():
+    raised = []
+    timer = Timer(request_interrupt=lambda bit: raised.append((bit, timer.scheduler.cycles)))
+    timer.TAC = 0x05
+    timer.TIMA = 0xFE
+    assert timer.next_overflow() == 32
+    timer.step(31)
+    assert raised == []
+    timer.step(1)
+    assert raised == [(2, 32)]
+
+def test_div_write_resets_system_counter():
+    timer = Timer()
+    timer.step(700)
+    timer.write(0xFF04, 0x99)
+    assert timer.DIV == 0
+    timer.step(256)
+    assert timer.DIV == 1
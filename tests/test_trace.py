@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from cosim.trace import TraceWriter, TraceReader, diff, format_mismatch
+
+
+def write_trace(path, steps, chunk=4096, tweak=None):
+    with TraceWriter(path, chunk_records=chunk) as trace:
+        for i in range(steps):
+            row = [i & 0xFFFF, i & 0xFF, 1, 2, 3, 4, 5, 6, 0x80, 0xFFFE, i * 4]
+            if tweak:
+                tweak(i, row)
+            trace.append(*row)
+            if i % 1000 == 0:
+                trace.log_write(0xFF80, i & 0xFF)
+
+
+def test_round_trip_in_chunks(tmp_path):
+    write_trace(tmp_path / "a.trace", 10_000)
+    with TraceReader(tmp_path / "a.trace") as reader:
+        chunks = list(reader)
+    assert [step for step, _, _ in chunks] == [0, 4096, 8192]
+    step, records, writes = chunks[-1]
+    assert len(records) == 10_000 - 8192
+    assert records[0]["PC"] == 8192 and records[-1]["cycle"] == 9_999 * 4
+    assert writes.tolist() == [(9000, 0xFF80, 9000 & 0xFF)]
+
+
+def test_identical_traces_have_no_mismatches(tmp_path):
+    write_trace(tmp_path / "a.trace", 50_000)
+    write_trace(tmp_path / "b.trace", 50_000)
+    assert list(diff(tmp_path / "a.trace", tmp_path / "b.trace")) == []
+
+
+def test_mismatches_are_reported_per_field_in_step_order(tmp_path):
+    def tweak(i, row):
+        if i == 5000:
+            row[1] = 0x42               # A
+            row[9] = 0xC000             # SP
+        if i == 9000:
+            row[-1] += 1                # cycle: ignored by default
+
+    write_trace(tmp_path / "a.trace", 20_000)
+    write_trace(tmp_path / "b.trace", 20_001, tweak=tweak)
+    found = list(diff(tmp_path / "a.trace", tmp_path / "b.trace"))
+    assert [(m.step, m.field) for m in found] == [(5000, "A"), (5000, "SP"), (20_000, "length")]
+    assert (found[0].a, found[0].b) == (5000 & 0xFF, 0x42)
+    assert (found[-1].a, found[-1].b) == (20_000, 20_001)
+    assert format_mismatch(found[1]) == "step 0005000: SP a=FFFE b=C000"
+
+    with_cycles = diff(tmp_path / "a.trace", tmp_path / "b.trace",
+                       fields=("PC", "cycle"))
+    assert [(m.step, m.field) for m in with_cycles][0] == (9000, "cycle")
+
+
+def test_write_logs_are_compared(tmp_path):
+    write_trace(tmp_path / "a.trace", 3000)
+    with TraceWriter(tmp_path / "b.trace", chunk_records=4096) as trace:
+        for i in range(3000):
+            trace.append(i, i & 0xFF, 1, 2, 3, 4, 5, 6, 0x80, 0xFFFE, i * 4)
+            if i % 1000 == 0:
+                trace.log_write(0xFF80, i & 0xFF)
+            if i == 1500:
+                trace.log_write(0xFF81, 0x99)
+    found = list(diff(tmp_path / "a.trace", tmp_path / "b.trace"))
+    assert found == [(1500, "writes", [], [(0xFF81, 0x99)])]
+
+
+def test_one_late_write_difference_in_a_full_chunk_is_fast(tmp_path):
+    for name, last in (("a.trace", 0x11), ("b.trace", 0x22)):
+        with TraceWriter(tmp_path / name) as trace:         # one 65,536-record chunk
+            for i in range(1 << 16):
+                trace.append(i & 0xFFFF, 0, 0, 0, 0, 0, 0, 0, 0, 0xFFFE)
+                trace.log_write(0xC000 | i & 0xFFF, i & 0xFF if i < 0xFFFF else last)
+    start = time.perf_counter()
+    found = list(diff(tmp_path / "a.trace", tmp_path / "b.trace"))
+    assert time.perf_counter() - start < 1.0
+    assert found == [(0xFFFF, "writes", [(0xCFFF, 0x11)], [(0xCFFF, 0x22)])]
+
+
+def test_chunk_sizes_must_match(tmp_path):
+    write_trace(tmp_path / "a.trace", 10, chunk=4)
+    write_trace(tmp_path / "b.trace", 10, chunk=8)
+    with pytest.raises(ValueError):
+        list(diff(tmp_path / "a.trace", tmp_path / "b.trace"))